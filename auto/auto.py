@@ -7,23 +7,41 @@
 ################################################################################
 
 """Modules"""
+
 import os
 
-from autocli import commands
-from pyfiglet import Figlet
-from rich import print as rprint
+from autocli import completion
+
+# The "auto" header, pre-rendered with Figlet's "small" font so we don't have to
+# load pyfiglet (and its fonts) on every run
+BANNER = r"""           _
+ __ _ _  _| |_ ___
+/ _` | || |  _/ _ \
+\__,_|\_,_|\__\___/
+"""
 
 
 def main():
     """This is the iniatial step of the `auto` cli"""
 
+    # pylint: disable=import-outside-toplevel
     if "_AUTO_COMPLETE" in os.environ:
-        # Skip banner and let Click handle completion
-        pass
-    else:
-        # Print a fancy header
-        fig = Figlet(font="small")
-        rprint("[dodger_blue2]" + fig.renderText("auto"))
+        # Answer Tab presses from the completion index without loading the CLI
+        if completion.fast_complete():
+            return
+
+        # The index is missing or stale so let Click answer and rebuild it
+        from autocli import commands
+
+        commands.refresh_completion_index()
+        commands.auto()
+        return
+
+    import click
+    from autocli import commands
+
+    # Print a fancy header (color 27 is Rich's "dodger_blue2")
+    click.secho(BANNER, fg=27)
     commands.auto()
 
 
@@ -1 +1,3 @@
 """Auto cli tool"""
+
+__version__ = "0.6.9"
@@ -0,0 +1,387 @@
+"""A searchable archive of every pod's logs
+
+`auto log-collector start` runs a background process that follows every pod
+(see logstream) and appends its lines, with their timestamps, to gzipped
+segment files under ~/.auto/logs/<pod>/ (<pod>/<container>/ for each container
+of a pod with several).  A segment is closed after
+SEGMENT_BYTES of logs or SEGMENT_SECONDS, and the oldest segments are
+deleted once the archive is bigger than MAX_BYTES.
+
+A small sqlite index records each segment's pod, app and first and last
+times, so `auto logs --since/--until/--pod/--grep` only decompresses the
+segments that can hold a match.  The collector picks up where it left off
+when it is restarted.
+"""
+
+import gzip
+import heapq
+import os
+import re
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+from contextlib import closing
+from datetime import datetime
+
+from autocli import logstream, pods
+
+ARCHIVE_DIR = os.path.expanduser("~/.auto/logs")
+PID_FILE = "collector.pid"
+
+# Segment rotation and retention
+SEGMENT_BYTES = 8 * 1024 * 1024
+SEGMENT_SECONDS = 15 * 60
+MAX_BYTES = 1024 * 1024 * 1024
+
+# Seconds between flushes, which make new lines searchable
+FLUSH_INTERVAL = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    pod TEXT NOT NULL,
+    app TEXT NOT NULL,
+    path TEXT NOT NULL,
+    first_time REAL,
+    last_time REAL,
+    last_stamp TEXT,
+    lines INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL DEFAULT 0,
+    closed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS segments_time ON segments (last_time, first_time);
+CREATE INDEX IF NOT EXISTS segments_pod ON segments (pod, app);
+"""
+
+# kubectl's RFC3339 timestamps, with up to nanoseconds and usually a Z
+STAMP = re.compile(r"^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.(\d+))?(Z|[+-]\d\d:\d\d)?$")
+
+# --since 30m, 2h, 1d
+DURATION = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def stamp_time(stamp):
+    """Seconds since the epoch for a kubectl RFC3339 timestamp
+
+    Older Pythons' fromisoformat takes neither a Z nor more than 6 digits of
+    fraction, so both are rewritten first.  Raises ValueError for anything else.
+    """
+    match = STAMP.match(stamp)
+    if not match:
+        raise ValueError(f"{stamp!r} is not a timestamp")
+    whole, fraction, zone = match.groups()
+    if fraction:
+        whole += "." + fraction[:6].ljust(6, "0")
+    zone = "+00:00" if zone in (None, "Z") else zone
+    return datetime.fromisoformat(whole + zone).timestamp()
+
+
+def parse_time(value, now=None):
+    """Seconds since the epoch for a duration ago (30m, 2h, 1d) or an ISO time"""
+    match = DURATION.match(value.strip())
+    if match:
+        return (now or time.time()) - float(match.group(1)) * UNITS[match.group(2)]
+    try:
+        return datetime.fromisoformat(value.strip()).timestamp()
+    except ValueError as error:
+        raise ValueError(f"{value!r} is not a duration (like 30m) or a time") from error
+
+
+def open_index(path=ARCHIVE_DIR):
+    """Connect to the archive's index, creating it if needed"""
+    os.makedirs(path, exist_ok=True)
+    connection = sqlite3.connect(os.path.join(path, "index.sqlite"), timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class Segment:  # pylint: disable=too-many-instance-attributes
+    """One gzipped file of a pod's log lines, being written"""
+
+    def __init__(self, index, path, pod, app):
+        self.index = index
+        self.path = os.path.join(path, pod, f"{time.time_ns()}.log.gz")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = gzip.open(self.path, "wt", encoding="utf-8")
+        self.id = index.execute(
+            "INSERT INTO segments (pod, app, path) VALUES (?, ?, ?)",
+            (pod, app, self.path),
+        ).lastrowid
+        index.commit()
+        self.started = time.monotonic()
+        self.flushed = self.started
+        self.first_time = self.last_time = None
+        self.last_stamp = None
+        self.lines = self.bytes = 0
+
+    @property
+    def full(self):
+        """Is it time to start a new segment?"""
+        return (
+            self.bytes >= SEGMENT_BYTES
+            or time.monotonic() - self.started >= SEGMENT_SECONDS
+        )
+
+    def write(self, stamp, seconds, line):
+        """Append one line (seconds is its stamp_time)"""
+        if self.first_time is None:
+            self.first_time = seconds
+        self.last_time, self.last_stamp = seconds, stamp
+        text = f"{stamp} {line}\n"
+        self.file.write(text)
+        self.lines += 1
+        self.bytes += len(text)
+        if time.monotonic() - self.flushed >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self, closed=False):
+        """Make what was written readable and update the index"""
+        if not self.file.closed:
+            self.file.flush()
+        self.flushed = time.monotonic()
+        self.index.execute(
+            "UPDATE segments SET first_time = ?, last_time = ?, last_stamp = ?, "
+            "lines = ?, size = ?, closed = ? WHERE id = ?",
+            (
+                self.first_time,
+                self.last_time,
+                self.last_stamp,
+                self.lines,
+                os.path.getsize(self.path),
+                int(closed),
+                self.id,
+            ),
+        )
+        self.index.commit()
+
+    def close(self):
+        """Finish the file"""
+        self.file.close()
+        self.flush(closed=True)
+
+
+def prune(index, max_bytes=MAX_BYTES):
+    """Delete the oldest closed segments until the archive fits in max_bytes"""
+    total = index.execute("SELECT coalesce(sum(size), 0) FROM segments").fetchone()[0]
+    oldest = index.execute(
+        "SELECT id, path, size FROM segments WHERE closed = 1 ORDER BY last_time"
+    )
+    doomed = []
+    for segment_id, path, size in oldest:
+        if total <= max_bytes:
+            break
+        doomed.append((segment_id, path))
+        total -= size
+
+    for segment_id, path in doomed:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        index.execute("DELETE FROM segments WHERE id = ?", (segment_id,))
+    index.commit()
+
+
+class Collector(logstream.LogStream):
+    """Follows every pod and writes its lines into the archive"""
+
+    def __init__(self, path=ARCHIVE_DIR):
+        super().__init__(None, tail=-1)
+        self.path = path
+        self.index = open_index(path)
+        self.segments = {}
+        self.apps = {}
+
+        # Carry on after the last line archived for each pod
+        self.resume = dict(
+            self.index.execute(
+                "SELECT pod, last_stamp FROM segments WHERE last_time = "
+                "(SELECT max(last_time) FROM segments latest WHERE latest.pod = segments.pod)"
+            )
+        )
+        self.index.execute("UPDATE segments SET closed = 1")
+        self.index.commit()
+
+    def app_pods(self):
+        """Every pod in the namespace"""
+        every = pods.list_pods()
+        for pod in every:
+            self.apps[pod["metadata"]["name"]] = pods.app_name(pod)
+        return every
+
+    def emit(self, name, stamp, line):
+        segment = self.segments.get(name)
+        if line is None:
+            # The stream ended, its pod is gone
+            if segment:
+                self.segments.pop(name).close()
+                prune(self.index)
+            return
+
+        try:
+            seconds = stamp_time(stamp)
+        except ValueError:
+            # Not a line kubectl stamped, there's no time to file it under
+            return
+
+        if segment and segment.full:
+            self.segments.pop(name).close()
+            prune(self.index)
+            segment = None
+        if not segment:
+            app = self.apps.get(name.split("/")[0], name)
+            segment = self.segments[name] = Segment(self.index, self.path, name, app)
+        segment.write(stamp, seconds, line)
+
+    def idle(self):
+        for segment in self.segments.values():
+            if segment.flushed < time.monotonic() - FLUSH_INTERVAL:
+                segment.flush()
+
+    def stop(self):
+        super().stop()
+        for segment in self.segments.values():
+            segment.close()
+        self.segments.clear()
+
+
+def _raise_interrupt(*_args):
+    raise KeyboardInterrupt
+
+
+def collect(path=ARCHIVE_DIR):
+    """Run the collector until it is stopped (what the background process runs)"""
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    pid_file = os.path.join(path, PID_FILE)
+    os.makedirs(path, exist_ok=True)
+    with open(pid_file, "w", encoding="utf-8") as pid_output:
+        pid_output.write(str(os.getpid()))
+    try:
+        Collector(path).run()
+    finally:
+        os.remove(pid_file)
+
+
+def collector_pid(path=ARCHIVE_DIR):
+    """The running collector's process ID (None if it isn't running)"""
+    try:
+        with open(os.path.join(path, PID_FILE), encoding="utf-8") as pid_input:
+            pid = int(pid_input.read().strip())
+        os.kill(pid, 0)
+    except (OSError, ValueError):
+        return None
+    return pid
+
+
+def start_collector(path=ARCHIVE_DIR):
+    """Start the collector in the background (its PID if it was already running)"""
+    pid = collector_pid(path)
+    if pid:
+        return pid
+
+    os.makedirs(path, exist_ok=True)
+    if getattr(sys, "frozen", False):
+        # A bundled auto is its own interpreter, it runs the hidden command
+        command = [sys.executable, "log-collector", "run"]
+        env = None
+    else:
+        package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        command = [
+            sys.executable,
+            "-c",
+            "from autocli import archive; archive.collect()",
+        ]
+        env = dict(os.environ, PYTHONPATH=package_dir)
+    with open(os.path.join(path, "collector.log"), "ab") as log:
+        process = subprocess.Popen(  # pylint: disable=consider-using-with
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            env=env,
+            start_new_session=True,
+        )
+    return process.pid
+
+
+def stop_collector(path=ARCHIVE_DIR):
+    """Stop the background collector, returning whether it was running"""
+    pid = collector_pid(path)
+    if not pid:
+        return False
+    os.kill(pid, signal.SIGTERM)
+    return True
+
+
+def _read_segment(path, since, until, pattern):
+    """(stamp, line) for the matching lines of a segment"""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8", errors="replace") as source:
+            for raw in source:
+                stamp, _, line = raw.rstrip("\n").partition(" ")
+                if pattern and not pattern.search(line):
+                    continue
+                if since is not None or until is not None:
+                    try:
+                        seconds = stamp_time(stamp)
+                    except ValueError:
+                        continue
+                    if (since is not None and seconds < since) or (
+                        until is not None and seconds > until
+                    ):
+                        continue
+                yield stamp, line
+    except (EOFError, FileNotFoundError):
+        # The segment is still being written (or was just pruned)
+        pass
+
+
+def _read_pod(pod, segments, since, until, pattern):
+    """(stamp, pod, line) for every matching line of a pod, oldest first"""
+    for path, first_time, last_time in segments:
+        # Only lines in segments the window cuts through need their times checked
+        segment_since = since if since is not None and first_time < since else None
+        segment_until = until if until is not None and last_time > until else None
+        for stamp, line in _read_segment(path, segment_since, segment_until, pattern):
+            yield stamp, pod, line
+
+
+def _segments(since, until, pod, path):
+    """{pod: [(path, first time, last time)]} for the segments that can hold a match"""
+    sql = "SELECT pod, path, first_time, last_time FROM segments WHERE lines > 0"
+    params = []
+    if since is not None:
+        sql += " AND last_time >= ?"
+        params.append(since)
+    if until is not None:
+        sql += " AND first_time <= ?"
+        params.append(until)
+    if pod:
+        # A pod's containers are archived as <pod>/<container> when it has several
+        sql += " AND (pod = ? OR pod LIKE ? OR app = ?)"
+        params += [pod, f"{pod}/%", pod]
+
+    with closing(open_index(path)) as index:
+        rows = index.execute(sql + " ORDER BY pod, first_time", params).fetchall()
+
+    by_pod = {}
+    for pod_name, segment_path, first_time, last_time in rows:
+        by_pod.setdefault(pod_name, []).append((segment_path, first_time, last_time))
+    return by_pod
+
+
+def search(since=None, until=None, pod=None, grep=None, path=ARCHIVE_DIR):
+    """(stamp, pod, line) for every archived line matching, in time order"""
+    try:
+        pattern = re.compile(grep) if grep else None
+    except re.error as error:
+        raise ValueError(f"{grep!r} is not a valid regex: {error}") from error
+    streams = [
+        _read_pod(pod_name, segments, since, until, pattern)
+        for pod_name, segments in _segments(since, until, pod, path).items()
+    ]
+    return heapq.merge(*streams, key=lambda item: logstream.stamp_key(item[0]))
@@ -0,0 +1,236 @@
+"""Running pod scripts in many pods at once
+
+`auto seed|init|migrate|rollback --all` run their scripts through plain
+(non-TTY) `kubectl exec` sessions, one per pod, side by side.  Every line a
+pod prints is shown with a colored prefix and kept in a log file per pod
+under ~/.auto/runs.  A pod listed in another pod's `depends-on` finishes
+first, and when it fails the pods depending on it are skipped.
+"""
+
+import os
+import shlex
+import subprocess
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from autocli import utils
+from autocli.config import CONFIG
+from rich.console import Console
+from rich.text import Text
+
+RUN_DIR = os.path.expanduser("~/.auto/runs")
+
+# Prefix colors, handed out in pod order
+COLORS = ["cyan", "magenta", "green", "yellow", "blue", "bright_red"]
+
+
+@dataclass
+class PodRun:
+    """What happened when a pod ran its commands"""
+
+    pod: str
+    returncode: Optional[int] = None
+    output: List[str] = field(default_factory=list)
+    log_file: str = ""
+    skipped: str = ""
+
+    @property
+    def ok(self):
+        """Did every command succeed?"""
+        return self.returncode == 0 and not self.skipped
+
+
+def configured_pods():
+    """The name of every pod in local.yaml"""
+    pods = []
+    for pod in CONFIG.get("pods", []):
+        if isinstance(pod, dict) and "repo" in pod:
+            pods.append(pod["repo"].split("/")[-1:][0].replace(".git", ""))
+        else:
+            pods.append(pod)
+    return pods
+
+
+def dependencies(pods):
+    """{pod: the pods it depends on} among the pods being run"""
+    depends = {}
+    for pod in pods:
+        wanted = utils.get_pod_config(pod).get("depends-on", []) or []
+        depends[pod] = [other for other in wanted if other in pods and other != pod]
+
+    # Refuse to start something that can never finish
+    visiting, done = set(), set()
+
+    def visit(pod, path):
+        if pod in done:
+            return
+        if pod in visiting:
+            raise ValueError(f"depends-on loop: {' -> '.join(path + [pod])}")
+        visiting.add(pod)
+        for other in depends[pod]:
+            visit(other, path + [pod])
+        visiting.discard(pod)
+        done.add(pod)
+
+    for pod in pods:
+        visit(pod, [])
+    return depends
+
+
+def line_printer(pods, console=None):
+    """A print_line(pod, text) that doesn't interleave pods mid-line"""
+    console = console or Console(highlight=False)
+    lock = threading.Lock()
+    width = max(len(pod) for pod in pods)
+    prefixes = {
+        pod: Text(f"{pod:<{width}} | ", style=COLORS[index % len(COLORS)])
+        for index, pod in enumerate(pods)
+    }
+
+    def print_line(pod, text):
+        with lock:
+            console.print(prefixes[pod] + Text(text), soft_wrap=True)
+
+    return print_line
+
+
+def _run_pod(pod, commands, print_line, log_file) -> PodRun:
+    """Run a pod's commands one after the other until one fails"""
+    result = PodRun(pod, log_file=log_file)
+    pod_name = utils.get_full_pod_name(pod).strip()
+    if not pod_name:
+        result.returncode = 1
+        result.output.append(f"{pod} pod is not running")
+        print_line(pod, result.output[-1])
+        return result
+
+    with open(log_file, "w", encoding="utf-8") as log:
+        for command in commands:
+            args = ["kubectl", "exec", pod_name, "--"]
+            args += shlex.split(f"/mnt/code/{pod}/{command}")
+            with subprocess.Popen(
+                args,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                errors="replace",
+            ) as process:
+                for line in process.stdout:
+                    line = line.rstrip("\n")
+                    result.output.append(line)
+                    log.write(line + "\n")
+                    print_line(pod, line)
+            result.returncode = process.returncode
+            if process.returncode:
+                break
+    return result
+
+
+def reverse_dependencies(depends):
+    """{pod: the pods that depend on it}, the order to undo things in"""
+    return {
+        pod: [other for other, wanted in depends.items() if pod in wanted]
+        for pod in depends
+    }
+
+
+def _schedule(pods, depends, run, print_line):
+    """Run pods as soon as what they wait for succeeded, skipping the rest"""
+    results, pending, running = {}, list(pods), {}
+    with ThreadPoolExecutor(max_workers=len(pods) or 1) as executor:
+        while pending or running:
+            for pod in list(pending):
+                if any(other not in results for other in depends[pod]):
+                    continue
+                pending.remove(pod)
+                failed = [other for other in depends[pod] if not results[other].ok]
+                if failed:
+                    results[pod] = PodRun(pod, skipped=f"{', '.join(failed)} failed")
+                    print_line(pod, f"skipped: {results[pod].skipped}")
+                else:
+                    running[executor.submit(run, pod)] = pod
+
+            if running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    results[running.pop(future)] = future.result()
+    return results
+
+
+def run_all(  # pylint: disable=too-many-arguments
+    pods, commands_for, label, after=None, console=None, *, reverse=False
+):
+    """Run each pod's commands concurrently, respecting depends-on
+
+    `commands_for(pod)` gives the commands to run in a pod, `after(pod)` runs
+    once a pod succeeds.  With `reverse` a pod waits for the pods that depend
+    on it instead (undoing things).  Returns {pod: PodRun} in the order pods
+    were given.
+    """
+    depends = dependencies(pods)
+    if reverse:
+        depends = reverse_dependencies(depends)
+    print_line = line_printer(pods, console)
+    run_dir = os.path.join(RUN_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{label}")
+    os.makedirs(run_dir, exist_ok=True)
+
+    def run(pod):
+        result = _run_pod(
+            pod, commands_for(pod), print_line, os.path.join(run_dir, f"{pod}.log")
+        )
+        if result.ok and after:
+            after(pod)
+        return result
+
+    results = _schedule(pods, depends, run, print_line)
+    return {pod: results[pod] for pod in pods}
+
+
+def operation_commands(operation, pod, number=None):
+    """The commands an operation runs in a pod ([] if the pod can't do it)"""
+    config = utils.get_pod_config(pod)
+    if operation == "init":
+        return [config["init-command"]] if config.get("init-command") else []
+    if operation == "seed":
+        if not config.get("seed-command"):
+            return []
+        commands = [config.get("init-command"), config["seed-command"]]
+        return [command for command in commands if command]
+
+    # Migrations use the pod's smalls script
+    if not os.path.isfile(os.path.join(CONFIG.get("code", ""), pod, "smalls.py")):
+        return []
+    if operation == "migrate":
+        return ["./smalls.py migrate"]
+    return [f"./smalls.py rollback {number}"]
+
+
+def run_operation(operation, number=None, console=None):
+    """Run seed, init, migrate or rollback in every pod that supports it"""
+    from autocli import db  # pylint: disable=import-outside-toplevel
+
+    def refresh_templates(pod):
+        try:
+            db.refresh_templates(pod)
+        except db.DatabaseError:
+            pass
+
+    commands = {
+        pod: operation_commands(operation, pod, number) for pod in configured_pods()
+    }
+    pods = [pod for pod, pod_commands in commands.items() if pod_commands]
+    if not pods:
+        return {}
+    return run_all(
+        pods,
+        commands.get,
+        operation,
+        after=refresh_templates if operation == "seed" else None,
+        console=console,
+        # A pod is rolled back only after the pods that depend on it
+        reverse=operation == "rollback",
+    )
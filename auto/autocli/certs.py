@@ -0,0 +1,190 @@
+"""Local HTTPS certificates
+
+mkcert is only run when the certificate we already have can't be used: it is
+missing, doesn't cover every pod domain, is about to expire or was issued by a
+CA that is no longer the installed one.  Those checks only need openssl to
+read the certificate, so a normal `auto start` never runs mkcert (or asks for
+a sudo password).
+"""
+
+import hashlib
+import ipaddress
+import json
+import os
+import re
+import ssl
+import subprocess
+import sys
+import time
+from datetime import timezone
+
+from autocli import utils
+from rich import print as rprint
+
+CERT_DIR = os.path.expanduser("~/.auto/certs")
+STATE_FILE = os.path.join(CERT_DIR, "state.json")
+
+# Names every certificate covers on top of the pod domains
+BASE_NAMES = ["*.local", "localhost", "127.0.0.1", "::1"]
+
+# Regenerate certificates that expire within this many days
+RENEW_DAYS = 30
+
+
+def get_caroot():
+    """Where mkcert keeps its CA (the same lookup mkcert itself does)"""
+    if os.environ.get("CAROOT"):
+        return os.environ["CAROOT"]
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Application Support/mkcert")
+    if sys.platform == "win32":
+        return os.path.join(os.environ.get("LOCALAPPDATA", ""), "mkcert")
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(data_home, "mkcert")
+
+
+def get_ca_fingerprint():
+    """Hash of mkcert's root CA certificate (None if there isn't one yet)"""
+    try:
+        with open(os.path.join(get_caroot(), "rootCA.pem"), "rb") as ca_file:
+            return hashlib.sha256(ca_file.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _load_state():
+    """What we know about the certificate and CA we set up last time"""
+    try:
+        with open(STATE_FILE, encoding="utf-8") as state_file:
+            return json.load(state_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(**updates):
+    """Remember facts about the certificate and CA for the next start"""
+    state = _load_state()
+    state.update(updates)
+    os.makedirs(CERT_DIR, exist_ok=True)
+    with open(STATE_FILE, "w", encoding="utf-8") as state_file:
+        json.dump(state, state_file)
+
+
+def ca_installed():
+    """Has this CA already been installed into the trust stores by us?"""
+    fingerprint = get_ca_fingerprint()
+    return fingerprint is not None and _load_state().get("ca") == fingerprint
+
+
+def _normalize(name):
+    """Compare IP addresses by value (IPv6 can be written many ways)"""
+    try:
+        return str(ipaddress.ip_address(name.strip()))
+    except ValueError:
+        return name.strip().lower()
+
+
+def _read_with_cryptography(cert_file):
+    """(names, expiry) parsed in-process (ImportError without cryptography)"""
+    # pylint: disable=import-outside-toplevel,import-error
+    from cryptography import x509
+
+    with open(cert_file, "rb") as pem:
+        certificate = x509.load_pem_x509_certificate(pem.read())
+    try:
+        san = certificate.extensions.get_extension_for_class(
+            x509.SubjectAlternativeName
+        ).value
+        names = san.get_values_for_type(x509.DNSName) + [
+            str(address) for address in san.get_values_for_type(x509.IPAddress)
+        ]
+    except x509.ExtensionNotFound:
+        names = []
+    expires = getattr(certificate, "not_valid_after_utc", None)
+    if expires is None:
+        expires = certificate.not_valid_after.replace(tzinfo=timezone.utc)
+    return names, expires.timestamp()
+
+
+def _read_with_openssl(cert_file):
+    """(names, expiry) from `openssl x509 -text`, which LibreSSL also prints"""
+    text = subprocess.run(
+        ["openssl", "x509", "-in", cert_file, "-noout", "-text"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    expires = re.search(r"Not After\s*:\s*(.+)", text)
+    if not expires:
+        raise ValueError("no expiry date")
+
+    # X509v3 Subject Alternative Name:
+    #     DNS:*.local, DNS:localhost, IP Address:127.0.0.1, ...
+    san = re.search(r"Subject Alternative Name:.*\n\s*(.+)", text)
+    names = re.findall(r"(?:DNS|IP Address):([^,\s]+)", san.group(1) if san else "")
+    return names, ssl.cert_time_to_seconds(expires.group(1).strip())
+
+
+def read_certificate(cert_file):
+    """The names a certificate covers and when it expires (None if unreadable)"""
+    try:
+        try:
+            names, expires = _read_with_cryptography(cert_file)
+        except ImportError:
+            names, expires = _read_with_openssl(cert_file)
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+    return {"names": {_normalize(name) for name in names}, "expires": expires}
+
+
+def needs_regeneration(key_file, cert_file, domains):
+    """Why the current certificate can't be used ("" if it can)"""
+    if not os.path.isfile(key_file) or not os.path.isfile(cert_file):
+        return "no certificate yet"
+
+    certificate = read_certificate(cert_file)
+    if certificate is None:
+        return "the certificate can't be read"
+
+    missing = {_normalize(name) for name in domains} - certificate["names"]
+    if missing:
+        return f"new domains: {', '.join(sorted(missing))}"
+
+    if certificate["expires"] - time.time() < RENEW_DAYS * 86400:
+        return "the certificate is about to expire"
+
+    if _load_state().get("issuer") != get_ca_fingerprint():
+        return "the local CA changed"
+
+    return ""
+
+
+def ensure_certificates(pod_domains):
+    """Return (key_file, cert_file, changed), only running mkcert when needed"""
+    key_file = os.path.join(CERT_DIR, "key.pem")
+    cert_file = os.path.join(CERT_DIR, "cert.pem")
+    domains = BASE_NAMES + sorted(set(pod_domains))
+
+    reason = needs_regeneration(key_file, cert_file, domains)
+    if not reason and ca_installed():
+        return key_file, cert_file, False
+
+    utils.check_mkcert()
+    if not ca_installed():
+        # Without a trusted CA we try again on the next start
+        if utils.install_local_ca():
+            _save_state(ca=get_ca_fingerprint())
+        # Installing may have created a brand new CA
+        reason = needs_regeneration(key_file, cert_file, domains)
+
+    created = None
+    if reason:
+        rprint(f"  -- Generating certificates ({reason})")
+        created = utils.create_local_certs(
+            CERT_DIR, additional_domains=sorted(set(pod_domains)), install_ca=False
+        )
+        # A failed mkcert leaves the old certificate, which must still be replaced
+        if created:
+            _save_state(issuer=get_ca_fingerprint())
+
+    return key_file, cert_file, bool(created)
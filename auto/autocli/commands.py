@@ -2,15 +2,16 @@
 
   * `--dry-run`     This is for automated testing and visually testing the output
   * `--offline`     This disables steps that require internet so you can work without Internet
+
+Commands import the modules they need when they run so that `--help`,
+`--version` and shell completion don't pay for rich, requests or the config.
 """
 
+# pylint: disable=import-outside-toplevel
 import os
 
 import click
-from autocli import core, registry, services, utils
-from autocli.config import CONFIG
-from rich import print as rprint
-from rich.progress import Progress
+from autocli import __version__, completion
 
 # Global settings for click
 CONTEXT_SETTINGS = {
@@ -21,39 +22,53 @@ CONTEXT_SETTINGS = {
 
 def get_pod_names(ctx, param, incomplete):  # pylint: disable=unused-argument
     """Generate list of pods for shell autocompletion"""
+    pods = completion.load_index().get("pods")
+    if pods is None:
+        pods = _configured_pod_names()
+    return [p_name for p_name in pods if p_name.startswith(incomplete)]
+
+
+def get_namespaces(ctx, param, incomplete):  # pylint: disable=unused-argument
+    """Generate list of namespaces for shell autocompletion"""
+    namespaces = completion.load_index().get("namespaces")
+
+    # Only ask the cluster if nothing has been indexed yet
+    if namespaces is None:
+        from autocli import core
+
+        namespaces = core.refresh_completion_namespaces()
+
+    return [ns for ns in namespaces if ns.startswith(incomplete)]
+
+
+def _configured_pod_names():
+    """Pod names from local.yaml, sorted for display"""
+    from autocli import config
+
     config_path = os.path.expanduser("~/.auto/config/local.yaml")
     if not os.path.isfile(config_path):
         return []
 
     try:
         pods = []
-        for item in CONFIG.get("pods", []):
+        for item in config.read_config_file().get("pods", []):
             if isinstance(item, dict) and "repo" in item:
-                p_name = item["repo"].split("/")[-1:][0].replace(".git", "")
-                if p_name.startswith(incomplete):
-                    pods.append(p_name)
+                pods.append(item["repo"].split("/")[-1:][0].replace(".git", ""))
         return sorted(pods)
     except Exception:  # pylint: disable=broad-except
         return []
 
 
-def get_namespaces(ctx, param, incomplete):  # pylint: disable=unused-argument
-    """Generate list of namespaces for shell autocompletion"""
-    try:
-        output = utils.run_and_return(
-            "kubectl get ns -o jsonpath='{.items[*].metadata.name}'"
-        )
-        if not output:
-            return []
-
-        namespaces = output.split()
-        return [ns for ns in namespaces if ns.startswith(incomplete)]
-    except Exception:  # pylint: disable=broad-except
-        return []
+def refresh_completion_index():
+    """Rebuild the shell completion index from the CLI definition and local.yaml"""
+    sources = {get_pod_names: "pods", get_namespaces: "namespaces"}
+    completion.save_index(
+        pods=_configured_pod_names(), **completion.describe_cli(auto, sources)
+    )
 
 
 @click.group(context_settings=CONTEXT_SETTINGS)
-@click.version_option(version="0.6.9")
+@click.version_option(version=__version__)
 def auto():
     """Commandline utility to assist with creating/deleting clusters and
     starting/stopping pods."""
@@ -64,6 +79,8 @@ def auto():
 @click.pass_context
 def images(self):  # pylint: disable=unused-argument
     """List unique container images running in the cluster (formatted for local.yaml)."""
+    from autocli import registry
+
     registry.list_cluster_images()
 
 
@@ -109,8 +126,17 @@ def autocomplete(shell, do_install):
 @click.argument("pod", required=False, shell_complete=get_pod_names)
 @click.option("--dry-run", is_flag=True, default=False)
 @click.option("--offline", is_flag=True, default=False)
-def start(self, pod, dry_run, offline):  # pylint: disable=unused-argument
+@click.option(
+    "--resume", is_flag=True, default=False, help="Thaw a cluster paused by stop."
+)
+def start(self, pod, dry_run, offline, resume):  # pylint: disable=unused-argument
     """Start a new k3s/k3d cluster or an individual pod"""
+    from autocli import core, pause
+
+    # A paused cluster is already fully set up, so thawing it is all we need
+    if resume and not pod and not dry_run and pause.resume_cluster():
+        return
+
     core.bootstrap_cluster(pod, dry_run, offline)
 
 
@@ -119,8 +145,19 @@ def start(self, pod, dry_run, offline):  # pylint: disable=unused-argument
 @click.argument("pod", required=False, shell_complete=get_pod_names)
 @click.option("--dry-run", is_flag=True, default=False)
 @click.option("--delete-cluster", is_flag=True, default=False)
-def stop(self, pod, dry_run, delete_cluster):  # pylint: disable=unused-argument
+@click.option(
+    "--pause",
+    is_flag=True,
+    default=False,
+    help="Freeze the cluster in memory instead of stopping it.",
+)
+def stop(self, pod, dry_run, delete_cluster, pause):  # pylint: disable=unused-argument
     """Stop the cluster (or delete it)"""
+    from autocli import core
+    from autocli.pause import pause_cluster
+    from rich import print as rprint
+    from rich.progress import Progress
+
     if pod:
         rprint(f"[steel_blue]Stopping the [/]{pod}[steel_blue] pod")
         core.stop_pod(pod)
@@ -130,6 +167,8 @@ def stop(self, pod, dry_run, delete_cluster):  # pylint: disable=unused-argument
             if not dry_run:
                 if delete_cluster:
                     core.delete_cluster(progress, task)
+                elif pause:
+                    pause_cluster(progress, task)
                 else:
                     core.stop_cluster(progress, task)
             else:
@@ -137,32 +176,253 @@ def stop(self, pod, dry_run, delete_cluster):  # pylint: disable=unused-argument
             progress.update(task, advance=50)
 
 
+@auto.group()
+def snapshot():
+    """Save and restore snapshots of a fully started cluster"""
+
+
+@snapshot.command(name="save")
+@click.argument("name")
+def snapshot_save(name):
+    """Snapshot the cluster, its system pods and their data"""
+    from autocli import core
+
+    core.save_snapshot(name)
+
+
+@snapshot.command(name="restore")
+@click.argument("name")
+def snapshot_restore(name):
+    """Recreate the cluster from a snapshot (after --delete-cluster)"""
+    from autocli import core
+
+    core.restore_snapshot(name)
+
+
+@snapshot.command(name="list")
+def snapshot_list():
+    """List saved snapshots"""
+    import time
+
+    from autocli import snapshot as snapshots
+
+    for manifest in snapshots.list_snapshots():
+        created = time.strftime("%Y-%m-%d %H:%M", time.localtime(manifest["created"]))
+        click.echo(f"{manifest['name']:<24} {created}")
+
+
+@auto.group(name="db")
+def db_group():
+    """Branch, dump and load pod databases"""
+
+
+@db_group.command(name="branch")
+@click.argument("pod", shell_complete=get_pod_names)
+@click.argument("name", required=False)
+def db_branch(pod, name):
+    """Clone a pod's seeded postgres databases into a new branch (or list them)"""
+    from autocli import db
+    from autocli.utils import declare_error
+    from rich import print as rprint
+
+    try:
+        if not name:
+            for database in db.pod_databases(pod):
+                current = db.current_branch(database)
+                for branch in db.list_branches(database):
+                    marker = "*" if branch == current else " "
+                    click.echo(f"{marker} {database:<24} {branch}")
+            return
+
+        db.create_branch(pod, name)
+        rprint(f"[steel_blue]{pod} is now using branch [/]{db.branch_name(name)}")
+    except db.DatabaseError as error:
+        declare_error(str(error))
+
+
+@db_group.command(name="switch")
+@click.argument("pod", shell_complete=get_pod_names)
+@click.argument("name")
+def db_switch(pod, name):
+    """Point a pod's postgres databases at another branch (`main` is the original)"""
+    from autocli import db
+    from autocli.utils import declare_error
+    from rich import print as rprint
+
+    try:
+        db.switch(pod, name)
+        rprint(f"[steel_blue]{pod} is now using branch [/]{name}")
+    except db.DatabaseError as error:
+        declare_error(str(error))
+
+
+@db_group.command(name="dump")
+@click.argument("pod", shell_complete=get_pod_names)
+@click.argument("path", type=click.Path(file_okay=False))
+@click.option("--jobs", "-j", default=4, show_default=True, help="Tables at once")
+@click.option(
+    "--compress",
+    type=click.Choice(["zstd", "gzip", "none"]),
+    help="Defaults to zstd when the zstandard module is installed, gzip otherwise",
+)
+def db_dump(pod, path, jobs, compress):
+    """Stream a pod's MySQL and Postgres databases into compressed files"""
+    from autocli import db, dumps
+    from autocli.utils import declare_error
+    from rich import print as rprint
+
+    try:
+        for manifest in dumps.dump_pod(pod, path, jobs, compress):
+            rprint(
+                f"  -- Dumped {manifest['engine']} database [bright_cyan]"
+                f"{manifest['database']}[/] ({len(manifest['tables'])} tables) "
+                f"in {manifest['seconds']}s"
+            )
+    except db.DatabaseError as error:
+        declare_error(str(error))
+
+
+@db_group.command(name="restore")
+@click.argument("path", type=click.Path(exists=True, file_okay=False))
+@click.option("--jobs", "-j", default=4, show_default=True, help="Tables at once")
+def db_restore(path, jobs):
+    """Replace databases with the ones dumped by `auto db dump`"""
+    from autocli import db, dumps
+    from autocli.utils import declare_error
+    from rich import print as rprint
+
+    try:
+        for engine, database in dumps.restore_pod(path, jobs):
+            rprint(f"  -- Restored {engine} database [bright_cyan]{database}")
+    except db.DatabaseError as error:
+        declare_error(str(error))
+
+
+@db_group.command(name="load")
+@click.argument("pod", shell_complete=get_pod_names)
+@click.argument("folder", type=click.Path(exists=True, file_okay=False))
+@click.option("--database", help="Which of the pod's databases to load into")
+@click.option("--jobs", "-j", default=4, show_default=True, help="Tables at once")
+def db_load(pod, folder, database, jobs):
+    """Bulk load <table>.csv / <table>.parquet fixtures into a pod's database"""
+    import time
+
+    from autocli import db, fixtures
+    from autocli.utils import declare_error
+    from rich import print as rprint
+
+    def report(result):
+        rprint(
+            f"  -- [bright_cyan]{result.table}[/]: {result.rows:,} rows in "
+            f"{result.seconds:.1f}s ({result.rate:,.0f} rows/s)"
+        )
+
+    try:
+        engine, database = fixtures.pod_database(pod, database)
+        rprint(f"[steel_blue]Loading fixtures into {engine} database [/]{database}")
+        started = time.monotonic()
+        results = fixtures.load(engine, database, folder, jobs, report)
+    except db.DatabaseError as error:
+        declare_error(str(error))
+        return
+
+    total = fixtures.Result(
+        f"{len(results)} tables",
+        sum(result.rows for result in results),
+        time.monotonic() - started,
+    )
+    report(total)
+
+
 @auto.command()
 @click.pass_context
 @click.argument("pod", required=True, shell_complete=get_pod_names)
 def restart(self, pod):  # pylint: disable=unused-argument
     """Restart (stop / start) a pod"""
+    from autocli import core
+    from rich import print as rprint
+
     rprint(f"[steel_blue]Restarting [/]{pod}[steel_blue] pod")
     core.restart_pod(pod)
 
 
+def _run_all_pods(operation, number=None):
+    """Run an operation in every pod at once, exiting non-zero if any failed"""
+    import sys
+
+    from autocli import batch
+    from autocli.utils import declare_error
+    from rich import print as rprint
+
+    try:
+        results = batch.run_operation(operation, number)
+    except ValueError as error:
+        declare_error(str(error))
+        return
+
+    if not results:
+        rprint(f"[yellow]No pods can {operation}")
+        return
+
+    rprint()
+    for result in results.values():
+        outcome = "[green]ok" if result.ok else "[red]failed"
+        detail = result.skipped or result.log_file
+        rprint(f"  -- {result.pod}: {outcome}[/] {detail}")
+    if not all(result.ok for result in results.values()):
+        sys.exit(1)
+
+
+def _need_pod(pod, all_pods):
+    """A pod or --all is required"""
+    if not pod and not all_pods:
+        raise click.UsageError("Give a pod or use --all")
+
+
 @auto.command()
 @click.pass_context
-@click.argument("pod", required=True, shell_complete=get_pod_names)
-def seed(self, pod):  # pylint: disable=unused-argument
+@click.argument("pod", required=False, shell_complete=get_pod_names)
+@click.option(
+    "--fresh", is_flag=True, help="Run the seed scripts even if a snapshot matches"
+)
+@click.option("--all", "all_pods", is_flag=True, help="Init and seed every pod at once")
+def seed(self, pod, fresh, all_pods):  # pylint: disable=unused-argument
     """Seed a pod's databases"""
+    from autocli import seeds, services
+    from rich import print as rprint
+
+    _need_pod(pod, all_pods)
+    if all_pods:
+        _run_all_pods("seed")
+        return
+
+    # The seeded databases from last time are still good if nothing changed
+    if not fresh and seeds.restore(pod):
+        rprint(f"[steel_blue]Restored seeded databases for [/]{pod}")
+        return
+
     rprint(f"[steel_blue]Initializing[/] {pod}[steel_blue] pod")
-    services.init_pod_db(pod)
+    initialized = services.init_pod_db(pod)
     rprint()
     rprint(f"[steel_blue]Seeding [/]{pod}[steel_blue] pod")
-    services.seed_pod(pod)
+    if services.seed_pod(pod) and initialized:
+        seeds.save(pod)
 
 
 @auto.command()
 @click.pass_context
-@click.argument("pod", required=True, shell_complete=get_pod_names)
-def init(self, pod):  # pylint: disable=unused-argument
+@click.argument("pod", required=False, shell_complete=get_pod_names)
+@click.option("--all", "all_pods", is_flag=True, help="Init every pod at once")
+def init(self, pod, all_pods):  # pylint: disable=unused-argument
     """Init a pod's databases"""
+    from autocli import services
+    from rich import print as rprint
+
+    _need_pod(pod, all_pods)
+    if all_pods:
+        _run_all_pods("init")
+        return
+
     rprint(f"[steel_blue]Initializing [/]{pod}[steel_blue] pod database")
     services.init_pod_db(pod)
 
@@ -171,6 +431,8 @@ def init(self, pod):  # pylint: disable=unused-argument
 @click.pass_context
 def mysql(self):  # pylint: disable=unused-argument
     """Connect to the mysql database"""
+    from autocli import services
+
     services.connect_to_mysql()
 
 
@@ -178,6 +440,8 @@ def mysql(self):  # pylint: disable=unused-argument
 @click.pass_context
 def postgres(self):  # pylint: disable=unused-argument
     """Connect to the postgres database"""
+    from autocli import services
+
     services.connect_to_postgres()
 
 
@@ -185,22 +449,112 @@ def postgres(self):  # pylint: disable=unused-argument
 @click.pass_context
 def minio(self):  # pylint: disable=unused-argument
     """Open Connection to MinIO Server"""
+    from autocli import services
+
     services.connect_to_minio()
 
 
+def _search_logs(pod, since, until, pattern, pod_filter):
+    """Print the archived log lines matching a search"""
+    from autocli import archive
+    from autocli.utils import declare_error
+    from rich.console import Console
+    from rich.text import Text
+
+    try:
+        since = archive.parse_time(since) if since else None
+        until = archive.parse_time(until) if until else None
+        lines = archive.search(since, until, pod_filter or pod, pattern)
+    except ValueError as error:
+        declare_error(str(error))
+        return
+
+    console = Console(highlight=False)
+    for stamp, pod_name, line in lines:
+        console.print(
+            Text(f"{stamp} {pod_name} | ", style="steel_blue") + Text(line),
+            soft_wrap=True,
+        )
+
+
 @auto.command()
-@click.argument("pod", shell_complete=get_pod_names)
+@click.argument("pod", required=False, shell_complete=get_pod_names)
+@click.option("--since", help="Search the archive from a time or ago (30m, 2h, 1d)")
+@click.option("--until", help="Search the archive up to a time or ago")
+@click.option("--grep", "pattern", help="Search the archive for lines matching a regex")
+@click.option(
+    "--pod", "pod_filter", help="Search the archive for an app or pod's lines"
+)
 @click.pass_context
-def logs(self, pod):  # pylint: disable=unused-argument
-    """Output logs for a pod to the terminal"""
+def logs(self, pod, **search):  # pylint: disable=unused-argument
+    """Output logs for a pod to the terminal (or search the log archive)"""
+    from autocli import core
+
+    # Anything to search for means the archive, not the live logs
+    if any(search.values()):
+        _search_logs(pod, **search)
+        return
+
+    if not pod:
+        raise click.UsageError("Give a pod to follow or search with --since/--grep")
     core.output_logs(pod)
 
 
+@auto.group(name="log-collector")
+def log_collector():
+    """Archive every pod's logs in the background for `auto logs --since/--grep`"""
+
+
+@log_collector.command(name="start")
+def log_collector_start():
+    """Start archiving logs into ~/.auto/logs"""
+    from autocli import archive
+    from rich import print as rprint
+
+    pid = archive.start_collector()
+    rprint(f"[steel_blue]Log collector running[/] (pid {pid})")
+
+
+@log_collector.command(name="stop")
+def log_collector_stop():
+    """Stop archiving logs"""
+    from autocli import archive
+    from rich import print as rprint
+
+    if archive.stop_collector():
+        rprint("[steel_blue]Log collector stopped")
+    else:
+        rprint("[yellow]The log collector isn't running")
+
+
+@log_collector.command(name="run", hidden=True)
+def log_collector_run():
+    """Archive logs in the foreground (what `log-collector start` runs)"""
+    from autocli import archive
+
+    archive.collect()
+
+
+@log_collector.command(name="status")
+def log_collector_status():
+    """Is the log collector running?"""
+    from autocli import archive
+    from rich import print as rprint
+
+    pid = archive.collector_pid()
+    if pid:
+        rprint(f"[green]Log collector running[/] (pid {pid})")
+    else:
+        rprint("[yellow]The log collector isn't running")
+
+
 @auto.command()
 @click.argument("pod", shell_complete=get_pod_names)
 @click.pass_context
 def tag(self, pod):  # pylint: disable=unused-argument
     """Build, Tag, and Load a pod container image in the local repository"""
+    from autocli import registry
+
     registry.tag_pod_docker_image(pod)
 
 
@@ -209,23 +563,49 @@ def tag(self, pod):  # pylint: disable=unused-argument
 @click.pass_context
 def upgrade(self, pod):  # pylint: disable=unused-argument
     """Remove container registry, create it again, then repopulate it, then restart the cluster"""
+    from autocli import registry
+
     registry.tag_pod_docker_image(pod)
 
 
 @auto.command()
-@click.argument("pod", shell_complete=get_pod_names)
+@click.argument("pod", required=False, shell_complete=get_pod_names)
+@click.option("--all", "all_pods", is_flag=True, help="Migrate every pod at once")
 @click.pass_context
-def migrate(self, pod):  # pylint: disable=unused-argument
+def migrate(self, pod, all_pods):  # pylint: disable=unused-argument
     """Run database migrations in a pod (using smalls)"""
+    from autocli import core
+
+    _need_pod(pod, all_pods)
+    if all_pods:
+        _run_all_pods("migrate")
+        return
+
     core.migrate_with_smalls(pod)
 
 
 @auto.command()
-@click.argument("pod", shell_complete=get_pod_names)
-@click.argument("number")
+@click.argument("pod", required=False, shell_complete=get_pod_names)
+@click.argument("number", required=False)
+@click.option(
+    "--all",
+    "all_number",
+    metavar="NUMBER",
+    help="Roll every pod back to this migration: rollback --all NUMBER",
+)
 @click.pass_context
-def rollback(self, pod, number):  # pylint: disable=unused-argument
+def rollback(self, pod, number, all_number):  # pylint: disable=unused-argument
     """Rollback database migrations in a pod (using smalls)"""
+    from autocli import core
+
+    if all_number:
+        if pod or number:
+            raise click.UsageError("--all rolls back every pod, don't name a pod")
+        _run_all_pods("rollback", all_number)
+        return
+    if not pod or not number:
+        raise click.UsageError("Give a pod and a migration number (or --all NUMBER)")
+
     core.rollback_with_smalls(pod, number)
 
 
@@ -234,6 +614,8 @@ def rollback(self, pod, number):  # pylint: disable=unused-argument
 @click.argument("git_repo", required=True)
 def install(self, git_repo):  # pylint: disable=unused-argument
     """Install "parent" configuration file from git repo"""
+    from autocli import core
+
     core.install_config_from_repo(git_repo)
 
 
@@ -258,8 +640,10 @@ def install(self, git_repo):  # pylint: disable=unused-argument
     "-w",
     is_flag=True,
     default=False,
-    help="Watch the status (refresh every 3s)",
+    help="Watch the status (updates as pods and containers change)",
 )
 def status(self, namespace, all_namespaces, watch):  # pylint: disable=unused-argument
     """Show the status of the cluster and pods"""
+    from autocli import core
+
     core.show_status(namespace, all_namespaces, watch)
@@ -0,0 +1,239 @@
+"""Fast path shell completion for the auto CLI
+
+The shell runs `auto` on every Tab press so this module is only allowed to use
+the standard library.  Pod and namespace candidates (plus the shape of the
+command tree) are precomputed into a small index file under `~/.auto` by the
+full CLI whenever the config or the cluster changes.
+"""
+
+import json
+import os
+import shlex
+
+from autocli import __version__
+
+INDEX_PATH = os.path.expanduser("~/.auto/completion.json")
+CONFIG_PATH = os.path.expanduser("~/.auto/config/local.yaml")
+
+# Bump when the shape of the index changes so older indexes are rebuilt
+INDEX_FORMAT = 2
+
+
+def _config_mtime():
+    """Return the mtime of local.yaml (or 0 if it doesn't exist yet)"""
+    try:
+        return os.stat(CONFIG_PATH).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def load_index():
+    """Load the completion index, returning an empty dict if it is unreadable"""
+    try:
+        with open(INDEX_PATH, encoding="utf-8") as index_file:
+            return json.load(index_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_index(**updates):
+    """Merge the updated keys into the completion index and write it atomically"""
+    index = load_index()
+    index.update(updates)
+
+    # The pod list comes from local.yaml so stamp which version of it we saw
+    if "pods" in updates:
+        index["config_mtime"] = _config_mtime()
+        index["version"] = __version__
+        index["format"] = INDEX_FORMAT
+
+    try:
+        os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+        tmp_path = f"{INDEX_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as index_file:
+            json.dump(index, index_file)
+        os.replace(tmp_path, INDEX_PATH)
+    except OSError:
+        # Completion is a nicety, never break a command because of it
+        pass
+
+
+def is_fresh(index):
+    """Is the index complete and built from the current config and CLI version?"""
+    return (
+        "commands" in index
+        and index.get("version") == __version__
+        and index.get("format") == INDEX_FORMAT
+        and index.get("config_mtime") == _config_mtime()
+    )
+
+
+def describe_cli(group, sources):
+    """Describe the click command tree in a form the fast path can use.
+
+    `sources` maps a `shell_complete` callback to the index key holding its
+    candidates (e.g. `{get_pod_names: "pods"}`).
+    """
+
+    def describe_params(command):
+        options, args = [], []
+        for param in command.params:
+            source = sources.get(getattr(param, "_custom_shell_complete", None))
+            if param.param_type_name == "argument":
+                args.append(source)
+                continue
+            if getattr(param, "hidden", False):
+                continue
+            takes_value = not (param.is_flag or param.count)
+            for opt in param.opts + param.secondary_opts:
+                options.append([opt, param.help or "", takes_value, source])
+        return options, args
+
+    commands = {}
+    for name, command in group.commands.items():
+        if command.hidden:
+            continue
+        options, args = describe_params(command)
+        commands[name] = {
+            "help": command.get_short_help_str(),
+            "options": options,
+            "args": args,
+        }
+        # Sub-groups (e.g. `auto snapshot save`) carry their own commands
+        if hasattr(command, "commands"):
+            commands[name]["commands"] = describe_cli(command, sources)["commands"]
+
+    group_options, _ = describe_params(group)
+    return {"commands": commands, "group_options": group_options}
+
+
+def _completion_args(shell):
+    """Split the shell's completion environment into (args, incomplete)"""
+    cwords = shlex.split(os.environ.get("COMP_WORDS", ""))
+
+    if shell == "fish":
+        incomplete = os.environ.get("COMP_CWORD", "")
+        args = cwords[1:]
+        # Fish stores the partial word in both COMP_WORDS and COMP_CWORD
+        if incomplete and args and args[-1] == incomplete:
+            args.pop()
+        return args, incomplete
+
+    cword = int(os.environ.get("COMP_CWORD", "0"))
+    args = cwords[1:cword]
+    incomplete = cwords[cword] if cword < len(cwords) else ""
+    return args, incomplete
+
+
+def _format(shell, value, help_text=""):
+    """Format a single candidate the same way click does for each shell"""
+    if shell == "zsh":
+        if help_text:
+            # zsh splits the value from its help at the first unescaped colon
+            value = value.replace(":", r"\:")
+            return f"plain\n{value}\n{help_text}"
+        return f"plain\n{value}\n_"
+    if shell == "fish" and help_text:
+        return f"plain,{value}\t{help_text}"
+    return f"plain,{value}"
+
+
+def _option_candidates(options, args, incomplete):
+    """Options that match the incomplete word and haven't been used yet"""
+    return [
+        (opt, help_text)
+        for opt, help_text, _, _ in options
+        if opt.startswith(incomplete) and opt not in args
+    ]
+
+
+def _value_candidates(index, source, incomplete):
+    """Pod or namespace values that match the incomplete word"""
+    if not source:
+        return []
+    return [
+        (value, "") for value in index.get(source, []) if value.startswith(incomplete)
+    ]
+
+
+def _command_candidates(index, command, args, incomplete):
+    """Work out what to offer for a word typed after a sub-command"""
+
+    options = {opt[0]: opt for opt in command["options"]}
+    if incomplete.startswith("-"):
+        return _option_candidates(command["options"], args, incomplete)
+
+    # Count positional arguments and spot an option that is still waiting for its value
+    positional = 0
+    pending_option = None
+    for arg in args[1:]:
+        if pending_option:
+            pending_option = None
+        elif arg in options and options[arg][2]:
+            pending_option = options[arg]
+        elif not arg.startswith("-"):
+            positional += 1
+
+    if pending_option:
+        return _value_candidates(index, pending_option[3], incomplete)
+
+    if positional < len(command["args"]):
+        return _value_candidates(index, command["args"][positional], incomplete)
+    return []
+
+
+def fast_complete():
+    """Answer a completion request from the index.
+
+    Returns False when the request can't be answered here (the index is
+    missing or stale, or the shell asked for its source script) so the caller
+    can fall back to click's full completion.
+    """
+    shell, _, instruction = os.environ.get("_AUTO_COMPLETE", "").partition("_")
+    if instruction != "complete" or shell not in ("bash", "zsh", "fish"):
+        return False
+
+    index = load_index()
+    if not is_fresh(index):
+        return False
+
+    try:
+        args, incomplete = _completion_args(shell)
+    except ValueError:
+        # Unbalanced quotes on the command line
+        return False
+
+    if "=" in incomplete and incomplete.startswith("-"):
+        # Let click deal with the `--option=value` form
+        return False
+
+    if args and args[0].startswith("-"):
+        return False
+
+    # Walk down through any sub-groups named on the command line
+    group, options = index, index["group_options"]
+    while args and args[0] in group["commands"]:
+        command = group["commands"][args[0]]
+        if "commands" not in command:
+            break
+        group, options, args = command, command["options"], args[1:]
+
+    if not args:
+        if incomplete.startswith("-"):
+            candidates = _option_candidates(options, args, incomplete)
+        else:
+            candidates = [
+                (name, command["help"])
+                for name, command in sorted(group["commands"].items())
+                if name.startswith(incomplete)
+            ]
+    elif args[0] in group["commands"]:
+        command = group["commands"][args[0]]
+        candidates = _command_candidates(index, command, args, incomplete)
+    else:
+        candidates = []
+
+    print(
+        "\n".join(_format(shell, value, help_text) for value, help_text in candidates)
+    )
+    return True
@@ -2,8 +2,9 @@
 
 import os
 import sys
+from collections import UserDict
 
-import yaml
+from autocli import store
 from rich import print as rprint
 from rich.prompt import Confirm
 
@@ -14,6 +15,12 @@ def _fatal_error(msg, exit_code=1):
     sys.exit(exit_code)
 
 
+def read_config_file():
+    """Parse local.yaml as-is (no prompts and no code folder checks)"""
+    config_path = os.path.expanduser("~") + "/.auto/config/local.yaml"
+    return store.load(config_path) or {}
+
+
 def load_config():
     """Load the global auto config"""
     config = {}
@@ -25,8 +32,8 @@ def load_config():
         )
         create_initial_config()
 
-    with open(config_path, encoding="utf-8") as yaml_file:
-        config = yaml.safe_load(yaml_file)
+    # We hand out a mutable copy because commands record state in CONFIG
+    config = store.thaw(store.load(config_path)) or {}
 
     if "code" in config:
         expanded_path = os.path.expanduser(config["code"])
@@ -49,6 +56,52 @@ def load_config():
     return config
 
 
+class LazyConfig(UserDict):  # pylint: disable=too-many-ancestors
+    """The global config, loaded from local.yaml the first time a command reads it.
+
+    Commands like `--help`, `--version` and shell completion never touch it so
+    they don't pay for parsing YAML (or get asked to create the code folder).
+    """
+
+    def __init__(self, loader):  # pylint: disable=super-init-not-called
+        self._loader = loader
+        self._data = None
+
+    @property
+    def data(self):
+        """The underlying dict, loading it on first use"""
+        if self._data is None:
+            self._data = self._loader()
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    def copy(self):
+        """Return a plain dict copy of the loaded config"""
+        return dict(self.data)
+
+    @property
+    def loaded(self):
+        """Has local.yaml been read yet?"""
+        return self._data is not None
+
+    def reload(self):
+        """Forget the loaded config so the next read parses local.yaml again"""
+        self._data = None
+
+
+def pod_config_path(pod_name):
+    """Path to a pod's .auto/config.yaml in the code folder"""
+    return os.path.join(CONFIG["code"], pod_name, ".auto", "config.yaml")
+
+
+def load_pod_config(pod_name):
+    """Read-only view of a pod's .auto/config.yaml (None if the pod has none)"""
+    return store.load(pod_config_path(pod_name))
+
+
 def create_initial_config():
     """Create a default config file if none is present"""
     default_config = """
@@ -66,42 +119,27 @@ pods:
     branch: main
 
 # These are the system pods.  They use the config that comes with auto.
+# Each one is applied from its folder of manifests.
 system-pods:
   - pod:
       name: mysql
       active: false
-      commands:[
-          "kubectl apply -f ~/.auto/k3s/mysql/pv.yaml",
-          "kubectl apply -f ~/.auto/k3s/mysql/pvc.yaml",
-          "kubectl apply -f ~/.auto/k3s/mysql/deployment.yaml",
-          "kubectl apply -f ~/.auto/k3s/mysql/service.yaml",
-          "kubectl apply -f ~/.auto/k3s/mysql/ingress.yaml",
-        ]
+      manifests:
+        - ~/.auto/k3s/mysql/
       databases:
         - name: portal
   - pod:
       name: postgres
       active: false
-      commands:[
-          "kubectl apply -f ~/.auto/k3s/postgres/configmap.yaml",
-          "kubectl apply -f ~/.auto/k3s/postgres/pv.yaml",
-          "kubectl apply -f ~/.auto/k3s/postgres/pvc.yaml",
-          "kubectl apply -f ~/.auto/k3s/postgres/deployment.yaml",
-          "kubectl apply -f ~/.auto/k3s/postgres/service.yaml",
-          "kubectl apply -f ~/.auto/k3s/postgres/ingress.yaml",
-        ]
+      manifests:
+        - ~/.auto/k3s/postgres/
       databases:
         - name: portal
   - pod:
       name: minio
       active: false
-      commands:[
-          "kubectl apply -f ~/.auto/k3s/minio/pv.yaml",
-          "kubectl apply -f ~/.auto/k3s/minio/pvc.yaml",
-          "kubectl apply -f ~/.auto/k3s/minio/deployment.yaml",
-          "kubectl apply -f ~/.auto/k3s/minio/service.yaml",
-          "kubectl apply -f ~/.auto/k3s/minio/ingress.yaml",
-        ]
+      manifests:
+        - ~/.auto/k3s/minio/
       databases:
         - name: portal
 """
@@ -193,5 +231,5 @@ def add_images_to_local_config(new_images):
     _update_config_memory(new_images)
 
 
-# Populate global configuration exactly once on load
-CONFIG = load_config()
+# Populated from local.yaml the first time a command needs it
+CONFIG = LazyConfig(load_config)
@@ -0,0 +1,33 @@
+"""Shared fixtures for the autocli tests"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+from autocli import pods
+
+
+@pytest.fixture(autouse=True)
+def fixture_fresh_pod_listing():
+    """Don't let one test's pod listing answer another test's lookups"""
+    pods.invalidate()
+    yield
+    pods.invalidate()
+
+
+@pytest.fixture(name="fresh_python")
+def fixture_fresh_python():
+    """Run code in a new interpreter and return the last line it printed"""
+
+    def run(code):
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=os.path.dirname(os.path.dirname(__file__)),
+        )
+        return result.stdout.strip().splitlines()[-1]
+
+    return run
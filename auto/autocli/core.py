@@ -6,34 +6,50 @@ import shutil
 import subprocess
 import sys
 import time
-from pathlib import Path
-
-import yaml
-from autocli import registry, services, utils
-from autocli.config import CONFIG
+from concurrent.futures import ThreadPoolExecutor
+
+from autocli import (
+    certs,
+    completion,
+    logstream,
+    manifests,
+    pause,
+    reconcile,
+    registry,
+    retry,
+    services,
+    snapshot,
+    statuswatch,
+    utils,
+)
+from autocli.config import CONFIG, load_pod_config, pod_config_path
 from rich import print as rprint
-from rich.console import Console, Group
-from rich.live import Live
+from rich.console import Console
 from rich.progress import Progress
-from rich.text import Text
 
 
 def _setup_https_certificates(pods):
     """Helper to setup HTTPS certificates interactively"""
     rprint("[deep_sky_blue1]Setting up HTTPS certificates...[/]")
-    utils.check_mkcert()
 
     pod_domains = []
     for repo in pods:
         p_name = repo["repo"].split("/")[-1:][0].replace(".git", "")
         pod_domains.append(f"{p_name}.local")
 
-    cert_path = os.path.expanduser("~") + "/.auto/certs"
-    key_file, cert_file = utils.create_local_certs(
-        cert_path, additional_domains=pod_domains
-    )
+    key_file, cert_file, changed = certs.ensure_certificates(pod_domains)
     rprint(" :white_heavy_check_mark:[green] Certificates Ready")
-    return key_file, cert_file
+    return key_file, cert_file, changed
+
+
+def _apply_tls_secrets(key_file, cert_file):
+    """Create (or update) the TLS secret ingress-nginx serves"""
+    for ns in ["default", "ingress-nginx"]:
+        cmd = (
+            f"kubectl create secret tls local-tls --key {key_file} --cert {cert_file} "
+            f"-n {ns} --dry-run=client -o yaml | kubectl apply -f -"
+        )
+        utils.run_and_wait(cmd, capture_output=True)
 
 
 def _print_access_hints(pods, use_https):
@@ -67,19 +83,17 @@ def _run_bootstrap_step(msg, success_msg, execute, func=None, **kwargs):
 
 def _install_system_sequence(new_cluster):
     """Helper to run the system pod installation block"""
-    services.install_system_pods()
-    if new_cluster:
-        services.create_databases()
+    services.install_system_pods(create_dbs=bool(new_cluster))
 
 
 def bootstrap_cluster(pod, dry_run, offline):
     """Orchestrates the entire start sequence seamlessly."""
     pods = CONFIG.get("pods", [])
     use_https = CONFIG.get("https", False)
-    key_file, cert_file = "", ""
+    key_file, cert_file, certs_changed = "", "", False
 
     if not pod and use_https and not dry_run:
-        key_file, cert_file = _setup_https_certificates(pods)
+        key_file, cert_file, certs_changed = _setup_https_certificates(pods)
 
     if pod:
         rprint(f"[steel_blue]Starting[/] {pod}")
@@ -142,6 +156,11 @@ def bootstrap_cluster(pod, dry_run, offline):
             advance=33,
         )
 
+        # New certificates for an existing cluster just need the secret updated,
+        # ingress-nginx picks up secret changes without a restart
+        if certs_changed and new_cluster is False:
+            _apply_tls_secrets(key_file, cert_file)
+
         # STEP 6: System Pods & Databases
         _run_bootstrap_step(
             "Loading system pods...",
@@ -175,21 +194,35 @@ def bootstrap_cluster(pod, dry_run, offline):
             advance=17,
         )
 
+        # The cluster may have new namespaces so keep tab completion current
+        if not dry_run:
+            refresh_completion_namespaces()
+
         _print_access_hints(pods, use_https)
 
 
+def refresh_completion_namespaces():
+    """Store the cluster's namespaces in the shell completion index"""
+    output = utils.run_and_return(
+        "kubectl get ns -o jsonpath='{.items[*].metadata.name}'"
+    )
+    namespaces = output.split()
+    completion.save_index(namespaces=namespaces)
+    return namespaces
+
+
 def _install_nginx_ingress(use_https, key_file, cert_file):
     """Install and configure Nginx Ingress Controller"""
     rprint("     = Installing Nginx Ingress Controller...")
-    utils.run_and_wait(
-        "helm repo add ingress-nginx https://kubernetes.github.io/ingress-nginx",
-        capture_output=True,
-    )
-    utils.run_and_wait("helm repo update", capture_output=True)
+
+    # Install from the cached chart and images so there's no repo update
+    # (or image pull) on the way to a working cluster
+    chart = registry.get_ingress_chart()
+    images_imported = registry.import_ingress_images()
 
     # Build Helm command
     helm_cmd = (
-        "helm upgrade --install ingress-nginx ingress-nginx/ingress-nginx "
+        f"helm upgrade --install ingress-nginx {chart} "
         "--namespace ingress-nginx --create-namespace "
         "--set controller.service.type=LoadBalancer "
         "--set controller.watchIngressWithoutClass=true "
@@ -197,6 +230,12 @@ def _install_nginx_ingress(use_https, key_file, cert_file):
         "--set controller.admissionWebhooks.enabled=false "
     )
 
+    # Imported images are only known by tag, not by the chart's pinned digest
+    if images_imported:
+        helm_cmd += (
+            "--set controller.image.digest= --set controller.image.digestChroot= "
+        )
+
     # New cluster created, if HTTPS, inject secrets and config Nginx
     if use_https and key_file and cert_file:
         rprint("     = Configuring Cluster HTTPS (Nginx)")
@@ -207,36 +246,15 @@ def _install_nginx_ingress(use_https, key_file, cert_file):
         )
 
         # Create secrets in default and ingress-nginx namespaces
-        for ns in ["default", "ingress-nginx"]:
-            cmd = (
-                f"kubectl create secret tls local-tls --key {key_file} --cert {cert_file} "
-                f"-n {ns} --dry-run=client -o yaml | kubectl apply -f -"
-            )
-            utils.run_and_wait(cmd, capture_output=True)
+        _apply_tls_secrets(key_file, cert_file)
 
-        # Add default cert arg
+        # The default cert is set on the first install so nothing needs a restart
         extra_args = "controller.extraArgs.default-ssl-certificate"
         helm_cmd += f" --set {extra_args}=ingress-nginx/local-tls"
 
     # Run the Helm install silently
     if not utils.run_and_wait(helm_cmd, capture_output=True):
         rprint("     [red]Error installing Nginx Ingress Controller[/red]")
-    else:
-        # Explicitly Patch the Deployment to FORCE the argument if Helm missed it
-        if use_https:
-            patch_cmd = (
-                "kubectl patch deployment ingress-nginx-controller -n ingress-nginx "
-                '--type=json -p=\'[{"op": "add", "path": '
-                '"/spec/template/spec/containers/0/args/-", '
-                '"value": "--default-ssl-certificate=ingress-nginx/local-tls"}]\''
-            )
-            utils.run_and_wait(patch_cmd, capture_output=True, suppress_error=True)
-
-        # Force restart Nginx pods to ensure they pick up the new certificate
-        utils.run_and_wait(
-            "kubectl rollout restart deployment ingress-nginx-controller -n ingress-nginx",
-            capture_output=True,
-        )
 
 
 def _verify_and_heal_connection():
@@ -255,23 +273,73 @@ def _verify_and_heal_connection():
             )
 
 
+def write_cluster_config(use_https):
+    """Generate the k3d config for the cluster from local.yaml"""
+    import yaml  # pylint: disable=import-outside-toplevel
+
+    # I'm opening port 8088 (or 80/443 for HTTPS) for access to the sites
+    web_ports = ["80:80", "443:443"] if use_https else ["8088:80"]
+    ports = [{"port": port, "nodeFilters": ["loadbalancer"]} for port in web_ports]
+
+    # Plus the database ports for the system pods we are going to start
+    required_pods = utils.get_required_system_pods(CONFIG)
+    for mapping in services.get_system_pod_ports(required_pods):
+        ports.append(
+            {
+                "port": f"{mapping['host']}:{mapping['lb']}",
+                "nodeFilters": ["loadbalancer"],
+            }
+        )
+
+    # Node state lives in named volumes so it can be snapshotted
+    agents = CONFIG.get("agents", 1)
+    snapshot.create_volumes(agents)
+
+    k3s_dir = os.path.expanduser("~/.auto/k3s")
+    with open(f"{k3s_dir}/registries.yaml", encoding="utf-8") as registries:
+        registry_config = registries.read()
+
+    cluster_config = {
+        "apiVersion": "k3d.io/v1alpha5",
+        "kind": "Simple",
+        "metadata": {"name": "k3s-default"},
+        "servers": 1,
+        "agents": agents,
+        "kubeAPI": {"hostPort": "6550"},
+        "volumes": [{"volume": f"{CONFIG['code']}:/mnt/code"}]
+        + snapshot.cluster_volumes(agents),
+        "ports": ports,
+        "registries": {
+            "use": ["k3d-registry.local:12345"],
+            "config": registry_config,
+        },
+        "options": {
+            "k3s": {
+                "extraArgs": [{"arg": "--disable=traefik", "nodeFilters": ["server:0"]}]
+            }
+        },
+    }
+
+    config_path = f"{k3s_dir}/cluster.yaml"
+    with open(config_path, "w", encoding="utf-8") as config_file:
+        yaml.safe_dump(cluster_config, config_file, sort_keys=False)
+    return config_path
+
+
 def start_cluster(progress, task, key_file="", cert_file=""):
     """Start a K3D cluster and return if it is new (true) or existing (false)"""
 
     # HTTPS Setup
     use_https = CONFIG.get("https", False)
-    load_bal_config = '--api-port 6550 -p "8088:80@loadbalancer"'
-
-    if use_https:
-        load_bal_config = (
-            '--api-port 6550 -p "80:80@loadbalancer" -p "443:443@loadbalancer"'
-        )
 
     # 1. CHECK EXISTING CLUSTER
     bash_command = """/usr/local/bin/k3d cluster list"""
     if utils.run_and_wait(bash_command, check_result="k3s-default"):
         rprint("  -- Found existing cluster")
 
+        # Thaw it first if it was paused with `auto stop --pause`
+        pause.resume_cluster()
+
         # Ensure context is current
         utils.run_and_wait(
             "k3d kubeconfig merge k3s-default --kubeconfig-switch-context",
@@ -297,19 +365,10 @@ def start_cluster(progress, task, key_file="", cert_file=""):
     if use_https:
         rprint("  -- [bold green]HTTPS Enabled[/]: Binding ports 80/443")
 
-    code_dir = CONFIG["code"]
-    # I'm opening port 8088 outside the cluster for access to the sites
-    # Ports for databases are dynamically opened when needed by pods
-    bash_command = (
-        f"/usr/local/bin/k3d cluster create "
-        f"--volume {code_dir}:/mnt/code "
-        f"--registry-use k3d-registry.local:12345 "
-        f"--registry-config ~/.auto/k3s/registries.yaml "
-        f"{load_bal_config} "
-        f'--k3s-arg "--disable=traefik@server:0" '
-        # f"--network k3d-vpn-net "
-        f"--agents 1"
-    )
+    # Everything the cluster needs (ports, registry, volumes) is declared up
+    # front so k3d never has to recreate the load balancer to add a port
+    config_path = write_cluster_config(use_https)
+    bash_command = f"/usr/local/bin/k3d cluster create --config {config_path}"
 
     # Attempt creation.
     # Changed capture_output to True to suppress verbose k3d INFO logs.
@@ -330,17 +389,11 @@ def start_cluster(progress, task, key_file="", cert_file=""):
     # Install and Configure Nginx
     _install_nginx_ingress(use_https, key_file, cert_file)
 
-    # Wait for the Ingress Controller to be ready
+    # Wait for the Ingress Controller to be ready.  Admission webhooks are
+    # disabled so there are no setup jobs to wait for or clean up.
     if utils.wait_for_pod_status("ingress-nginx-controller", "Running"):
-        progress.update(task, advance=5)
-
-    # Let's remove the completed nginx job containers
-    if utils.wait_for_pod_status("ingress-nginx-admission-create", "Complete"):
-        progress.update(task, advance=5)
-    bash_command = """kubectl delete pod -n ingress-nginx \
-                      --field-selector=status.phase==Succeeded"""
-    if utils.run_and_wait(bash_command):
-        print("     = Pods finished starting.  Removed completed setup pods.")
+        progress.update(task, advance=10)
+        print("     = Pods finished starting.")
 
     return True
 
@@ -348,6 +401,7 @@ def start_cluster(progress, task, key_file="", cert_file=""):
 def stop_cluster(progress, task) -> None:
     """Stop the cluster"""
 
+    pause.unpause_for_shutdown()
     print("  -- Stopping cluster")
     bash_command = """/usr/local/bin/k3d cluster stop"""
     utils.run_and_wait(bash_command)
@@ -357,6 +411,7 @@ def stop_cluster(progress, task) -> None:
 def delete_cluster(progress, task) -> None:
     """Delete the cluster"""
 
+    pause.unpause_for_shutdown()
     rprint("  -- Deleting cluster :skull::skull:")
 
     # Explicitly target k3s-default
@@ -396,6 +451,9 @@ def delete_cluster(progress, task) -> None:
             )
 
             if k3d_gone and docker_gone:
+                completion.save_index(namespaces=[])
+                reconcile.reset()
+                snapshot.remove_volumes()
                 progress.update(task, advance=50)
                 return
 
@@ -413,6 +471,76 @@ def delete_cluster(progress, task) -> None:
     )
 
 
+def save_snapshot(name) -> None:
+    """Save the whole cluster (node state and system pod data) as a snapshot"""
+
+    try:
+        snapshot.snapshot_path(name)
+    except ValueError as error:
+        utils.declare_error(str(error))
+        return
+
+    agents = CONFIG.get("agents", 1)
+    config_path = os.path.expanduser("~/.auto/k3s/cluster.yaml")
+
+    # Clusters created before snapshots existed keep their state in the nodes
+    if not snapshot.has_volumes(agents) or not os.path.isfile(config_path):
+        utils.declare_error(
+            """This cluster can't be snapshotted because it was created by an older auto.
+       Recreate it with `auto stop --delete-cluster` and `auto start` first."""
+        )
+        return
+
+    # Stop the cluster so k3s and the databases flush everything to disk
+    was_running = utils.get_cluster_status()[0] == "Running"
+    rprint("  -- Stopping cluster for a consistent snapshot")
+    utils.run_and_wait("k3d cluster stop k3s-default")
+
+    rprint(f"  -- Saving snapshot [bright_cyan]{name}[/]")
+    saved = snapshot.save_volumes(name, agents, config_path)
+
+    if was_running:
+        rprint("  -- Starting cluster")
+        utils.run_and_wait("k3d cluster start k3s-default")
+        _verify_and_heal_connection()
+
+    if not saved:
+        utils.declare_error(f"Failed to save snapshot {name}")
+    rprint(f"  -- [bold green]Snapshot {name} saved")
+
+
+def restore_snapshot(name) -> None:
+    """Create the cluster from a snapshot instead of bootstrapping it"""
+
+    if snapshot.load_manifest(name) is None:
+        utils.declare_error(f"There is no snapshot named {name}")
+        return
+
+    if utils.run_and_wait("k3d cluster list", check_result="k3s-default"):
+        utils.declare_error("""A cluster already exists.
+       Remove it with `auto stop --delete-cluster` before restoring a snapshot.""")
+        return
+
+    rprint(f"  -- Restoring snapshot [bright_cyan]{name}[/]")
+    if not snapshot.restore_volumes(name):
+        utils.declare_error(f"Failed to restore the volumes for snapshot {name}")
+
+    # The cluster is created exactly as it was when the snapshot was taken
+    registry.start_registry()
+    config_path = os.path.join(snapshot.snapshot_path(name), "cluster.yaml")
+    if not utils.run_and_wait(
+        f"/usr/local/bin/k3d cluster create --config {config_path}"
+    ):
+        utils.declare_error("Failed to create k3d cluster from the snapshot.")
+    utils.run_and_wait("k3d kubeconfig merge k3s-default --kubeconfig-switch-context")
+    _verify_and_heal_connection()
+
+    # What was applied is whatever the snapshot's cluster had
+    reconcile.reset()
+    refresh_completion_namespaces()
+    rprint(f"  -- [bold green]Snapshot {name} restored")
+
+
 def stop_pod(pod) -> None:
     """Stop a single pod"""
 
@@ -425,15 +553,18 @@ def stop_pod(pod) -> None:
     else:
         pod_name = pod
 
+    # The next start should apply this pod again
+    reconcile.forget(f"pod.{pod_name}")
+
     # Is the pod running?
     if not utils.run_and_wait("""kubectl get pods""", check_result=pod_name):
         rprint(f"    -- {pod_name}[steel_blue] was not running")
         return
 
     # Attempt to load config to perform a clean stop
-    config_file_path = Path(code_dir) / pod_name / ".auto" / "config.yaml"
+    pod_config = load_pod_config(pod_name)
 
-    if not config_file_path.is_file():
+    if pod_config is None:
         # Fallback for pods without local config
         rprint(
             f"    [yellow]Warning: Config not found for {pod_name}. Trying helm uninstall...[/]"
@@ -441,9 +572,6 @@ def stop_pod(pod) -> None:
         utils.run_and_wait(f"helm uninstall {pod_name}")
         return
 
-    with open(config_file_path, encoding="utf-8") as pod_yaml:
-        pod_config = yaml.safe_load(pod_yaml)
-
     # Determine stop strategy based on start command
     start_cmd = pod_config.get("command", "")
 
@@ -478,6 +606,13 @@ def stop_pod(pod) -> None:
         utils.run_and_wait(f"helm uninstall {pod_name}")
 
 
+# The PV and PVC for the code folder every pod mounts
+CODE_VOLUME_MANIFESTS = [
+    os.path.expanduser("~/.auto/k3s/pv.yaml"),
+    os.path.expanduser("~/.auto/k3s/pvc.yaml"),
+]
+
+
 def _recover_pvc_conflict(pod_name):
     """Helper to attempt fixing deployment conflicts without destroying shared volumes"""
     rprint("       [italic]Attempting to clean up previous deployment states...[/]")
@@ -503,13 +638,7 @@ def _recover_pvc_conflict(pod_name):
         time.sleep(2)
 
     # 3. Always ensure the global PV and PVC are correctly applied
-    user_path = os.path.expanduser("~")
-    utils.run_and_wait(
-        f"kubectl apply -f {user_path}/.auto/k3s/pv.yaml", suppress_error=True
-    )
-    utils.run_and_wait(
-        f"kubectl apply -f {user_path}/.auto/k3s/pvc.yaml", suppress_error=True
-    )
+    manifests.apply(CODE_VOLUME_MANIFESTS, "the code volume")
 
 
 def _build_install_command(pod_config, pod_name, code_dir):
@@ -536,34 +665,49 @@ def _build_install_command(pod_config, pod_name, code_dir):
     return command, is_helm, release_name
 
 
-def _execute_pod_install(command, pod_folder, pod_name, is_helm, release_name):
+def _execute_pod_install(
+    command, pod_folder, pod_name, is_helm, release_name, upgrade=False
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
     """Helper to execute the installation command with retries"""
+    # A failed update leaves the running pod alone, it is never torn down
+    if upgrade:
+        if utils.run_and_wait(command, cwd=pod_folder, suppress_error=False):
+            rprint(f"     * [bright_cyan]: {pod_name}[/] updated")
+            return True
+        rprint(
+            f"     * [red]: {pod_name}[/] failed to update, the running version was kept."
+        )
+        return False
+
     # FIRST ATTEMPT: Run silently to avoid scary error messages for known issues
     if utils.run_and_wait(command, cwd=pod_folder, suppress_error=True):
         rprint(f"     * [bright_cyan]: {pod_name}[/] installed")
-    else:
-        # If failed, attempt auto-fix silently
-        _recover_pvc_conflict(pod_name)
+        return True
 
-        # If it was Helm, try to uninstall the partial/failed release before retrying
-        if is_helm:
-            utils.run_and_wait(
-                f"helm uninstall {release_name}",
-                capture_output=True,
-                suppress_error=True,
-            )
+    # If failed, attempt auto-fix silently
+    _recover_pvc_conflict(pod_name)
 
-        # RETRY INSTALLATION
-        if utils.run_and_wait(command, cwd=pod_folder, suppress_error=False):
-            rprint(f"     * [bright_cyan]: {pod_name}[/] installed")
-        else:
-            rprint(
-                f"     * [red]: {pod_name}[/] failed to install. Check the output above for errors."
-            )
+    # If it was Helm, try to uninstall the partial/failed release before retrying
+    if is_helm:
+        utils.run_and_wait(
+            f"helm uninstall {release_name}",
+            capture_output=True,
+            suppress_error=True,
+        )
 
+    # RETRY INSTALLATION
+    if utils.run_and_wait(command, cwd=pod_folder, suppress_error=False):
+        rprint(f"     * [bright_cyan]: {pod_name}[/] installed")
+        return True
+
+    rprint(
+        f"     * [red]: {pod_name}[/] failed to install. Check the output above for errors."
+    )
+    return False
 
-def start_pod(pod) -> None:
-    """Start a single pod"""
+
+def start_pod(pod, running_pods=None) -> None:
+    """Start a single pod (or update it if its desired state changed)"""
 
     # Local Vars
     code_dir = CONFIG["code"]
@@ -574,24 +718,23 @@ def start_pod(pod) -> None:
     else:
         pod_name = pod
 
-    # Is this pod already running?
-    if utils.run_and_wait("""kubectl get pods""", check_result=pod_name):
-        rprint(f"       * {pod_name}: [steel_blue]already running")
-        return
+    # Callers starting many pods list the running ones once for all of them
+    if running_pods is None:
+        running_pods = reconcile.get_running_pods()
+    running = reconcile.is_running(pod_name, running_pods)
 
-    # If we aren't running let's start via helm install or kubectl apply
-    config_file_path = Path(code_dir) / pod_name / ".auto" / "config.yaml"
+    pod_config = load_pod_config(pod_name)
 
-    if not config_file_path.is_file():
+    if pod_config is None:
+        if running:
+            rprint(f"       * {pod_name}: [steel_blue]already running")
+            return
         utils.declare_error(
-            f"[bold red]Error: Configuration file not found at: {config_file_path}[/bold red]",
+            f"[bold red]Error: Configuration file not found at: {pod_config_path(pod_name)}[/bold red]",
             exit_auto=True,
         )
         return
 
-    with open(config_file_path, encoding="utf-8") as pod_yaml:
-        pod_config = yaml.safe_load(pod_yaml)
-
     # Prepare execution directory (repo folder)
     pod_folder = os.path.join(code_dir, pod_name)
 
@@ -599,38 +742,63 @@ def start_pod(pod) -> None:
         pod_config, pod_name, code_dir
     )
 
+    # Hash everything the install reads so we can tell if anything changed
+    state_key = f"pod.{pod_name}"
+    extra_paths = [f"{code_dir}/{pod_name}/.auto/helm"] if is_helm else []
+    digest = reconcile.fingerprint(
+        [command], extra_paths, settings=pod_config, cwd=pod_folder
+    )
+
+    if running:
+        applied = reconcile.get_applied().get(state_key)
+        if applied in (None, digest):
+            # Pods started before we tracked state are adopted as they are
+            if applied is None:
+                reconcile.record(state_key, digest)
+            rprint(f"       * {pod_name}: [steel_blue]already running")
+            return
+
+        # Running but out of date, so update it in place
+        rprint(f"       * {pod_name}: [steel_blue]changed, updating")
+        if is_helm:
+            command = command.replace("helm install", "helm upgrade --install", 1)
+
     # Run the pod install command inside the repo directory
-    _execute_pod_install(command, pod_folder, pod_name, is_helm, release_name)
+    if _execute_pod_install(
+        command, pod_folder, pod_name, is_helm, release_name, upgrade=running
+    ):
+        reconcile.record(state_key, digest)
 
 
 def restart_pod(pod) -> None:
     """Stop then start a pod"""
 
-    # How many times are we going to try this?
-    max_retries = 15
-
     stop_pod(pod)
-    while utils.verify_pod_is_installed(pod) and max_retries >= 1:
+    try:
+        retry.call(
+            lambda: not utils.verify_pod_is_installed(pod),
+            retry.STARTUP,
+            name=f"stop {pod}",
+        )
+    except retry.RetryError:
         rprint(f"       * [steel_blue]Portal [/]{pod} [steel_blue]still running")
-        time.sleep(2)
-        max_retries -= 1
     start_pod(pod)
 
 
 def install_pods_in_cluster() -> None:
     """Install Pods into the cluster"""
 
-    # Let's setup the code directory PV and PVC in k3s
-    user_path = os.path.expanduser("~")
-    command = f"kubectl apply -f {user_path}/.auto/k3s/pv.yaml"
-    utils.run_and_wait(command)
-    command = f"kubectl apply -f {user_path}/.auto/k3s/pvc.yaml"
-    utils.run_and_wait(command)
+    # Let's setup the code directory PV and PVC in k3s (unless they're unchanged)
+    digest = reconcile.fingerprint([], extra_paths=CODE_VOLUME_MANIFESTS)
+    if not reconcile.is_current("code-volume", digest):
+        if manifests.apply(CODE_VOLUME_MANIFESTS, "the code volume"):
+            reconcile.record("code-volume", digest)
 
     # Now let's start all the pods
     rprint("  -- Pods:")
+    running_pods = reconcile.get_running_pods()
     for pod in CONFIG["pods"]:
-        start_pod(pod)
+        start_pod(pod, running_pods)
 
 
 def output_logs(pod):
@@ -642,61 +810,40 @@ def output_logs(pod):
         rprint("[red]ERROR: Development cluster is not running!")
         return
 
-    pod_name = utils.get_full_pod_name(pod)
-
-    if not pod_name:
+    if not utils.get_full_pod_name(pod):
         utils.declare_error(f"Pod not found: {pod}")
 
-    # Dynamically find the Node IP (often the source of the health check)
-    node_ip = utils.run_and_return(
-        "kubectl get nodes -o jsonpath='{.items[0].status.addresses[?(@.type==\"InternalIP\")].address}'"
-    )
-
-    rprint(f"Printing logs for {pod_name}")
+    rprint(f"Printing logs for every {pod} pod")
     rprint("[italic]Filtering out health checks (kube-probe, node-ip, 10.42.x.1)...[/]")
     rprint("[steel_blue]Press ^C to exit")
 
-    # Build the filter command
-    # 1. --line-buffered removes any lag issue (grep usually buffers heavily on pipes)
-    # 2. -v "kube-probe" filters standard HTTP health checks regardless of IP
-    # 3. -v node_ip filters TCP checks coming from the kubelet
-    filters = [
-        'grep --line-buffered -v "kube-probe"',
-        'grep --line-buffered -v "10.42.0.1 "',
-        'grep --line-buffered -v "10.42.1.1 "',
-    ]
-
-    if node_ip:
-        filters.append(f'grep --line-buffered -v "{node_ip}"')
-
-    filter_cmd = " | ".join(filters)
-
-    # Run kubectl logs piped through our filters
-    # os.system gives a direct stream without a python buffer
-    os.system(f"kubectl logs -f {pod_name} | {filter_cmd}")
+    # Every replica is followed, including pods that replace them
+    skip = logstream.health_filter(logstream.node_ip())
+    logstream.LogStream(pod, skip).run()
 
 
 def verify_dependencies():
     """Verify the system has what it needs to run auto"""
 
-    # If there are errors let's get a count of them
-    errors = 0
-
-    # Check for the docker daemon running and command being available
-    errors += utils.check_docker()
-
-    # Check for k3d and kubectl
-    errors += utils.check_k8s()
-
-    # Check for helm
-    errors += utils.check_helm()
-
-    # Check for hosts entries
-    errors += utils.check_registry_host_entry()
-
-    if errors:
-        rprint(f"[red]There were {errors} so we stopped the command[/red]")
-        sys.exit(1)
+    # Skip the checks if nothing they look at has changed since they last passed
+    fingerprint = utils.dependency_fingerprint()
+    if not utils.dependencies_verified(fingerprint):
+        # Docker, k3d/kubectl, helm and the hosts entries are independent of
+        # each other so check them all at once
+        checks = [
+            utils.check_docker,
+            utils.check_k8s,
+            utils.check_helm,
+            utils.check_registry_host_entry,
+        ]
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            errors = sum(executor.map(lambda check: check(), checks))
+
+        if errors:
+            rprint(f"[red]There were {errors} so we stopped the command[/red]")
+            sys.exit(1)
+
+        utils.save_dependency_fingerprint(fingerprint)
 
     # If HTTPS is enabled, check for mkcert and certutil
     if CONFIG.get("https", False):
@@ -714,54 +861,25 @@ def show_status(namespace="default", all_namespaces=False, watch=False):
 
     def generate_content():
         """Generate the renderable content (Group) for the status"""
-        items = []
-
-        # Header
-        items.append(Text("Auto Status", style="deep_sky_blue1 bold"))
-        items.append(Text(""))  # Spacer
-
-        # 1. Check K3d Cluster
-        c_stat, c_style = utils.get_cluster_status()
-        items.append(Text.assemble(" Cluster:  ", (c_stat, c_style)))
-
-        # 2. Check Registry
-        r_stat, r_style = utils.get_registry_status()
-        items.append(Text.assemble(" Registry: ", (r_stat, r_style)))
-
-        # If the cluster is stopped, we can't show pods
-        if c_stat != "Running":
-            items.append(
-                Text(
-                    "\nCluster is stopped. Run 'auto start' to start it.",
-                    style="italic",
-                )
-            )
-            return Group(*items)
+        cluster_status = utils.get_cluster_status()
+        registry_status = utils.get_registry_status()
+        if cluster_status[0] != "Running":
+            return statuswatch.status_group(cluster_status, registry_status)
 
-        # 3. Pods Table
-        items.append(Text(""))  # Spacer
         table_title = (
             "Pods (All Namespaces)"
             if all_namespaces
             else f"Pods (Namespace: {namespace})"
         )
-        items.append(Text(table_title, style="deep_sky_blue1"))
-
-        # Build the table using helper
-        items.append(utils.build_pod_table(namespace, all_namespaces))
-
-        return Group(*items)
+        table = utils.build_pod_table(namespace, all_namespaces)
+        return statuswatch.status_group(
+            cluster_status, registry_status, table_title, table
+        )
 
     # Main Execution Logic
     if watch:
-        # Use Live to update in-place without strobe
-        with Live(generate_content(), console=console, refresh_per_second=4) as live:
-            while True:
-                try:
-                    time.sleep(3)
-                    live.update(generate_content())
-                except KeyboardInterrupt:
-                    break
+        # Events keep the screen current, nothing is polled
+        statuswatch.StatusWatch(namespace, all_namespaces, console).run()
     else:
         # Just print once
         rprint(generate_content())
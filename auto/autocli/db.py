@@ -0,0 +1,208 @@
+"""Postgres database branches
+
+Every Postgres database a pod uses keeps a `<db>__template` copy of its seeded
+state.  A branch is a clone of that template made with CREATE DATABASE
+... TEMPLATE, which copies the files directly instead of replaying the seed.
+
+The pod keeps connecting to `<db>`: switching renames the active database
+back to `<db>__<its branch>` and the chosen branch to `<db>`, so no pod config
+changes and no restart is needed.  The active branch is recorded as a comment
+on the database itself, so it survives snapshots and restores.
+"""
+
+import re
+import subprocess
+
+from autocli import utils
+
+TEMPLATE = "template"
+MAIN = "main"
+
+# Marks the active database with the branch it came from
+COMMENT_PREFIX = "auto-branch:"
+
+# Postgres identifiers are cut off after 63 bytes
+MAX_NAME = 63
+
+
+class DatabaseError(Exception):
+    """A database command failed or was asked for something impossible"""
+
+
+def ident(name):
+    """Quote a Postgres identifier"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def mysql_ident(name):
+    """Quote a (possibly schema qualified) MySQL identifier"""
+    return ".".join("`" + part.replace("`", "``") + "`" for part in name.split("."))
+
+
+def literal(value):
+    """Quote a Postgres string literal"""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def pod_databases(pod, engine="postgres"):
+    """The databases a pod asks an engine for"""
+    config = utils.get_pod_config(pod)
+    return [
+        database["name"]
+        for system_pod in config.get("system-pods", [])
+        if system_pod.get("name") == engine
+        for database in system_pod.get("databases", [])
+    ]
+
+
+def branch_name(name):
+    """A branch name that can be part of a database name (feature/X-1 -> feature_x_1)"""
+    clean = re.sub(r"[^a-z0-9_]+", "_", name.lower()).strip("_")
+    if not clean or clean == TEMPLATE:
+        raise DatabaseError(f"{name!r} can't be used as a branch name")
+    return clean
+
+
+def branch_database(database, branch):
+    """The name a database has while a branch isn't active"""
+    name = f"{database}__{branch}"
+    if len(name.encode("utf-8")) > MAX_NAME:
+        raise DatabaseError(f"{name} is longer than Postgres allows")
+    return name
+
+
+def psql(script):
+    """Run a SQL script in the postgres pod and return its unaligned output"""
+    pod_name = utils.get_full_pod_name("postgres").strip()
+    if not pod_name:
+        raise DatabaseError("the postgres pod is not running")
+
+    result = subprocess.run(
+        ["kubectl", "exec", "-i", pod_name, "--"]
+        + ["psql", "-U", "root", "-d", "postgres", "-v", "ON_ERROR_STOP=1", "-Atq"],
+        input=script,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode:
+        raise DatabaseError(result.stderr.strip())
+    return result.stdout
+
+
+def _locked(databases, script):
+    """Run a script with every session to these databases closed and kept out"""
+    lock = "".join(
+        f"ALTER DATABASE {ident(name)} WITH ALLOW_CONNECTIONS false;\n"
+        "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+        f"WHERE datname = {literal(name)} AND pid <> pg_backend_pid();\n"
+        for name in databases
+    )
+    try:
+        return psql(lock + script)
+    finally:
+        # Let the app back in whatever happened (a renamed database is skipped)
+        psql(
+            "".join(
+                "SELECT format('ALTER DATABASE %I WITH ALLOW_CONNECTIONS true', datname) "
+                f"FROM pg_database WHERE datname = {literal(name)}\\gexec\n"
+                for name in databases
+            )
+        )
+
+
+def existing_databases():
+    """Every database in the postgres pod"""
+    return set(psql("SELECT datname FROM pg_database;").split())
+
+
+def current_branch(database):
+    """The branch the pod is using for a database"""
+    comment = psql(
+        "SELECT coalesce(shobj_description(oid, 'pg_database'), '') "
+        f"FROM pg_database WHERE datname = {literal(database)};"
+    ).strip()
+    if comment.startswith(COMMENT_PREFIX):
+        return comment.removeprefix(COMMENT_PREFIX)
+    return MAIN
+
+
+def list_branches(database):
+    """Every branch of a database, the active one included"""
+    prefix = f"{database}__"
+    names = {
+        name.removeprefix(prefix)
+        for name in existing_databases()
+        if name.startswith(prefix) and name != prefix + TEMPLATE
+    }
+    names.add(current_branch(database))
+    return sorted(names)
+
+
+def refresh_templates(pod):
+    """Make each of a pod's databases the template new branches are cloned from"""
+    databases = pod_databases(pod)
+    if not databases:
+        return
+    _locked(
+        databases,
+        "".join(
+            f"DROP DATABASE IF EXISTS {ident(branch_database(name, TEMPLATE))};\n"
+            f"CREATE DATABASE {ident(branch_database(name, TEMPLATE))} "
+            f"TEMPLATE {ident(name)} STRATEGY FILE_COPY;\n"
+            for name in databases
+        ),
+    )
+
+
+def switch(pod, branch):
+    """Make a branch the one the pod's databases point at"""
+    branch = branch_name(branch)
+    databases = pod_databases(pod)
+    existing = existing_databases()
+
+    script = ""
+    for name in databases:
+        current = current_branch(name)
+        if current == branch:
+            continue
+        target = branch_database(name, branch)
+        if target not in existing:
+            raise DatabaseError(f"there is no {branch} branch of {name}")
+
+        parked = branch_database(name, current)
+        script += (
+            f"ALTER DATABASE {ident(name)} RENAME TO {ident(parked)};\n"
+            f"ALTER DATABASE {ident(parked)} WITH ALLOW_CONNECTIONS true;\n"
+            f"ALTER DATABASE {ident(target)} RENAME TO {ident(name)};\n"
+            f"COMMENT ON DATABASE {ident(name)} "
+            f"IS {literal(COMMENT_PREFIX + branch)};\n"
+        )
+
+    if script:
+        _locked(databases, script)
+
+
+def create_branch(pod, branch):
+    """Clone a pod's seeded template databases into a new branch and switch to it"""
+    branch = branch_name(branch)
+    databases = pod_databases(pod)
+    if not databases:
+        raise DatabaseError(f"{pod} doesn't use any postgres databases")
+
+    existing = existing_databases()
+    script = ""
+    for name in databases:
+        template = branch_database(name, TEMPLATE)
+        target = branch_database(name, branch)
+        if template not in existing:
+            raise DatabaseError(f"{name} has no template yet, run `auto seed {pod}`")
+        if target in existing or current_branch(name) == branch:
+            raise DatabaseError(f"{name} already has a {branch} branch")
+        script += (
+            f"CREATE DATABASE {ident(target)} "
+            f"TEMPLATE {ident(template)} STRATEGY FILE_COPY;\n"
+        )
+
+    psql(script)
+    switch(pod, branch)
@@ -0,0 +1,318 @@
+"""Streaming database dumps and restores
+
+mysqldump and pg_dump run inside the database pod and their output streams
+over `kubectl exec` straight into a compressed file on the host (and back in
+the other direction for a restore), a buffer at a time.  Nothing is written
+inside the pod and memory use doesn't grow with the size of the database.
+
+A dump is a folder per database: the schema, one file per table so tables
+can be dumped and restored in parallel, and the post-data (Postgres indexes
+and constraints, MySQL triggers), which is restored last so indexes are built
+once over the loaded data and triggers don't fire for the restored rows.
+
+Each table is dumped by its own mysqldump or pg_dump, so in its own
+transaction: a database that is written to during the dump can end up with
+tables from slightly different moments.  Dump databases while their pods are
+idle.
+"""
+
+import gzip
+import json
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from autocli import db, utils
+
+# File extension for each compression
+COMPRESSIONS = {"zstd": ".zst", "gzip": ".gz", "none": ""}
+
+# Bytes moved per read while streaming
+CHUNK_SIZE = 1024 * 1024
+
+ENGINES = ("mysql", "postgres")
+
+
+def default_compression():
+    """zstd when the zstandard module is installed, gzip otherwise"""
+    try:
+        import zstandard  # noqa: F401 pylint: disable=import-outside-toplevel,unused-import,import-error
+    except ImportError:
+        return "gzip"
+    return "zstd"
+
+
+def check_compression(compression):
+    """Raise DatabaseError if a compression can't be used here"""
+    if compression not in COMPRESSIONS:
+        raise db.DatabaseError(f"unknown compression {compression!r}")
+    if compression == "zstd":
+        _zstandard()
+
+
+def _zstandard():
+    """The zstandard module (DatabaseError if it isn't installed)"""
+    try:
+        import zstandard  # pylint: disable=import-outside-toplevel,import-error
+    except ImportError as error:
+        raise db.DatabaseError(
+            "zstd needs the zstandard module (pip install zstandard)"
+        ) from error
+    return zstandard
+
+
+def open_compressed(path, mode, compression):
+    """Open a file that is (de)compressed while it is read or written"""
+    if compression == "gzip":
+        # A low level keeps compression from being the slowest part of the pipe
+        return gzip.open(path, mode, compresslevel=3)
+    if compression == "zstd":
+        zstandard = _zstandard()
+        if "w" in mode:
+            return zstandard.ZstdCompressor(level=3, threads=-1).stream_writer(
+                open(path, "wb"), closefd=True  # pylint: disable=consider-using-with
+            )
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(path, "rb"), closefd=True  # pylint: disable=consider-using-with
+        )
+    return open(path, mode)  # pylint: disable=unspecified-encoding
+
+
+def _exec_args(engine, command):
+    """kubectl exec arguments to run a command in an engine's pod"""
+    pod_name = utils.get_full_pod_name(engine).strip()
+    if not pod_name:
+        raise db.DatabaseError(f"the {engine} pod is not running")
+    return ["kubectl", "exec", "-i", pod_name, "--"] + command
+
+
+def client_command(engine, database, tool=None):
+    """The command line for an engine's client (or dump tool)"""
+    if engine == "mysql":
+        # The password goes in the environment so it isn't warned about
+        command = ["env", "MYSQL_PWD=password", tool or "mysql", "-uroot"]
+        return command + ([database] if database else [])
+    return [tool or "psql", "-U", "root", "-d", database or "postgres"]
+
+
+def stream_out(engine, command, path, compression):
+    """Run a command in an engine's pod, compressing its output into a file"""
+    with tempfile.TemporaryFile() as errors:
+        with subprocess.Popen(
+            _exec_args(engine, command), stdout=subprocess.PIPE, stderr=errors
+        ) as process, open_compressed(path, "wb", compression) as output:
+            while chunk := process.stdout.read(CHUNK_SIZE):
+                output.write(chunk)
+        if process.returncode:
+            errors.seek(0)
+            raise db.DatabaseError(errors.read().decode("utf-8", "replace").strip())
+
+
+def feed(engine, command, chunks) -> str:
+    """Run a command in an engine's pod with chunks of bytes as its stdin
+
+    Returns what the command printed.
+    """
+    with tempfile.TemporaryFile() as output, tempfile.TemporaryFile() as errors:
+        with subprocess.Popen(
+            _exec_args(engine, command),
+            stdin=subprocess.PIPE,
+            stdout=output,
+            stderr=errors,
+        ) as process:
+            try:
+                for chunk in chunks:
+                    process.stdin.write(chunk)
+            except BrokenPipeError:
+                # The client died, its errors say why
+                pass
+            finally:
+                process.stdin.close()
+        if process.returncode:
+            errors.seek(0)
+            raise db.DatabaseError(errors.read().decode("utf-8", "replace").strip())
+        output.seek(0)
+        return output.read().decode("utf-8", "replace")
+
+
+def stream_in(engine, command, path, compression):
+    """Run a command in an engine's pod, feeding it a decompressed file"""
+    with open_compressed(path, "rb", compression) as source:
+        return feed(engine, command, iter(lambda: source.read(CHUNK_SIZE), b""))
+
+
+def query(engine, database, sql):
+    """Run one query and return its rows as lists of columns"""
+    if engine == "mysql":
+        command = client_command(engine, database) + ["-N", "-B", "-e", sql]
+    else:
+        command = client_command(engine, database) + ["-At", "-F", "\t", "-c", sql]
+    result = subprocess.run(
+        _exec_args(engine, command), capture_output=True, text=True, check=False
+    )
+    if result.returncode:
+        raise db.DatabaseError(result.stderr.strip())
+    return [line.split("\t") for line in result.stdout.splitlines() if line]
+
+
+def list_tables(engine, database):
+    """The tables (and for Postgres, sequences) that hold a database's data"""
+    if engine == "mysql":
+        sql = "SHOW FULL TABLES WHERE Table_type = 'BASE TABLE'"
+        return [row[0] for row in query(engine, database, sql)]
+
+    sql = (
+        "SELECT format('%I.%I', n.nspname, c.relname) FROM pg_class c "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE c.relkind IN ('r', 'S') "
+        "AND n.nspname NOT IN ('pg_catalog', 'information_schema') "
+        "AND n.nspname NOT LIKE 'pg_toast%' ORDER BY 1"
+    )
+    return [row[0] for row in query(engine, database, sql)]
+
+
+def _dump_commands(engine, database, tables):
+    """(file name, command) for the schema, each table and the post-data"""
+    extension = ".sql"
+    if engine == "mysql":
+        dump = client_command(engine, database, "mysqldump") + [
+            "--single-transaction",
+            "--quick",
+            "--skip-lock-tables",
+        ]
+        steps = [
+            (
+                "schema" + extension,
+                dump + ["--no-data", "--routines", "--skip-triggers"],
+            )
+        ]
+        steps += [
+            (
+                f"data-{index:04}{extension}",
+                dump + ["--no-create-info", "--skip-triggers", table],
+            )
+            for index, table in enumerate(tables)
+        ]
+        # Triggers are created once the rows are in, so they don't fire for them
+        post = ["--no-data", "--no-create-info", "--no-create-db", "--triggers"]
+        steps.append(("post" + extension, dump + post))
+        return steps
+
+    dump = client_command(engine, database, "pg_dump") + [
+        "--no-owner",
+        "--no-privileges",
+    ]
+    steps = [("schema" + extension, dump + ["--section=pre-data"])]
+    steps += [
+        (f"data-{index:04}{extension}", dump + ["--data-only", "--table", table])
+        for index, table in enumerate(tables)
+    ]
+    steps.append(("post" + extension, dump + ["--section=post-data"]))
+    return steps
+
+
+def dump_database(engine, database, folder, jobs=4, compression=None):
+    """Dump one database into a folder, tables in parallel"""
+    compression = compression or default_compression()
+    check_compression(compression)
+    suffix = COMPRESSIONS[compression]
+    started = time.monotonic()
+
+    tables = list_tables(engine, database)
+    steps = _dump_commands(engine, database, tables)
+    os.makedirs(folder, exist_ok=True)
+
+    def run(step):
+        file_name, command = step
+        stream_out(
+            engine, command, os.path.join(folder, file_name + suffix), compression
+        )
+
+    # The schema (and post-data) are small, the tables are where the time goes
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        list(executor.map(run, steps))
+
+    manifest = {
+        "engine": engine,
+        "database": database,
+        "compression": compression,
+        "tables": tables,
+        "files": [file_name + suffix for file_name, _ in steps],
+        "created": time.time(),
+        "seconds": round(time.monotonic() - started, 1),
+    }
+    with open(
+        os.path.join(folder, "manifest.json"), "w", encoding="utf-8"
+    ) as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    return manifest
+
+
+def _recreate(engine, database):
+    """Drop and create a database so a restore starts from nothing"""
+    if engine == "mysql":
+        name = db.mysql_ident(database)
+        sql = f"DROP DATABASE IF EXISTS {name}; CREATE DATABASE {name}"
+        query(engine, None, sql)
+        return
+    db.psql(
+        f"DROP DATABASE IF EXISTS {db.ident(database)} WITH (FORCE);\n"
+        f"CREATE DATABASE {db.ident(database)};\n"
+    )
+
+
+def restore_database(folder, database=None, jobs=4):
+    """Restore a dumped database (optionally under another name), tables in parallel"""
+    with open(os.path.join(folder, "manifest.json"), encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+
+    engine = manifest["engine"]
+    database = database or manifest["database"]
+    compression = manifest["compression"]
+
+    # Find out now, not after the database was dropped
+    check_compression(compression)
+    started = time.monotonic()
+    _recreate(engine, database)
+
+    # Postgres stops at the first error instead of restoring half a database
+    client = client_command(engine, database)
+    if engine == "postgres":
+        client += ["-q", "-v", "ON_ERROR_STOP=1"]
+
+    def run(file_name):
+        stream_in(engine, client, os.path.join(folder, file_name), compression)
+
+    # The schema goes first and the post-data (indexes, keys, triggers) last
+    for prefix, workers in (("schema", 1), ("data-", jobs), ("post", 1)):
+        files = [name for name in manifest["files"] if name.startswith(prefix)]
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            list(executor.map(run, files))
+    return time.monotonic() - started
+
+
+def dump_pod(pod, path, jobs=4, compression=None):
+    """Dump every MySQL and Postgres database a pod uses into path/<engine>/<db>"""
+    if compression:
+        check_compression(compression)
+    manifests = []
+    for engine in ENGINES:
+        for database in db.pod_databases(pod, engine):
+            folder = os.path.join(path, engine, database)
+            manifests.append(dump_database(engine, database, folder, jobs, compression))
+    return manifests
+
+
+def restore_pod(path, jobs=4):
+    """Restore every database dumped into path by dump_pod"""
+    restored = []
+    for engine in ENGINES:
+        engine_path = os.path.join(path, engine)
+        if not os.path.isdir(engine_path):
+            continue
+        for database in sorted(os.listdir(engine_path)):
+            restore_database(os.path.join(engine_path, database), jobs=jobs)
+            restored.append((engine, database))
+    return restored
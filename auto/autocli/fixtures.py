@@ -0,0 +1,237 @@
+"""Bulk fixture loading
+
+`auto db load` reads a folder of CSV files (with a header row) or Parquet
+files named after their tables and streams each one into the database with
+the engine's bulk path: MySQL's LOAD DATA LOCAL INFILE reading the client's
+stdin and Postgres' COPY FROM STDIN.  Tables load in parallel.
+
+Postgres drops a table's secondary indexes before the COPY and builds them
+again afterwards, skips foreign key triggers while loading and then moves the
+table's sequences past the loaded ids.  MySQL turns off unique and foreign key
+checks for the loading session, which lets InnoDB defer its secondary index
+work.  The MySQL system pod starts with local_infile enabled for this.
+
+An empty, unquoted field loads as NULL in both engines, which is what COPY
+does and what pyarrow writes for a Parquet null.  MySQL can't tell a quoted
+"" from an empty field, so there an empty string loads as NULL too, while
+Postgres keeps it as ''.
+"""
+
+import csv
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from autocli import db, dumps
+
+EXTENSIONS = (".csv", ".parquet")
+
+
+@dataclass
+class Result:
+    """How loading one table went"""
+
+    table: str
+    rows: int
+    seconds: float
+
+    @property
+    def rate(self):
+        """Rows loaded per second"""
+        return self.rows / self.seconds if self.seconds else float(self.rows)
+
+
+def find_fixtures(folder):
+    """{table: file} for every fixture in a folder"""
+    fixtures = {}
+    for name in sorted(os.listdir(folder)):
+        table, extension = os.path.splitext(name)
+        if extension in EXTENSIONS:
+            fixtures[table] = os.path.join(folder, name)
+    return fixtures
+
+
+def _csv_chunks(path):
+    """A CSV file's header columns, line ending and body as chunks of bytes"""
+    with open(path, "rb") as source:
+        header = source.readline()
+    columns = next(csv.reader([header.decode("utf-8-sig")]))
+    newline = "\r\n" if header.endswith(b"\r\n") else "\n"
+
+    def chunks():
+        with open(path, "rb") as source:
+            source.readline()
+            yield from iter(lambda: source.read(dumps.CHUNK_SIZE), b"")
+
+    return columns, newline, chunks()
+
+
+def _parquet_chunks(path):
+    """A Parquet file's columns, line ending and rows as CSV a batch at a time"""
+    # pylint: disable=import-outside-toplevel,import-error
+    try:
+        import pyarrow
+        from pyarrow import csv as pyarrow_csv
+        from pyarrow import parquet
+    except ImportError as error:
+        raise db.DatabaseError("loading Parquet files needs pyarrow") from error
+
+    parquet_file = parquet.ParquetFile(path)
+    options = pyarrow_csv.WriteOptions(include_header=False)
+
+    def chunks():
+        for batch in parquet_file.iter_batches():
+            buffer = io.BytesIO()
+            pyarrow_csv.write_csv(pyarrow.Table.from_batches([batch]), buffer, options)
+            yield buffer.getvalue()
+
+    return parquet_file.schema_arrow.names, "\n", chunks()
+
+
+def read_fixture(path):
+    """(columns, line ending, chunks of CSV without a header) for a fixture"""
+    if path.endswith(".parquet"):
+        return _parquet_chunks(path)
+    return _csv_chunks(path)
+
+
+def _load_mysql(database, table, path):
+    """LOAD DATA one table from the client's stdin, returning the row count"""
+    columns, newline, chunks = read_fixture(path)
+
+    # An empty field is NULL, as it is for Postgres (MySQL would load '' or 0)
+    variables = ", ".join(f"@c{index}" for index in range(len(columns)))
+    assignments = ", ".join(
+        f"{db.mysql_ident(column)} = NULLIF(@c{index}, '')"
+        for index, column in enumerate(columns)
+    )
+    sql = (
+        "SET unique_checks = 0; SET foreign_key_checks = 0; "
+        f"LOAD DATA LOCAL INFILE '/dev/stdin' INTO TABLE {db.mysql_ident(table)} "
+        "CHARACTER SET utf8mb4 FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+        f"ESCAPED BY '' LINES TERMINATED BY '{newline.encode('unicode_escape').decode()}' "
+        f"({variables}) SET {assignments}; SELECT ROW_COUNT();"
+    )
+    command = dumps.client_command("mysql", database) + [
+        "--local-infile=1",
+        "-N",
+        "-B",
+        "-e",
+        sql,
+    ]
+    output = dumps.feed("mysql", command, chunks)
+    return int(output.split()[-1])
+
+
+def _secondary_indexes(database, schema, table):
+    """(name, CREATE INDEX statement) for a table's indexes no constraint owns"""
+    sql = (
+        "SELECT format('%I.%I', schemaname, indexname), indexdef FROM pg_indexes i "
+        f"WHERE schemaname = {db.literal(schema)} AND tablename = {db.literal(table)} "
+        "AND NOT EXISTS (SELECT 1 FROM pg_constraint c "
+        "WHERE c.conindid = format('%I.%I', i.schemaname, i.indexname)::regclass)"
+    )
+    return dumps.query("postgres", database, sql)
+
+
+def _sync_sequences(database, schema, table):
+    """Move the table's serial and identity sequences past the loaded ids"""
+    qualified = db.literal(f"{db.ident(schema)}.{db.ident(table)}")
+    sql = (
+        "SELECT attname FROM pg_attribute "
+        f"WHERE attrelid = {qualified}::regclass AND attnum > 0 AND NOT attisdropped "
+        f"AND pg_get_serial_sequence({qualified}, attname) IS NOT NULL"
+    )
+    columns = [row[0] for row in dumps.query("postgres", database, sql)]
+    if not columns:
+        return
+
+    # The next value is one past the highest id (1 for an empty table)
+    calls = ", ".join(
+        f"setval(pg_get_serial_sequence({qualified}, {db.literal(column)}), "
+        f"coalesce(max({db.ident(column)}), 0) + 1, false)"
+        for column in columns
+    )
+    dumps.query(
+        "postgres",
+        database,
+        f"SELECT {calls} FROM {db.ident(schema)}.{db.ident(table)}",
+    )
+
+
+def _load_postgres(database, table, path):
+    """COPY one table from stdin with its secondary indexes deferred"""
+    schema, _, name = table.rpartition(".")
+    schema = schema or "public"
+    columns, _, chunks = read_fixture(path)
+    column_list = ", ".join(db.ident(column) for column in columns)
+    copy = (
+        f"COPY {db.ident(schema)}.{db.ident(name)} ({column_list}) "
+        "FROM STDIN WITH (FORMAT csv)"
+    )
+
+    # Drop the indexes, COPY without foreign key triggers, then rebuild them
+    indexes = _secondary_indexes(database, schema, name)
+    if indexes:
+        dumps.query(
+            "postgres",
+            database,
+            "".join(f"DROP INDEX {index};" for index, _ in indexes),
+        )
+    try:
+        output = dumps.feed(
+            "postgres",
+            dumps.client_command("postgres", database)
+            + ["-v", "ON_ERROR_STOP=1"]
+            + ["-c", "SET session_replication_role = replica", "-c", copy],
+            chunks,
+        )
+    finally:
+        if indexes:
+            dumps.query(
+                "postgres", database, "".join(f"{create};" for _, create in indexes)
+            )
+
+    # COPY doesn't advance sequences, the next insert would reuse a loaded id
+    _sync_sequences(database, schema, name)
+    return int(output.split()[-1])
+
+
+LOADERS = {"mysql": _load_mysql, "postgres": _load_postgres}
+
+
+def pod_database(pod, database=None):
+    """(engine, database) to load a pod's fixtures into"""
+    choices = [
+        (engine, name)
+        for engine in LOADERS
+        for name in db.pod_databases(pod, engine)
+        if database in (None, name)
+    ]
+    if len(choices) != 1:
+        names = ", ".join(name for _, name in choices) or "none"
+        raise db.DatabaseError(
+            f"pick one of {pod}'s databases with --database (found: {names})"
+        )
+    return choices[0]
+
+
+def load(engine, database, folder, jobs=4, report=None):
+    """Load every fixture in a folder, `jobs` tables at a time"""
+    fixtures = find_fixtures(folder)
+    if not fixtures:
+        raise db.DatabaseError(f"no .csv or .parquet files in {folder}")
+
+    def run(item):
+        table, path = item
+        started = time.monotonic()
+        rows = LOADERS[engine](database, table, path)
+        result = Result(table, rows, time.monotonic() - started)
+        if report:
+            report(result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        return list(executor.map(run, fixtures.items()))
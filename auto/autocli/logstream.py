@@ -0,0 +1,223 @@
+"""Following the logs of every pod of an app at once
+
+Each container of each running pod gets its own `kubectl logs -f` in a
+thread (labelled `<pod>/<container>` when a pod has several), so the lines of
+one stream always arrive in time order.  When a stream ends because the
+container restarted, the follower picks up again from the timestamp of the
+last line it saw, skipping only the lines it already had at that time, so
+nothing is lost or repeated.  New pods (another replica, a replacement after
+a delete) are followed as they appear.
+
+Lines are filtered in Python and handed to the printing thread through a
+bounded queue.  A terminal that can't keep up makes the followers wait
+rather than making auto buffer without limit.
+"""
+
+import queue
+import re
+import subprocess
+import threading
+
+from autocli import pods, utils
+from autocli.batch import COLORS
+from rich.console import Console
+from rich.text import Text
+
+# Health checks: the kubelet's HTTP probes and TCP checks from the pod
+# network gateway (10.42.<node>.1)
+HEALTH_CHECKS = (r"kube-probe", r"\b10\.42\.\d+\.1 ")
+
+# Lines waiting to be printed before the followers have to wait
+QUEUE_SIZE = 1000
+
+# Seconds between looks for new pods, and before following a restarted one
+DISCOVER_INTERVAL = 1.0
+RECONNECT_DELAY = 0.5
+
+
+def node_ip():
+    """The cluster node's internal IP (the source of TCP health checks)"""
+    return utils.run_and_return(
+        "kubectl get nodes -o jsonpath='{.items[0].status.addresses[?(@.type==\"InternalIP\")].address}'"
+    ).strip()
+
+
+def health_filter(ip_address=""):
+    """One precompiled pattern matching every health check line"""
+    patterns = list(HEALTH_CHECKS)
+    if ip_address:
+        patterns.append(re.escape(ip_address))
+    return re.compile("|".join(patterns))
+
+
+def stamp_key(stamp):
+    """A kubectl RFC3339 timestamp that sorts correctly (trailing zeros are dropped)"""
+    seconds, _, fraction = stamp.rstrip("Z").partition(".")
+    return seconds, fraction.ljust(9, "0")
+
+
+class LogStream:  # pylint: disable=too-many-instance-attributes
+    """Follows, filters and prints the logs of every pod of an app"""
+
+    def __init__(self, app, skip=None, tail=10, console=None):
+        self.app = app
+        self.skip = skip
+        self.tail = tail
+        self.console = console or Console(highlight=False)
+        self.lines = queue.Queue(maxsize=QUEUE_SIZE)
+        self.stopping = threading.Event()
+        self.followers = {}
+        self.prefixes = {}
+        self.processes = set()
+        self.lock = threading.Lock()
+
+        # {label: timestamp} to start following from instead of the last few lines
+        self.resume = {}
+
+    def app_pods(self):
+        """The app's pods (the kubectl JSON items)"""
+        return pods.matching_pods(self.app, pods.list_pods())
+
+    def running_sources(self):
+        """{label: (pod name, container)} for every container of the running pods"""
+        sources = {}
+        for pod in self.app_pods():
+            if not pods.is_running(pod):
+                continue
+            pod_name = pod["metadata"]["name"]
+            containers = [
+                container["name"]
+                for container in pod.get("spec", {}).get("containers", [])
+            ]
+            if len(containers) <= 1:
+                sources[pod_name] = (pod_name, containers[0] if containers else None)
+            else:
+                for container in containers:
+                    sources[f"{pod_name}/{container}"] = (pod_name, container)
+        return sources
+
+    def _put(self, name, stamp, line):
+        """Queue a line, waiting while the printer catches up"""
+        while not self.stopping.is_set():
+            try:
+                self.lines.put((name, stamp, line), timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _stream(self, name, source, last):
+        """Read one `kubectl logs -f` session of a container
+
+        `last` is (the last timestamp seen, the lines seen at that time), and
+        the same comes back for the next session.  A session started from a
+        timestamp replays the lines at that time, which are skipped once each
+        (all of them when they aren't known, as when resuming an archive).
+        """
+        pod_name, container = source
+        since, seen = last
+        args = ["kubectl", "logs", "-f", "--timestamps", pod_name]
+        if container:
+            args += ["-c", container]
+        args.append(f"--since-time={since}" if since else f"--tail={self.tail}")
+        replaying = since is not None
+        pending = None if seen is None else list(seen)
+        with subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            errors="replace",
+        ) as process:
+            with self.lock:
+                self.processes.add(process)
+            for raw in process.stdout:
+                stamp, _, line = raw.rstrip("\n").partition(" ")
+                if replaying:
+                    if stamp_key(stamp) < stamp_key(since):
+                        continue
+                    if stamp_key(stamp) == stamp_key(since):
+                        if pending is None:
+                            continue
+                        if line in pending:
+                            pending.remove(line)
+                            continue
+                    replaying = False
+                if since is None or stamp_key(stamp) != stamp_key(since):
+                    since, seen = stamp, []
+                seen.append(line)
+                if not (self.skip and self.skip.search(line)):
+                    self._put(name, stamp, line)
+        with self.lock:
+            self.processes.discard(process)
+        return since, seen
+
+    def follow(self, name, source):
+        """Stream a container's logs until its pod goes away, reconnecting across restarts"""
+        last = (self.resume.get(name), None)
+        while not self.stopping.is_set():
+            last = self._stream(name, source, last)
+            if (
+                self.stopping.wait(RECONNECT_DELAY)
+                or name not in self.running_sources()
+            ):
+                break
+        self._put(name, last[0], None)
+
+    def discover(self):
+        """Start following every container of the app that isn't followed yet"""
+        for name, source in self.running_sources().items():
+            follower = self.followers.get(name)
+            if follower and follower.is_alive():
+                continue
+            self.prefixes.setdefault(name, COLORS[len(self.prefixes) % len(COLORS)])
+            follower = threading.Thread(
+                target=self.follow, args=(name, source), name=name, daemon=True
+            )
+            self.followers[name] = follower
+            follower.start()
+
+    def _discover_loop(self):
+        """Look for new pods until stopped"""
+        while not self.stopping.is_set():
+            self.discover()
+            self.stopping.wait(DISCOVER_INTERVAL)
+
+    def print_line(self, name, line):
+        """Print one line with its stream's colored prefix"""
+        prefix = Text(f"{name} | ", style=self.prefixes.get(name, COLORS[0]))
+        if line is None:
+            self.console.print(prefix + Text("-- log stream ended", style="italic"))
+        else:
+            self.console.print(prefix + Text(line), soft_wrap=True)
+
+    def emit(self, name, stamp, line):  # pylint: disable=unused-argument
+        """Handle a line (None when the stream ended)"""
+        self.print_line(name, line)
+
+    def idle(self):
+        """Called when no line has arrived for a moment"""
+
+    def stop(self):
+        """Stop every follower"""
+        self.stopping.set()
+        with self.lock:
+            for process in self.processes:
+                process.terminate()
+
+    def run(self):
+        """Print the app's logs until ^C"""
+        # Pods are looked up every second, they can share a listing
+        pods.start_watch()
+        threading.Thread(
+            target=self._discover_loop, name="discover", daemon=True
+        ).start()
+        try:
+            while True:
+                try:
+                    self.emit(*self.lines.get(timeout=0.5))
+                except queue.Empty:
+                    self.idle()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
@@ -0,0 +1,139 @@
+"""Kubernetes manifest bundles
+
+System pods (and the shared code volume) are described by the manifest files
+or folders that make them up.  They are read and validated locally, joined
+into one multi-document bundle and sent to the API server with a single
+server-side apply that is retried as a unit.
+"""
+
+import os
+import re
+import subprocess
+
+from autocli import retry
+from rich import print as rprint
+
+# Matches `kubectl apply -f <path>` (and nothing else) in legacy configs
+APPLY_COMMAND = re.compile(r"^\s*kubectl\s+apply\s+-f\s+(\S+)\s*$")
+
+# Things other objects depend on go first
+KIND_ORDER = [
+    "Namespace",
+    "PersistentVolume",
+    "PersistentVolumeClaim",
+    "ConfigMap",
+    "Secret",
+    "ServiceAccount",
+    "Service",
+]
+
+
+class ManifestError(ValueError):
+    """A manifest file is missing or isn't a valid Kubernetes object"""
+
+
+def split_commands(commands):
+    """Split legacy `commands:` into manifest paths and anything else"""
+    paths, others = [], []
+    for command in commands:
+        match = APPLY_COMMAND.match(command)
+        if match:
+            paths.append(match.group(1))
+        else:
+            others.append(command)
+    return paths, others
+
+
+def collect(paths):
+    """Expand manifest files and folders into the list of files to apply"""
+    files = []
+    for path in paths:
+        path = os.path.expandvars(os.path.expanduser(path))
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if name.endswith((".yaml", ".yml"))
+            )
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            raise ManifestError(f"Manifest not found: {path}")
+    return files
+
+
+def _validate(document, file_path):
+    """Make sure a document looks like a Kubernetes object"""
+    if not isinstance(document, dict):
+        raise ManifestError(f"{file_path}: expected a Kubernetes object")
+    for key in ("apiVersion", "kind"):
+        if not document.get(key):
+            raise ManifestError(f"{file_path}: {document} is missing `{key}`")
+    if not (document.get("metadata") or {}).get("name"):
+        raise ManifestError(f"{file_path}: a {document['kind']} is missing its name")
+
+
+def load(paths):
+    """Read and validate every object in the given files and folders"""
+    import yaml  # pylint: disable=import-outside-toplevel
+
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    documents = []
+    for file_path in collect(paths):
+        try:
+            with open(file_path, encoding="utf-8") as manifest_file:
+                for document in yaml.load_all(manifest_file, Loader=loader):
+                    if document is None:
+                        continue
+                    _validate(document, file_path)
+                    documents.append(document)
+        except yaml.YAMLError as error:
+            raise ManifestError(f"{file_path}: {error}") from error
+    return documents
+
+
+def bundle(paths):
+    """One multi-document YAML stream for every object, in dependency order"""
+    import yaml  # pylint: disable=import-outside-toplevel
+
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+    documents = load(paths)
+
+    def kind_rank(document):
+        kind = document["kind"]
+        return KIND_ORDER.index(kind) if kind in KIND_ORDER else len(KIND_ORDER)
+
+    documents.sort(key=kind_rank)
+    return yaml.dump_all(documents, Dumper=dumper, explicit_start=True)
+
+
+def apply(paths, description="manifests") -> bool:
+    """Server-side apply a set of manifests in one call, retrying with backoff"""
+    try:
+        stream = bundle(paths)
+    except ManifestError as error:
+        rprint(f"    [red]Invalid manifest for {description}: {error}")
+        return False
+
+    command = [
+        "kubectl",
+        "apply",
+        "--server-side",
+        "--force-conflicts",
+        "--field-manager=auto",
+        "-f",
+        "-",
+    ]
+    try:
+        retry.call(
+            lambda: subprocess.run(
+                command, input=stream, capture_output=True, text=True, check=False
+            ),
+            retry.APPLY,
+            name=f"apply {description}",
+            accept=lambda result: result.returncode == 0,
+        )
+        return True
+    except retry.RetryError as error:
+        rprint(f"    [red]Error applying {description}:[/] {error.last.stderr.strip()}")
+        return False
@@ -0,0 +1,111 @@
+"""Pausing the cluster in memory
+
+`auto stop --pause` freezes the k3d and registry containers with `docker
+pause`, so `auto start --resume` is back in a second with every pod exactly
+as it was.  A marker file records when the cluster was paused: a pause longer
+than the node heartbeat grace period leaves nodes tainted and pods Unknown,
+which resume cleans up.
+"""
+
+import os
+import time
+
+from autocli import utils
+from rich import print as rprint
+
+PAUSE_MARKER = os.path.expanduser("~/.auto/paused")
+
+# k3s marks a node unreachable after 40s without a heartbeat
+NODE_GRACE_SECONDS = 40
+
+
+def unpause_for_shutdown() -> None:
+    """Thaw a paused cluster so k3d can stop or delete its containers"""
+
+    if not os.path.exists(PAUSE_MARKER):
+        return
+
+    # No healing, the cluster is going down anyway
+    containers = utils.get_cluster_containers("paused")
+    if containers:
+        rprint("  -- Unpausing cluster")
+        utils.run_and_wait(f"docker unpause {' '.join(containers)}")
+    try:
+        os.remove(PAUSE_MARKER)
+    except OSError:
+        pass
+
+
+def pause_cluster(progress, task) -> None:
+    """Freeze the cluster and registry containers, keeping everything in memory"""
+
+    containers = utils.get_cluster_containers("running")
+    if not containers:
+        rprint("  -- [steel_blue]No running cluster to pause")
+        progress.update(task, advance=50)
+        return
+
+    print("  -- Pausing cluster")
+    if utils.run_and_wait(f"docker pause {' '.join(containers)}"):
+        with open(PAUSE_MARKER, "w", encoding="utf-8") as marker:
+            marker.write(str(time.time()))
+    progress.update(task, advance=50)
+
+
+def resume_cluster() -> bool:
+    """Thaw a paused cluster, returning False if there was nothing to resume"""
+
+    containers = utils.get_cluster_containers("paused")
+    if not containers:
+        return False
+
+    rprint("  -- Resuming cluster")
+    if not utils.run_and_wait(f"docker unpause {' '.join(containers)}"):
+        utils.declare_error("Failed to resume the paused cluster.")
+
+    # How long were we frozen?
+    paused_for = 0.0
+    try:
+        with open(PAUSE_MARKER, encoding="utf-8") as marker:
+            paused_for = time.time() - float(marker.read())
+        os.remove(PAUSE_MARKER)
+    except (OSError, ValueError):
+        pass
+
+    _heal_after_resume(paused_for)
+    rprint("  -- [bold green]Cluster resumed")
+    return True
+
+
+def _heal_after_resume(paused_for):
+    """Clean up after the cluster's clock jumped forward while it was frozen"""
+
+    # A VM based docker (Docker Desktop, colima) can keep a stale clock
+    skew = utils.get_cluster_clock_skew()
+    if skew > 2:
+        rprint(
+            f"     [yellow]Warning: the cluster clock is {skew:.0f}s off from this "
+            "machine. Restart docker if TLS or token errors show up.[/yellow]"
+        )
+
+    # Short pauses never miss a node heartbeat so there is nothing to heal
+    if paused_for < NODE_GRACE_SECONDS and skew <= NODE_GRACE_SECONDS:
+        return
+
+    rprint("     = Healing after a long pause...")
+
+    # Nodes look dead until their next heartbeat lands
+    utils.run_and_wait(
+        "kubectl wait --for=condition=Ready nodes --all --timeout=60s",
+        suppress_error=True,
+    )
+
+    # The node controller may have tainted them while the heartbeats were late
+    for taint in ["node.kubernetes.io/unreachable", "node.kubernetes.io/not-ready"]:
+        utils.run_and_wait(f"kubectl taint nodes --all {taint}-", suppress_error=True)
+
+    # And pods it gave up on will never come back by themselves
+    utils.run_and_wait(
+        "kubectl delete pods --all-namespaces --field-selector=status.phase=Unknown",
+        suppress_error=True,
+    )
@@ -0,0 +1,180 @@
+"""Finding the running pod behind an app name
+
+Pods are matched on their labels instead of their names: `app` (set by the
+system pod manifests and the helm charts), then helm's
+`app.kubernetes.io/instance` and `app.kubernetes.io/name`.  So `portal` never
+resolves to a `portal-worker` pod.  Pods without any of those labels are
+matched on the `<deployment>-<pod-template-hash>-<id>` names Deployments give
+them, so DaemonSet and Job pods of other apps don't match.
+
+One `kubectl get pods` listing is shared for the life of the process.  Every
+command auto runs (utils.run_and_wait) may change pods, so it clears the
+listing, and a lookup that finds no running pod lists again before giving up.
+Long running commands (following logs, the log collector) also call
+start_watch: a background `kubectl get pods --watch-only` then clears the
+listing whenever any pod changes, so a pod that was just restarted or deleted
+elsewhere is never handed out.
+"""
+
+import atexit
+import json
+import re
+import subprocess
+import threading
+
+# The labels an app name is matched against, most specific first
+LABELS = ("app", "app.kubernetes.io/instance", "app.kubernetes.io/name")
+
+_LOCK = threading.Lock()
+# The listing is only kept if no change was seen while it was being fetched
+_CACHE = {"pods": None, "watch": None, "watching": False, "generation": 0}
+
+
+def _watch():
+    """Start a watch that clears the cache whenever a pod changes"""
+    try:
+        process = subprocess.Popen(  # pylint: disable=consider-using-with
+            ["kubectl", "get", "pods", "--watch-only", "-o", "name"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+    except OSError:
+        return None
+    atexit.register(process.terminate)
+
+    def follow():
+        for _ in process.stdout:
+            invalidate()
+
+        # Without a watch nothing can be cached, the next lookup starts another
+        with _LOCK:
+            _CACHE["watch"] = None
+            _CACHE["pods"] = None
+            _CACHE["generation"] += 1
+
+    threading.Thread(target=follow, name="pod-watch", daemon=True).start()
+    return process
+
+
+def start_watch():
+    """Clear the shared listing whenever a pod changes, for the rest of this process"""
+    with _LOCK:
+        _CACHE["watching"] = True
+        if _CACHE["watch"] is None:
+            _CACHE["watch"] = _watch()
+
+
+def invalidate():
+    """Forget the pod listing, the next lookup asks the cluster again"""
+    with _LOCK:
+        _CACHE["pods"] = None
+        _CACHE["generation"] += 1
+
+
+def list_pods():
+    """Every pod in the default namespace (the kubectl JSON items)"""
+    with _LOCK:
+        if _CACHE["pods"] is not None:
+            return _CACHE["pods"]
+
+        # The watch starts first so no change can slip in before the listing
+        if _CACHE["watching"] and _CACHE["watch"] is None:
+            _CACHE["watch"] = _watch()
+        generation = _CACHE["generation"]
+
+    result = subprocess.run(
+        ["kubectl", "get", "pods", "-o", "json"],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode:
+        return []
+    pods = json.loads(result.stdout).get("items", [])
+
+    # A pod that changed while we were listing may be stale in this listing,
+    # and a watched listing is only kept while the watch is there to clear it
+    with _LOCK:
+        watch = _CACHE["watch"]
+        watched = watch is not None and watch.poll() is None
+        if _CACHE["generation"] == generation and (watched or not _CACHE["watching"]):
+            _CACHE["pods"] = pods
+    return pods
+
+
+def is_running(pod):
+    """Is a pod up (and not on its way out)?"""
+    return pod.get("status", {}).get("phase") == "Running" and not pod["metadata"].get(
+        "deletionTimestamp"
+    )
+
+
+def is_ready(pod):
+    """Is a pod passing its readiness checks?"""
+    return any(
+        condition.get("type") == "Ready" and condition.get("status") == "True"
+        for condition in pod.get("status", {}).get("conditions", [])
+    )
+
+
+def _deployment_name(pod):
+    """The Deployment behind an unlabelled pod, from its generated name ("" if none)
+
+    Only Deployment pods carry a `pod-template-hash` label, and their names
+    are `<deployment>-<pod-template-hash>-<id>`.
+    """
+    labels = pod["metadata"].get("labels", {})
+    if any(labels.get(label) for label in LABELS):
+        return ""
+    template_hash = labels.get("pod-template-hash")
+    if not template_hash:
+        return ""
+    generated = re.match(
+        rf"^(.+)-{re.escape(template_hash)}-[a-z0-9]{{5}}$", pod["metadata"]["name"]
+    )
+    return generated.group(1) if generated else ""
+
+
+def matching_pods(app, pods):
+    """The pods belonging to an app, by label or else by Deployment pod name"""
+    for label in LABELS:
+        matches = [
+            pod for pod in pods if pod["metadata"].get("labels", {}).get(label) == app
+        ]
+        if matches:
+            return matches
+
+    return [pod for pod in pods if _deployment_name(pod) == app]
+
+
+def app_name(pod):
+    """The app a pod belongs to (its label, its Deployment, or else its name)"""
+    labels = pod["metadata"].get("labels", {})
+    for label in LABELS:
+        if labels.get(label):
+            return labels[label]
+    return _deployment_name(pod) or pod["metadata"]["name"]
+
+
+def _running(app):
+    """The running pods of an app in the current listing"""
+    return [pod for pod in matching_pods(app, list_pods()) if is_running(pod)]
+
+
+def resolve(app) -> str:
+    """The name of a running pod for an app ("" if there isn't one)"""
+    running = _running(app)
+    if not running:
+        # The pod may have come up since the listing was taken
+        invalidate()
+        running = _running(app)
+    if not running:
+        return ""
+
+    # A ready pod beats one still starting, and a newer one an older one
+    running.sort(
+        key=lambda pod: (is_ready(pod), pod["metadata"].get("creationTimestamp", "")),
+        reverse=True,
+    )
+    return running[0]["metadata"]["name"]
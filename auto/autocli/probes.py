@@ -0,0 +1,87 @@
+"""Native protocol readiness probes for the database system pods
+
+Instead of exec'ing a client inside the pod, these talk to the databases
+through the host ports auto exposes on the k3d load balancer.  A probe only
+passes once the server itself answers: MySQL sends its protocol 10 handshake
+and Postgres answers a startup message with something other than "the
+database system is starting up".
+"""
+
+import dataclasses
+import socket
+import struct
+
+from autocli import retry
+
+# The handshake's first payload byte for MySQL protocol 10
+MYSQL_PROTOCOL_10 = 0x0A
+
+# Postgres protocol 3.0 and the SQLSTATE sent while it is still starting up
+POSTGRES_PROTOCOL = 196608
+POSTGRES_STARTING_UP = b"57P03"
+
+# How long a single probe may take
+PROBE_TIMEOUT = 0.25
+
+
+def _recv_exact(sock, size):
+    """Read exactly `size` bytes (or fewer if the server hangs up)"""
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def mysql_ready(port=3306, host="127.0.0.1", timeout=PROBE_TIMEOUT) -> bool:
+    """Does a MySQL server on this port send its initial handshake?"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            # 3 byte payload length, 1 byte sequence id, then the payload
+            header = _recv_exact(sock, 4)
+            if len(header) < 4:
+                return False
+            payload = _recv_exact(sock, 1)
+            return payload == bytes([MYSQL_PROTOCOL_10])
+    except OSError:
+        return False
+
+
+def postgres_ready(
+    port=5432, host="127.0.0.1", user="root", timeout=PROBE_TIMEOUT
+) -> bool:
+    """Does a Postgres server on this port accept a startup message?"""
+    params = f"user\0{user}\0database\0postgres\0\0".encode("utf-8")
+    startup = struct.pack("!II", 8 + len(params), POSTGRES_PROTOCOL) + params
+
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.sendall(startup)
+            message_type = _recv_exact(sock, 1)
+
+            # An authentication request means it is taking connections
+            if message_type == b"R":
+                return True
+            if message_type != b"E":
+                return False
+
+            # Any error but "starting up" (bad password, no such database...)
+            # still means the server is answering
+            (length,) = struct.unpack("!I", _recv_exact(sock, 4))
+            body = _recv_exact(sock, length - 4)
+            return POSTGRES_STARTING_UP not in body
+    except (OSError, struct.error):
+        return False
+
+
+def wait_until(probe, port, deadline=60.0, first_delay=0.01, max_delay=1.0) -> bool:
+    """Run a probe with exponential backoff until it passes or time runs out"""
+    policy = dataclasses.replace(
+        retry.PROBE, first_delay=first_delay, max_delay=max_delay, deadline=deadline
+    )
+    try:
+        return retry.call(lambda: probe(port), policy, name=f"{probe.__name__}:{port}")
+    except retry.RetryError:
+        return False
@@ -0,0 +1,151 @@
+"""Desired state tracking so `auto start` only applies what changed
+
+Each pod's desired state (its start command, its .auto/config.yaml and every
+chart, values file or manifest the command reads) is hashed.  The hash of the
+last successful apply is kept in a ConfigMap in the cluster, so it goes away
+with the cluster and a pod is only applied again when one of its inputs has
+changed or it isn't running.
+"""
+
+import hashlib
+import json
+import os
+import shlex
+
+from autocli import pods, store, utils
+
+STATE_CONFIGMAP = "auto-reconcile"
+STATE_NAMESPACE = "kube-system"
+
+# Command line flags that name a file or folder the command reads
+FILE_FLAGS = ("-f", "--filename", "--values", "-k", "--kustomize")
+
+# The last applied hashes, read from the cluster the first time we need them
+_APPLIED = None
+
+
+def _hash_path(digest, path):
+    """Feed a file (or every file in a folder) into a hash"""
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file_name in sorted(files):
+                file_path = os.path.join(root, file_name)
+                digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+                _hash_path(digest, file_path)
+    elif os.path.isfile(path):
+        with open(path, "rb") as input_file:
+            for chunk in iter(lambda: input_file.read(65536), b""):
+                digest.update(chunk)
+    else:
+        # A missing input is still part of the desired state
+        digest.update(b"<missing>")
+
+
+def referenced_paths(command, cwd=None):
+    """Find the files and folders a kubectl/helm command reads"""
+    try:
+        args = shlex.split(command)
+    except ValueError:
+        return []
+
+    paths = []
+    for index, arg in enumerate(args):
+        value = None
+        if arg in FILE_FLAGS and index + 1 < len(args):
+            value = args[index + 1]
+        elif arg.startswith(tuple(f"{flag}=" for flag in FILE_FLAGS)):
+            value = arg.split("=", 1)[1]
+
+        # Remote manifests can't be hashed locally
+        if not value or "://" in value or value == "-":
+            continue
+
+        value = os.path.expanduser(value)
+        if cwd and not os.path.isabs(value):
+            value = os.path.join(cwd, value)
+        paths.append(value)
+    return paths
+
+
+def fingerprint(commands, extra_paths=(), settings=None, cwd=None):
+    """Hash everything that makes up a pod's desired state"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(store.thaw(settings), sort_keys=True).encode("utf-8"))
+
+    for command in commands:
+        digest.update(command.encode("utf-8"))
+        for path in referenced_paths(command, cwd):
+            digest.update(path.encode("utf-8"))
+            _hash_path(digest, path)
+
+    for path in extra_paths:
+        digest.update(path.encode("utf-8"))
+        _hash_path(digest, path)
+
+    return digest.hexdigest()
+
+
+def get_applied() -> dict:
+    """The hash of what was last applied for each pod"""
+    global _APPLIED  # pylint: disable=global-statement
+
+    if _APPLIED is None:
+        output = utils.run_and_return(
+            f"kubectl get configmap {STATE_CONFIGMAP} -n {STATE_NAMESPACE} -o json"
+        )
+        try:
+            _APPLIED = json.loads(output).get("data") or {}
+        except ValueError:
+            # No ConfigMap yet (new cluster) so nothing has been applied
+            _APPLIED = {}
+    return _APPLIED
+
+
+def get_running_pods() -> list:
+    """Every pod in the default namespace, as kubectl's JSON (one kubectl call)"""
+    return pods.list_pods()
+
+
+def is_running(name, running_pods) -> bool:
+    """Is there a pod for this name in a list from `get_running_pods()`?"""
+    return bool(pods.matching_pods(name, running_pods))
+
+
+def is_current(name, digest) -> bool:
+    """Was this exact desired state the last one applied?"""
+    return get_applied().get(name) == digest
+
+
+def _patch_state(data) -> bool:
+    """Merge keys into (or with None, remove keys from) the state ConfigMap"""
+    patch = shlex.quote(json.dumps({"data": data}))
+    return utils.run_and_wait(
+        f"kubectl patch configmap {STATE_CONFIGMAP} -n {STATE_NAMESPACE} "
+        f"--type merge -p {patch}",
+        suppress_error=True,
+    )
+
+
+def record(name, digest) -> None:
+    """Remember the desired state we just applied for a pod"""
+    if not _patch_state({name: digest}):
+        utils.run_and_wait(
+            f"kubectl create configmap {STATE_CONFIGMAP} -n {STATE_NAMESPACE} "
+            f"--from-literal={name}={digest}",
+            suppress_error=True,
+        )
+    get_applied()[name] = digest
+
+
+def forget(name) -> None:
+    """Forget a pod's applied state so the next start applies it again"""
+    if name in get_applied():
+        _patch_state({name: None})
+        get_applied().pop(name, None)
+
+
+def reset() -> None:
+    """Drop the cached state (e.g. after the cluster is deleted)"""
+    global _APPLIED  # pylint: disable=global-statement
+    _APPLIED = None
@@ -4,13 +4,23 @@ import os
 import re
 import time
 
-import requests
-import yaml
 from autocli import utils
-from autocli.config import CONFIG, add_images_to_local_config
-from requests.exceptions import RequestException
+from autocli.config import CONFIG, add_images_to_local_config, load_pod_config
 from rich import print as rprint
 
+# `requests` is imported inside the functions that talk to the registry so that
+# commands which never touch it don't pay for importing it.
+# pylint: disable=import-outside-toplevel
+
+# The ingress-nginx release we install on new clusters.  Bump these together:
+# chart 4.11.x ships controller v1.11.x
+INGRESS_CHART_REPO = "https://kubernetes.github.io/ingress-nginx"
+INGRESS_CHART_VERSION = "4.11.3"
+INGRESS_IMAGES = ["registry.k8s.io/ingress-nginx/controller:v1.11.3"]
+INGRESS_CACHE = os.path.expanduser(
+    f"~/.auto/cache/ingress-nginx/{INGRESS_CHART_VERSION}"
+)
+
 
 def start_registry():
     """Start a container registry"""
@@ -26,8 +36,58 @@ def start_registry():
         time.sleep(3)
 
 
+def get_ingress_chart():
+    """Path to the cached ingress-nginx chart, downloading it the first time"""
+    chart_path = os.path.join(
+        INGRESS_CACHE, f"ingress-nginx-{INGRESS_CHART_VERSION}.tgz"
+    )
+    if not os.path.isfile(chart_path):
+        os.makedirs(INGRESS_CACHE, exist_ok=True)
+        # `--repo` fetches just this chart without adding or updating any repos
+        utils.run_and_wait(
+            f"helm pull ingress-nginx --repo {INGRESS_CHART_REPO} "
+            f"--version {INGRESS_CHART_VERSION} --destination {INGRESS_CACHE}",
+            capture_output=True,
+            suppress_error=True,
+        )
+
+    if os.path.isfile(chart_path):
+        return chart_path
+
+    # No cache and no network, let helm try the repo directly
+    return (
+        f"ingress-nginx --repo {INGRESS_CHART_REPO} --version {INGRESS_CHART_VERSION}"
+    )
+
+
+def import_ingress_images():
+    """Import the cached ingress-nginx images into the cluster nodes"""
+    image_tar = os.path.join(INGRESS_CACHE, "images.tar")
+    if not os.path.isfile(image_tar):
+        images = " ".join(INGRESS_IMAGES)
+        pulled = all(
+            utils.run_and_wait(f"docker pull {image}", suppress_error=True)
+            for image in INGRESS_IMAGES
+        )
+        if not pulled or not utils.run_and_wait(
+            f"docker save -o {image_tar}.tmp {images}", suppress_error=True
+        ):
+            # The cluster will pull them itself
+            return False
+        os.replace(f"{image_tar}.tmp", image_tar)
+
+    return bool(
+        utils.run_and_wait(
+            f"k3d image import {image_tar} -c k3s-default", suppress_error=True
+        )
+    )
+
+
 def _get_registry_catalog():
     """Safely fetch the catalog from the local registry."""
+    import requests
+    from requests.exceptions import RequestException
+
     try:
         req = requests.get("http://k3d-registry.local:12345/v2/_catalog", timeout=30)
         req.raise_for_status()
@@ -77,6 +137,9 @@ def _load_single_image(image_obj):
 
 def _build_and_load_pods(loaded_repos):
     """Build and load local pod repositories."""
+    import requests
+    from requests.exceptions import RequestException
+
     for pod in CONFIG.get("pods", []):
         skip_version = False
 
@@ -92,12 +155,8 @@ def _build_and_load_pods(loaded_repos):
                 req.raise_for_status()
                 image_info = req.json()
 
-                pod_config_path = os.path.join(
-                    CONFIG["code"], pod_name, ".auto", "config.yaml"
-                )
-                if os.path.isfile(pod_config_path):
-                    with open(pod_config_path, encoding="utf-8") as pod_config_yaml:
-                        pod_config = yaml.safe_load(pod_config_yaml)
+                pod_config = load_pod_config(pod_name)
+                if pod_config is not None:
                     version = pod_config.get("version", "latest")
 
                     tags = image_info.get("tags", [])
@@ -173,6 +232,9 @@ def _filter_external_images(found_images, local_pod_names):
 
 def _is_image_in_catalog(repo_name, tag_name, registry_catalog):
     """Check if a specific repo and tag combination is already mirrored."""
+    import requests
+    from requests.exceptions import RequestException
+
     if repo_name in registry_catalog:
         try:
             url = f"http://k3d-registry.local:12345/v2/{repo_name}/tags/list"
@@ -300,9 +362,7 @@ def tag_pod_docker_image(pod) -> None:
     code_path = CONFIG["code"]
 
     # We need to load the pod's config and see what version we are on
-    pod_config_path = os.path.join(code_path, pod, ".auto", "config.yaml")
-    with open(pod_config_path, encoding="utf-8") as pod_config_yaml:
-        pod_config = yaml.safe_load(pod_config_yaml)
+    pod_config = utils.get_pod_config(pod)
     version = pod_config["version"]
 
     rprint(f"  -- Building and Tagging: [bright_cyan]{pod} {version}")
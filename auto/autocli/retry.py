@@ -0,0 +1,143 @@
+"""Retrying things that are still starting up
+
+Every "try again in a bit" in auto goes through `call`: exponential backoff
+with jitter, an overall deadline, a say in which errors are worth another try
+and a record of every attempt.  The first retry comes after a few
+milliseconds, so something that is nearly ready is picked up straight away,
+while something that takes a while is polled less and less often.
+"""
+
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+
+@dataclass(frozen=True)
+class Policy:
+    """How often and for how long to keep trying"""
+
+    first_delay: float = 0.05
+    max_delay: float = 2.0
+    multiplier: float = 2.0
+    jitter: float = 0.2  # +/- this fraction of each delay
+    deadline: float = 30.0  # seconds, across every attempt
+    max_attempts: int = 0  # 0 means only the deadline limits attempts
+
+    def delay(self, retry_number):
+        """Seconds to sleep before a retry (1 is the first retry)"""
+        delay = min(
+            self.first_delay * self.multiplier ** (retry_number - 1), self.max_delay
+        )
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(delay, 0.0)
+
+
+# Pods and services that are finishing their start-up
+STARTUP = Policy(first_delay=0.05, max_delay=2.0, deadline=30.0)
+
+# Local network probes that are cheap to repeat
+PROBE = Policy(first_delay=0.01, max_delay=1.0, deadline=60.0, jitter=0.0)
+
+# Applying manifests while the API server settles
+APPLY = Policy(first_delay=0.25, max_delay=8.0, deadline=30.0)
+
+# kubectl lost its connection to the API server
+RECONNECT = Policy(first_delay=0.25, max_delay=2.0, deadline=10.0, max_attempts=4)
+
+
+@dataclass
+class Attempt:
+    """One call and how it went"""
+
+    number: int
+    duration: float
+    error: str = ""
+
+
+@dataclass
+class Stats:
+    """Every attempt made for one operation"""
+
+    name: str
+    attempts: List[Attempt] = field(default_factory=list)
+    elapsed: float = 0.0
+    succeeded: bool = False
+
+
+# The latest stats for each named operation, for the most recent MAX_HISTORY names
+HISTORY = {}
+MAX_HISTORY = 100
+
+
+class RetryError(Exception):
+    """Gave up: the deadline passed or we ran out of attempts"""
+
+    def __init__(self, stats: Stats, last: Any = None):
+        super().__init__(
+            f"{stats.name} failed after {len(stats.attempts)} attempts "
+            f"in {stats.elapsed:.2f}s"
+        )
+        self.stats = stats
+        # The last exception raised, or the last result that wasn't accepted
+        self.last = last
+
+
+def _is_retryable(retry_on, error) -> bool:
+    """Exception classes are matched by type, anything else is a predicate"""
+    if isinstance(retry_on, (tuple, type)):
+        return isinstance(error, retry_on)
+    return bool(retry_on(error))
+
+
+def call(
+    func,
+    policy: Policy = STARTUP,
+    name: Optional[str] = None,
+    retry_on=(Exception,),
+    accept=bool,
+):
+    """Call `func` until it returns something `accept`s, backing off in between
+
+    `retry_on` is a tuple of exception types or a function deciding whether an
+    exception is worth another attempt; any other exception is raised as is.
+    """
+    stats = Stats(name or getattr(func, "__name__", "operation"))
+    HISTORY.pop(stats.name, None)
+    HISTORY[stats.name] = stats
+    while len(HISTORY) > MAX_HISTORY:
+        del HISTORY[next(iter(HISTORY))]
+    started = time.monotonic()
+
+    while True:
+        attempt_started = time.monotonic()
+        retryable = True
+        try:
+            last = func()
+            failure = "" if accept(last) else f"not ready: {last!r}"
+        except Exception as error:  # pylint: disable=broad-except
+            last = error
+            failure = f"{type(error).__name__}: {error}"
+            retryable = _is_retryable(retry_on, error)
+
+        now = time.monotonic()
+        stats.attempts.append(
+            Attempt(len(stats.attempts) + 1, now - attempt_started, failure)
+        )
+        stats.elapsed = now - started
+        if not failure:
+            stats.succeeded = True
+            return last
+        if not retryable:
+            raise last
+
+        remaining = policy.deadline - stats.elapsed
+        out_of_attempts = policy.max_attempts and (
+            len(stats.attempts) >= policy.max_attempts
+        )
+        if remaining <= 0 or out_of_attempts:
+            raise RetryError(stats, last)
+
+        # Never sleep past the deadline, the last attempt happens right on it
+        time.sleep(min(policy.delay(len(stats.attempts)), remaining))
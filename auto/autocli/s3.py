@@ -0,0 +1,169 @@
+"""MinIO bucket provisioning over the S3 API
+
+Buckets are created straight from auto through the minio.local ingress, with
+requests signed (AWS Signature Version 4) by the MinIO root credentials.
+Every bucket gets a policy that lets anyone download its objects without
+being able to list them.  Creating a bucket that already exists and putting
+the same policy again are both harmless, so provisioning is safe to repeat.
+"""
+
+import datetime
+import hashlib
+import hmac
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from autocli import retry
+from autocli.config import CONFIG
+
+ACCESS_KEY = "minio"
+SECRET_KEY = "minio123"
+REGION = "us-east-1"
+
+# MinIO is reached through the ingress on the cluster's web port
+HOST = "minio.local"
+
+REQUEST_TIMEOUT = 10
+
+
+class S3Error(Exception):
+    """MinIO (or the ingress in front of it) refused a request"""
+
+    def __init__(self, status, message):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+def get_endpoint():
+    """The host URL the cluster's ingress listens on"""
+    return "http://127.0.0.1:80" if CONFIG.get("https") else "http://127.0.0.1:8088"
+
+
+def _hmac(key, message):
+    """HMAC-SHA256 of a message"""
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+
+def sign(method, target, headers, payload, when=None):
+    """Add the Signature Version 4 headers for a request to `target` (path?query)"""
+    path, _, query = target.partition("?")
+    when = when or datetime.datetime.now(datetime.timezone.utc)
+    amz_date = when.strftime("%Y%m%dT%H%M%SZ")
+    scope = f"{when:%Y%m%d}/{REGION}/s3/aws4_request"
+
+    headers = {name.lower(): str(value).strip() for name, value in headers.items()}
+    headers["x-amz-date"] = amz_date
+    headers.setdefault("x-amz-content-sha256", hashlib.sha256(payload).hexdigest())
+
+    # A bare sub-resource such as `?policy` is signed as `policy=`
+    if query and "=" not in query:
+        query = f"{query}="
+
+    signed_headers = ";".join(sorted(headers))
+    canonical_request = "\n".join(
+        [
+            method,
+            path,
+            query,
+            "".join(f"{name}:{headers[name]}\n" for name in sorted(headers)),
+            signed_headers,
+            headers["x-amz-content-sha256"],
+        ]
+    )
+    string_to_sign = "\n".join(
+        [
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+        ]
+    )
+
+    key = f"AWS4{SECRET_KEY}".encode("utf-8")
+    for part in scope.split("/"):
+        key = _hmac(key, part)
+    signature = hmac.new(
+        key, string_to_sign.encode("utf-8"), hashlib.sha256
+    ).hexdigest()
+
+    headers["authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={ACCESS_KEY}/{scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}"
+    )
+    return headers
+
+
+def _put(session, endpoint, path, query="", payload=b""):
+    """Send one signed PUT and return the response"""
+    target = f"{quote(path, safe='/~')}" + (f"?{query}" if query else "")
+    headers = sign("PUT", target, {"host": HOST}, payload)
+    url = f"{endpoint}{target}"
+    return session.put(url, data=payload, headers=headers, timeout=REQUEST_TIMEOUT)
+
+
+def download_policy(bucket):
+    """Objects can be downloaded by anyone but the bucket can't be listed"""
+    return json.dumps(
+        {
+            "Version": "2012-10-17",
+            "Statement": [
+                {
+                    "Effect": "Allow",
+                    "Principal": {"AWS": ["*"]},
+                    "Action": ["s3:GetObject"],
+                    "Resource": [f"arn:aws:s3:::{bucket}/*"],
+                }
+            ],
+        }
+    )
+
+
+def ensure_bucket(session, endpoint, bucket) -> bool:
+    """Create a bucket unless it exists, then set its download policy"""
+    response = _put(session, endpoint, f"/{bucket}")
+    if response.status_code != 200 and "BucketAlreadyOwnedByYou" not in response.text:
+        raise S3Error(response.status_code, response.text.strip())
+
+    policy = download_policy(bucket).encode("utf-8")
+    response = _put(session, endpoint, f"/{bucket}", "policy", policy)
+    if response.status_code not in (200, 204):
+        raise S3Error(response.status_code, response.text.strip())
+    return True
+
+
+def _is_transient(error):
+    """MinIO or its ingress route may still be starting up"""
+    import requests  # pylint: disable=import-outside-toplevel
+
+    if isinstance(error, S3Error):
+        # The ingress answers 404 (unknown host) or 50x until MinIO is routed
+        return error.status == 404 or error.status >= 500
+    return isinstance(error, requests.RequestException)
+
+
+def ensure_buckets(buckets, endpoint=None):
+    """Provision every bucket concurrently, returning {bucket: error or ""}"""
+    import requests  # pylint: disable=import-outside-toplevel
+
+    endpoint = endpoint or get_endpoint()
+    session = requests.Session()
+
+    def provision(bucket):
+        try:
+            retry.call(
+                lambda: ensure_bucket(session, endpoint, bucket),
+                retry.STARTUP,
+                name=f"minio bucket {bucket}",
+                retry_on=_is_transient,
+            )
+            return ""
+        except retry.RetryError as error:
+            return str(error.last)
+        except (S3Error, requests.RequestException) as error:
+            return str(error)
+
+    if not buckets:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(len(buckets), 8)) as executor:
+        return dict(zip(buckets, executor.map(provision, buckets)))
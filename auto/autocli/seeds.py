@@ -0,0 +1,196 @@
+"""Seeded database snapshots
+
+After a pod is seeded, each MySQL and Postgres database it uses is dumped
+(see dumps) and each of its MinIO buckets is saved as a tar of the bucket's
+folder.  The snapshot is keyed by a hash of the pod's init and seed scripts,
+its migrations and its system pod config, so `auto seed` can load it in
+seconds until one of those changes.
+
+Only the pod's own databases and buckets are saved and restored, so the
+engines keep running and other pods' data in them is left alone.  A database
+or bucket that another configured pod also uses isn't snapshotted, since
+restoring it would reset that pod's data too; its scripts run instead.
+"""
+
+import json
+import os
+import shlex
+import shutil
+import time
+
+from autocli import batch, db, dumps, reconcile, utils
+from autocli.config import CONFIG
+from rich import print as rprint
+
+SEED_DIR = os.path.expanduser("~/.auto/seeds")
+
+# Where the MinIO pod keeps its buckets, one folder each
+MINIO_STORAGE = "/storage"
+
+# What each system pod keeps for a pod
+DATA_KEYS = {"mysql": "databases", "postgres": "databases", "minio": "buckets"}
+
+
+def seed_key(pod):
+    """Hash of everything that decides what a seeded database looks like"""
+    config = utils.get_pod_config(pod)
+    pod_dir = os.path.join(CONFIG.get("code", ""), pod)
+
+    commands = [config.get("init-command", ""), config.get("seed-command", "")]
+    scripts = [
+        os.path.join(pod_dir, shlex.split(command)[0])
+        for command in commands
+        if command.strip()
+    ]
+    migrations = os.path.join(pod_dir, config.get("migrations-folder", "migrations"))
+
+    return reconcile.fingerprint(
+        commands,
+        extra_paths=scripts + [migrations],
+        settings=config.get("system-pods", []),
+    )
+
+
+def pod_data(pod):
+    """(engine, name) for every database and bucket a pod uses"""
+    config = utils.get_pod_config(pod)
+    return sorted(
+        {
+            (system_pod["name"], entry["name"])
+            for system_pod in config.get("system-pods", [])
+            if system_pod.get("name") in DATA_KEYS
+            for entry in system_pod.get(DATA_KEYS[system_pod["name"]], [])
+        }
+    )
+
+
+def shared_data(pod):
+    """The pod's databases and buckets that another configured pod also uses"""
+    others = set()
+    for other in batch.configured_pods():
+        if other != pod:
+            others.update(pod_data(other))
+    return [name for engine, name in pod_data(pod) if (engine, name) in others]
+
+
+def _refuse_shared(pod, action) -> bool:
+    """Tell the user why a pod can't be snapshotted, returning True if it can't"""
+    shared = shared_data(pod)
+    if shared:
+        rprint(
+            f"  -- Not {action} the seeded snapshot, other pods also use "
+            f"{', '.join(shared)}"
+        )
+    return bool(shared)
+
+
+def seed_path(pod, key=None):
+    """Where a pod's seeded snapshots (or one of them) are stored"""
+    path = os.path.join(SEED_DIR, pod)
+    return os.path.join(path, key) if key else path
+
+
+def load_manifest(pod, key):
+    """The manifest of a pod's seeded snapshot (None if there isn't one)"""
+    try:
+        with open(
+            os.path.join(seed_path(pod, key), "manifest.json"), encoding="utf-8"
+        ) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+
+def _bucket_file(path, bucket, compression):
+    """The file a bucket's tar is kept in"""
+    return os.path.join(
+        path, "minio", bucket + ".tar" + dumps.COMPRESSIONS[compression]
+    )
+
+
+def _save_data(engine, name, path, compression):
+    """Dump one database, or tar one bucket, into a snapshot folder"""
+    if engine == "minio":
+        os.makedirs(os.path.join(path, "minio"), exist_ok=True)
+        dumps.stream_out(
+            "minio",
+            ["tar", "-cf", "-", "-C", MINIO_STORAGE, name],
+            _bucket_file(path, name, compression),
+            compression,
+        )
+        return
+    dumps.dump_database(
+        engine, name, os.path.join(path, engine, name), compression=compression
+    )
+
+
+def _restore_data(engine, name, path, compression):
+    """Put one database or bucket back the way the snapshot has it"""
+    if engine == "minio":
+        folder = shlex.quote(f"{MINIO_STORAGE}/{name}")
+        dumps.stream_in(
+            "minio",
+            ["sh", "-c", f"rm -rf {folder} && tar -xf - -C {MINIO_STORAGE}"],
+            _bucket_file(path, name, compression),
+            compression,
+        )
+        return
+    dumps.restore_database(os.path.join(path, engine, name))
+
+
+def save(pod) -> bool:
+    """Snapshot every database and bucket a freshly seeded pod uses"""
+    data = pod_data(pod)
+    if not data or _refuse_shared(pod, "saving"):
+        return False
+
+    key = seed_key(pod)
+    compression = dumps.default_compression()
+    tmp_path = os.path.join(SEED_DIR, f".{pod}.{os.getpid()}.tmp")
+    os.makedirs(tmp_path, exist_ok=True)
+    try:
+        for engine, name in data:
+            _save_data(engine, name, tmp_path, compression)
+    except db.DatabaseError as error:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        rprint(f"  [yellow]-- Could not save the seeded databases: {error}")
+        return False
+
+    manifest = {
+        "pod": pod,
+        "key": key,
+        "created": time.time(),
+        "compression": compression,
+        "data": data,
+    }
+    with open(
+        os.path.join(tmp_path, "manifest.json"), "w", encoding="utf-8"
+    ) as manifest_file:
+        json.dump(manifest, manifest_file)
+
+    # Snapshots for older inputs can never match again
+    shutil.rmtree(seed_path(pod), ignore_errors=True)
+    os.makedirs(seed_path(pod))
+    os.replace(tmp_path, seed_path(pod, key))
+    rprint(f"  -- Saved seeded databases for [bright_cyan]{pod}[/]")
+    return True
+
+
+def restore(pod) -> bool:
+    """Load the snapshot matching a pod's current seed inputs, if there is one"""
+    key = seed_key(pod)
+    manifest = load_manifest(pod, key)
+    if not manifest or "data" not in manifest or _refuse_shared(pod, "restoring"):
+        return False
+
+    path = seed_path(pod, key)
+    try:
+        for engine, name in manifest["data"]:
+            _restore_data(engine, name, path, manifest["compression"])
+
+        # New branches start from the restored state
+        db.refresh_templates(pod)
+    except db.DatabaseError as error:
+        rprint(f"  [yellow]-- Could not restore the seeded databases: {error}")
+        return False
+    return True
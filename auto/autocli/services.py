@@ -1,174 +1,255 @@
 """System Pods and Database Services Management"""
 
-import time
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
 
-from autocli import utils
+from autocli import db, manifests, probes, reconcile, retry, s3, utils
 from autocli.config import CONFIG
 from rich import print as rprint
 
+# Database system pods are reached from the host through the k3d load balancer
+SYSTEM_POD_PORTS = {
+    "mysql": {"host": 3306, "lb": 30036, "desc": "MySQL"},
+    "postgres": {"host": 5432, "lb": 30035, "desc": "Postgres"},
+    "mssql": {"host": 1433, "lb": 30034, "desc": "SQL Server"},
+}
+
 
 def _run_command_with_retry(command):
     """Helper to run a command with retries"""
-    for _ in range(10):
-        try:
-            # Attempt to apply with suppressed errors for cleaner startup logs
-            success = utils.run_and_wait(
-                command, capture_output=True, suppress_error=True
-            )
-            if success:
-                break
-            time.sleep(2)
-        except Exception:  # pylint: disable=broad-except
-            pass
-    else:
-        # If we exhausted retries, try one last time WITH errors to show user
-        if not utils.run_and_wait(command):
-            rprint(f"    [red]Error running {command}")
-
-
-def _expose_system_pod_port(pod_name, mapping):
-    """Helper to expose ports for requested system pods dynamically"""
-    host_port = mapping["host"]
-    lb_port = mapping["lb"]
-    desc = mapping["desc"]
-
-    # Is port already exposed on k3d loadbalancer?
-    if utils.is_port_exposed_on_k3d(host_port):
-        return True
-
-    # Check if port is already running locally to prevent collision
-    if utils.is_port_in_use(host_port):
-        rprint(
-            f"  [yellow]WARNING: Port {host_port} ({desc}) is already in use on\n"
-            f" the system so we are not starting pod {pod_name}[/yellow]"
+    try:
+        # Attempt to apply with suppressed errors for cleaner startup logs
+        return retry.call(
+            functools.partial(
+                utils.run_and_wait, command, capture_output=True, suppress_error=True
+            ),
+            retry.APPLY,
+            name=command,
         )
-        # Note that we skipped this pod so dependencies aren't built on failures
-        CONFIG.setdefault("skipped-system-pods", []).append(pod_name)
-        return False
+    except retry.RetryError:
+        pass
 
-    # Not in use locally or via k3d, let's inject and bind it dynamically
-    rprint(f"  -- Exposing Port {host_port} for {desc}")
-    utils.run_and_wait(
-        f"k3d node edit k3d-k3s-default-serverlb --port-add {host_port}:{lb_port}"
-    )
+    # If we exhausted retries, try one last time WITH errors to show user
+    if not utils.run_and_wait(command):
+        rprint(f"    [red]Error running {command}")
+        return False
     return True
 
 
-def install_system_pods():
-    """Install all of the system pods in the cluster"""
+def get_system_pod_ports(required_pods):
+    """Port mappings for the required system pods that are free on this machine"""
+    mappings = []
+    for pod_name in sorted(required_pods):
+        mapping = SYSTEM_POD_PORTS.get(pod_name)
+        if mapping and not utils.is_port_in_use(mapping["host"]):
+            mappings.append(mapping)
+    return mappings
 
-    # We need to know which ones to start (both configured explicitly or requested implicitly)
-    required_pods = utils.get_required_system_pods(CONFIG)
 
-    port_mappings = {
-        "mysql": {"host": 3306, "lb": 30036, "desc": "MySQL"},
-        "postgres": {"host": 5432, "lb": 30035, "desc": "Postgres"},
-        "mssql": {"host": 1433, "lb": 30034, "desc": "SQL Server"},
-    }
+def _expose_system_pod_ports(required_pods):
+    """Expose every missing system pod port in one edit and return pods to skip"""
+    exposed = utils.get_k3d_exposed_ports()
+    skipped = set()
+    port_args = []
 
-    # Let's start the ones that we find that are "active" or requested
-    for sys_pod in CONFIG.get("system-pods", []):
-        pod_name = sys_pod["pod"]["name"]
+    for pod_name in sorted(required_pods):
+        mapping = SYSTEM_POD_PORTS.get(pod_name)
 
-        # Proceed only if this pod was identified as required
-        if pod_name not in required_pods:
+        # Is port already exposed on k3d loadbalancer (or not needed)?
+        if not mapping or mapping["host"] in exposed:
             continue
 
-        # Check port mappings and expose dynamically if necessary
-        if pod_name in port_mappings:
-            if not _expose_system_pod_port(pod_name, port_mappings[pod_name]):
-                # If the port exposure failed (due to local collision), we skip installing
-                continue
+        # Check if port is already running locally to prevent collision
+        host_port = mapping["host"]
+        if utils.is_port_in_use(host_port):
+            rprint(
+                f"  [yellow]WARNING: Port {host_port} ({mapping['desc']}) is already in use on\n"
+                f" the system so we are not starting pod {pod_name}[/yellow]"
+            )
+            # Note that we skipped this pod so dependencies aren't built on failures
+            CONFIG.setdefault("skipped-system-pods", []).append(pod_name)
+            skipped.add(pod_name)
+            continue
 
-        rprint("  -- Starting: " + pod_name)
-        for command in sys_pod["pod"]["commands"]:
-            _run_command_with_retry(command)
+        rprint(f"  -- Exposing Port {host_port} for {mapping['desc']}")
+        port_args.append(f"--port-add {host_port}:{mapping['lb']}")
 
-        # MinIO has some extra setup stuff needed to use it
-        if pod_name == "minio":
-            utils.setup_minio()
+    # Every edit recreates the load balancer so add all the ports at once
+    if port_args:
+        utils.run_and_wait(
+            f"k3d node edit k3d-k3s-default-serverlb {' '.join(port_args)}"
+        )
 
+    return skipped
 
-def _process_mysql_databases(system_pod):
-    """Helper to process MySQL database creation"""
-    for database in system_pod.get("databases", []):
-        utils.create_mysql_database(database["name"])
-        rprint(f"      *  Created MySQL database:[bright_cyan]{database['name']}")
 
+# Service level checks run once a system pod reports Ready.  They speak each
+# database's own protocol through the port exposed on the host.
+READINESS_PROBES = {
+    "mysql": functools.partial(
+        probes.wait_until, probes.mysql_ready, SYSTEM_POD_PORTS["mysql"]["host"]
+    ),
+    "postgres": functools.partial(
+        probes.wait_until, probes.postgres_ready, SYSTEM_POD_PORTS["postgres"]["host"]
+    ),
+}
 
-def _process_minio_buckets(system_pod):
-    """Helper to process MinIO bucket creation"""
-    for bucket in system_pod.get("buckets", []):
-        utils.create_minio_bucket(bucket["name"])
-        rprint(f"      *  Created MinIO bucket:[bright_cyan]{bucket['name']}")
 
+def get_system_pod_manifests(system_pod):
+    """The manifest files/folders for a system pod plus any other commands.
 
-def _process_postgres_databases(system_pod):
-    """Helper to process Postgres database creation"""
-    for database in system_pod.get("databases", []):
-        utils.create_postgres_database(database["name"])
-        rprint(f"      *  Created Postgres database:[bright_cyan]{database['name']}")
+    Pods list their `manifests:` directly, older configs list `commands:` and
+    any plain `kubectl apply -f` in them is treated as a manifest.
+    """
+    paths, commands = manifests.split_commands(system_pod.get("commands", []))
+    paths = list(system_pod.get("manifests", [])) + paths
+    return [os.path.expandvars(os.path.expanduser(p)) for p in paths], commands
 
 
-def _process_pod_databases(pod_config):
-    """Helper to process database creation for a single pod config"""
-    if "system-pods" not in pod_config:
-        return
+def _plan_system_pods(required_pods, skipped_pods):
+    """Work out which system pods will run and which of them need applying"""
+    running_pods = reconcile.get_running_pods()
+    started, to_apply = [], []
+    for sys_pod in CONFIG.get("system-pods", []):
+        pod_name = sys_pod["pod"]["name"]
 
-    skipped_pods = CONFIG.get("skipped-system-pods", [])
+        # Proceed only if this pod was identified as required (and has its port)
+        if pod_name not in required_pods or pod_name in skipped_pods:
+            continue
 
-    for system_pod in pod_config["system-pods"]:
-        if system_pod.get("name") in skipped_pods:
+        # Skip pods whose manifests haven't changed since we last applied them
+        state_key = f"system.{pod_name}"
+        paths, commands = get_system_pod_manifests(sys_pod["pod"])
+        digest = reconcile.fingerprint(commands, extra_paths=paths)
+        if reconcile.is_current(state_key, digest) and reconcile.is_running(
+            pod_name, running_pods
+        ):
+            rprint(f"  -- {pod_name}: [steel_blue]already running")
+            started.append(pod_name)
             continue
 
-        if system_pod.get("name") == "mysql":
-            _process_mysql_databases(system_pod)
-        elif system_pod.get("name") == "postgres":
-            _process_postgres_databases(system_pod)
-        elif system_pod.get("name") == "minio":
-            _process_minio_buckets(system_pod)
+        # Catch broken manifests here so one pod can't sink the others
+        try:
+            manifests.load(paths)
+        except manifests.ManifestError as error:
+            rprint(f"  [red]-- Not starting {pod_name}: {error}")
+            continue
+
+        started.append(pod_name)
+        to_apply.append((pod_name, paths, commands, state_key, digest))
+
+    return started, to_apply
+
+
+def install_system_pods(create_dbs=False):
+    """Install all of the system pods in the cluster.
+
+    Pods are applied together and then each one is brought up on its own
+    thread, so an engine's databases are created as soon as it is ready.
+    """
+
+    # We need to know which ones to start (both configured explicitly or requested implicitly)
+    required_pods = utils.get_required_system_pods(CONFIG)
+
+    # New clusters are created with these ports, older ones get them added here
+    skipped_pods = _expose_system_pod_ports(required_pods)
 
+    # Let's find the ones that are "active" or requested and need applying
+    started, to_apply = _plan_system_pods(required_pods, skipped_pods)
 
-def _verify_db_system_ready(db_name, friendly_name, socket_check_func):
-    """Helper to verify a system database pod is ready before creating databases"""
-    # If the user port-blocked the launch earlier, let's fail gracefully here.
-    if db_name in CONFIG.get("skipped-system-pods", []):
-        rprint(
-            f"       [yellow]Skipping {friendly_name} database creation because pod was not started[/yellow]"
+    if to_apply:
+        # Every manifest for every pod goes to the API server in one apply
+        rprint("  -- Starting: " + ", ".join(item[0] for item in to_apply))
+        applied = manifests.apply(
+            [path for item in to_apply for path in item[1]], "system pods"
         )
-        return True
-
-    # Let's confirm the database is running
-    for system_pod in CONFIG.get("system-pods", []):
-        if system_pod["pod"]["name"] == db_name:
-            # Let's wait for the pod to start
-            if utils.wait_for_pod_status(db_name, "Running"):
-                rprint(f"       [green]{friendly_name} running")
-
-                # Check for actual connectivity via socket before proceeding
-                if not socket_check_func():
-                    rprint(
-                        f"       [red]{friendly_name} failed to respond on socket after waiting."
-                    )
-                    return False
-    return True
 
+        for _, _, commands, state_key, digest in to_apply:
+            results = [_run_command_with_retry(command) for command in commands]
+            if applied and all(results):
+                reconcile.record(state_key, digest)
 
-def create_databases():
-    """Create the databases"""
-    rprint("  -- Creating Databases and Buckets")
+    # Pods we just applied need to come up, and new clusters need every
+    # running engine to be ready for its databases
+    gated = started if create_dbs else [item[0] for item in to_apply]
+    _bring_up_all(gated, create_dbs)
 
-    # Verify MySQL is ready
-    if not _verify_db_system_ready("mysql", "MySQL", utils.wait_for_mysql_socket):
-        return
 
-    # Verify Postgres is ready
-    if not _verify_db_system_ready(
-        "postgres", "Postgres", utils.wait_for_postgres_socket
+def wait_until_ready(pod_name, timeout=180) -> bool:
+    """Wait for a system pod's deployment to be Ready and its service to answer"""
+    if not utils.run_and_wait(
+        f"kubectl rollout status deployment/{pod_name} --timeout={timeout}s",
+        suppress_error=True,
     ):
-        return
+        return False
+
+    # The pod being Ready doesn't mean the database accepts queries yet
+    probe = READINESS_PROBES.get(pod_name)
+    return probe() if probe else True
 
-    # Create the databases requested in each of the pods
+
+def _bring_up(pod_name, databases=None):
+    """Gate one system pod on its readiness, then create its databases (if any)"""
+    if not wait_until_ready(pod_name):
+        rprint(f"       [red]{pod_name} did not become ready")
+        return False
+    rprint(f"       [green]{pod_name} ready")
+
+    if databases is not None:
+        DATABASE_CREATORS[pod_name](databases)
+    return True
+
+
+def _bring_up_all(pod_names, create_dbs):
+    """Bring up system pods concurrently so we wait as long as the slowest one"""
+    if not pod_names:
+        return []
+
+    # Pod configs are read up front: a broken one exits before anything starts
+    wanted = {
+        pod_name: (
+            requested_databases(pod_name)
+            if create_dbs and pod_name in DATABASE_CREATORS
+            else None
+        )
+        for pod_name in pod_names
+    }
+    with ThreadPoolExecutor(max_workers=len(pod_names)) as executor:
+        return list(
+            executor.map(
+                lambda pod_name: _bring_up(pod_name, wanted[pod_name]), pod_names
+            )
+        )
+
+
+def _process_mysql_databases(databases):
+    """Helper to process MySQL database creation"""
+    if utils.create_mysql_databases(databases):
+        for database in databases:
+            rprint(f"      *  Created MySQL database:[bright_cyan]{database}")
+
+
+def _process_minio_buckets(buckets):
+    """Helper to process MinIO bucket creation"""
+    for bucket, error in s3.ensure_buckets(buckets).items():
+        if error:
+            rprint(f"  [red]FAILED: Could not create bucket[/] {bucket}: {error}")
+        else:
+            rprint(f"      *  Created MinIO bucket:[bright_cyan]{bucket}")
+
+
+def _process_postgres_databases(databases):
+    """Helper to process Postgres database creation"""
+    if utils.create_postgres_databases(databases):
+        for database in databases:
+            rprint(f"      *  Created Postgres database:[bright_cyan]{database}")
+
+
+def requested_databases(engine):
+    """Every database (or bucket) any pod wants in one engine, without repeats"""
+    key = "buckets" if engine == "minio" else "databases"
+    names = []
     for pod in CONFIG.get("pods", []):
         if isinstance(pod, dict) and "repo" in pod:
             pod_name = pod["repo"].split("/")[-1:][0].replace(".git", "")
@@ -176,7 +257,41 @@ def create_databases():
             pod_name = pod
 
         pod_config = utils.get_pod_config(pod_name)
-        _process_pod_databases(pod_config)
+        for system_pod in pod_config.get("system-pods", []):
+            if system_pod.get("name") != engine:
+                continue
+            for entry in system_pod.get(key, []):
+                if entry["name"] not in names:
+                    names.append(entry["name"])
+    return names
+
+
+def create_engine_databases(engine):
+    """Create the databases (or buckets) every pod wants in one engine, in one batch"""
+    DATABASE_CREATORS[engine](requested_databases(engine))
+
+
+def create_databases():
+    """Create the databases"""
+    rprint("  -- Creating Databases and Buckets")
+
+    # Each engine starts creating as soon as it is ready
+    skipped_pods = CONFIG.get("skipped-system-pods", [])
+    required_pods = utils.get_required_system_pods(CONFIG)
+    engines = [
+        engine
+        for engine in DATABASE_CREATORS
+        if engine in required_pods and engine not in skipped_pods
+    ]
+    _bring_up_all(engines, create_dbs=True)
+
+
+# How each engine creates what a pod asks for
+DATABASE_CREATORS = {
+    "mysql": _process_mysql_databases,
+    "postgres": _process_postgres_databases,
+    "minio": _process_minio_buckets,
+}
 
 
 def connect_to_mysql() -> None:
@@ -198,17 +313,29 @@ def connect_to_minio() -> None:
     utils.connect_to_minio()
 
 
-def seed_pod(pod):
+def seed_pod(pod) -> bool:
     """Run the seeddb.py script inside a pod's container"""
     config = utils.get_pod_config(pod)
     seed_command = config["seed-command"]
-    utils.run_command_inside_pod(pod, seed_command)
+    if not utils.run_command_inside_pod(pod, seed_command):
+        rprint(f"  -- {pod} database [red]NOT[/red] seeded")
+        return False
     rprint(f"  -- {pod} database seeded")
 
+    # New branches start from the freshly seeded state
+    try:
+        db.refresh_templates(pod)
+    except db.DatabaseError as error:
+        rprint(f"  [yellow]-- Could not update the branch templates: {error}")
+    return True
+
 
-def init_pod_db(pod):
+def init_pod_db(pod) -> bool:
     """Run the initdb.py script inside a pod's container"""
     config = utils.get_pod_config(pod)
     init_command = config["init-command"]
-    utils.run_command_inside_pod(pod, init_command)
+    if not utils.run_command_inside_pod(pod, init_command):
+        rprint(f"  -- {pod} database [red]NOT[/red] initialized")
+        return False
     rprint(f"  -- {pod} database initialized")
+    return True
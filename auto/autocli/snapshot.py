@@ -0,0 +1,193 @@
+"""Golden cluster snapshots
+
+Each k3d node keeps its k3s state and the system pod data (the hostPath PVs
+for mysql, minio and postgres) in named docker volumes.  A snapshot is a tar
+of every one of those volumes taken while the cluster is stopped, plus the
+k3d config the cluster was created with, so a restore only has to unpack the
+volumes and create the cluster again.
+"""
+
+import json
+import os
+import re
+import shlex
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from autocli import __version__, utils
+
+SNAPSHOT_DIR = os.path.expanduser("~/.auto/snapshots")
+
+# Snapshot names become folder names under SNAPSHOT_DIR
+VALID_NAME = re.compile(r"[A-Za-z0-9._-]+")
+
+# Everything inside a node that a bootstrapped cluster depends on
+NODE_MOUNTS = {
+    "state": "/var/lib/rancher/k3s",
+    "data": "/mnt/data",
+    "postgres": "/data/postgresql",
+}
+
+VOLUME_PREFIX = "auto-k3s-"
+
+# Small image used to read and write the volumes
+HELPER_IMAGE = "alpine:3.20"
+
+
+def node_filters(agents):
+    """The k3d node filters for a cluster with this many agents"""
+    return ["server:0"] + [f"agent:{index}" for index in range(agents)]
+
+
+def volume_name(node_filter, mount):
+    """The named volume holding one mount of one node"""
+    return f"{VOLUME_PREFIX}{node_filter.replace(':', '-')}-{mount}"
+
+
+def cluster_volumes(agents):
+    """The k3d config `volumes:` entries for every node's state"""
+    return [
+        {"volume": f"{volume_name(node, mount)}:{path}", "nodeFilters": [node]}
+        for node in node_filters(agents)
+        for mount, path in NODE_MOUNTS.items()
+    ]
+
+
+def get_volumes():
+    """Every node state volume that exists right now"""
+    output = utils.run_and_return(
+        f"docker volume ls --quiet --filter name={VOLUME_PREFIX}"
+    )
+    return output.split()
+
+
+def has_volumes(agents):
+    """Does every node of the cluster keep its state in the named volumes?"""
+    expected = {
+        volume_name(node, mount)
+        for node in node_filters(agents)
+        for mount in NODE_MOUNTS
+    }
+    return expected <= set(get_volumes())
+
+
+def create_volumes(agents):
+    """Create the node state volumes (k3d won't mount volumes that don't exist)"""
+    existing = set(get_volumes())
+    for node in node_filters(agents):
+        for mount in NODE_MOUNTS:
+            name = volume_name(node, mount)
+            if name not in existing:
+                utils.run_and_wait(f"docker volume create {name}")
+
+
+def remove_volumes():
+    """Remove every node state volume so the next cluster starts clean"""
+    volumes = get_volumes()
+    if volumes:
+        utils.run_and_wait(f"docker volume rm {' '.join(volumes)}", suppress_error=True)
+
+
+def snapshot_path(name):
+    """Where a snapshot is stored (ValueError for a name that isn't a plain name)"""
+    if not VALID_NAME.fullmatch(name) or name in (".", ".."):
+        raise ValueError(
+            f"{name!r} isn't a valid snapshot name (use letters, digits, . _ and -)"
+        )
+    return os.path.join(SNAPSHOT_DIR, name)
+
+
+def list_snapshots():
+    """The manifest of every saved snapshot, newest first"""
+    manifests = []
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return manifests
+
+    for name in os.listdir(SNAPSHOT_DIR):
+        # Left behind by a save that never finished
+        if name.endswith(".tmp"):
+            continue
+        manifest = load_manifest(name)
+        if manifest:
+            manifests.append(manifest)
+    return sorted(manifests, key=lambda manifest: manifest["created"], reverse=True)
+
+
+def load_manifest(name):
+    """The manifest for one snapshot (None if there is no such snapshot)"""
+    try:
+        with open(
+            os.path.join(snapshot_path(name), "manifest.json"), encoding="utf-8"
+        ) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+
+def run_parallel(commands):
+    """Run independent docker commands at the same time, True if all worked"""
+    if not commands:
+        return True
+    with ThreadPoolExecutor(max_workers=min(len(commands), 8)) as executor:
+        results = list(executor.map(utils.run_and_wait, commands))
+    return all(results)
+
+
+def save_volumes(name, agents, cluster_config):
+    """Tar every node state volume into a new snapshot (cluster must be stopped)"""
+    final_path = snapshot_path(name)
+    tmp_path = f"{final_path}.{os.getpid()}.tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+
+    volumes = [
+        volume_name(node, mount)
+        for node in node_filters(agents)
+        for mount in NODE_MOUNTS
+    ]
+
+    # The tar streams through our shell so the files belong to this user
+    commands = [
+        f"docker run --rm -v {volume}:/from:ro {HELPER_IMAGE} tar -cf - -C /from . "
+        f"> {shlex.quote(os.path.join(tmp_path, volume + '.tar'))}"
+        for volume in volumes
+    ]
+    if not run_parallel(commands):
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        return False
+
+    shutil.copy(cluster_config, os.path.join(tmp_path, "cluster.yaml"))
+    manifest = {
+        "name": name,
+        "created": time.time(),
+        "agents": agents,
+        "volumes": volumes,
+        "version": __version__,
+    }
+    with open(
+        os.path.join(tmp_path, "manifest.json"), "w", encoding="utf-8"
+    ) as manifest_file:
+        json.dump(manifest, manifest_file)
+
+    # Swap the new snapshot in only once it is complete
+    if os.path.isdir(final_path):
+        shutil.rmtree(final_path)
+    os.replace(tmp_path, final_path)
+    return True
+
+
+def restore_volumes(name):
+    """Recreate every node state volume from a snapshot"""
+    manifest = load_manifest(name)
+    path = snapshot_path(name)
+
+    remove_volumes()
+    for volume in manifest["volumes"]:
+        utils.run_and_wait(f"docker volume create {volume}")
+
+    commands = [
+        f"docker run --rm -i -v {volume}:/to {HELPER_IMAGE} tar -xf - -C /to "
+        f"< {shlex.quote(os.path.join(path, volume + '.tar'))}"
+        for volume in manifest["volumes"]
+    ]
+    return run_parallel(commands)
@@ -0,0 +1,334 @@
+"""Event driven `auto status --watch`
+
+Instead of running k3d, docker and kubectl every few seconds, the watch keeps
+a model of the cluster up to date from two event streams that stay open:
+`kubectl get pods --watch` (as JSON) and `docker events` for the k3d server
+and registry containers.  A pod's table row is only rebuilt when an event
+changes it, and the screen is only redrawn when something changed (or a
+pod's age ticks over), so an idle watch costs next to nothing.
+"""
+
+import json
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from autocli import utils
+from rich.console import Console, Group
+from rich.live import Live
+from rich.text import Text
+
+SERVER_CONTAINER = "k3d-k3s-default-server-0"
+REGISTRY_CONTAINER = "k3d-registry.local"
+
+# Seconds to wait before watching pods again after the watch ended
+RECONNECT_DELAY = 1.0
+
+RUNNING = ("Running", "green")
+STOPPED = ("Stopped", "red")
+PAUSED = ("Paused", "yellow")
+
+# What each docker event means for a container
+CONTAINER_STATES = {
+    "start": RUNNING,
+    "unpause": RUNNING,
+    "pause": PAUSED,
+    "die": STOPPED,
+    "destroy": STOPPED,
+}
+
+
+def status_group(cluster, registry, title=None, table=None):
+    """The status screen: the cluster, the registry and the pods table"""
+    items = [Text("Auto Status", style="deep_sky_blue1 bold"), Text("")]
+    items.append(Text.assemble(" Cluster:  ", cluster))
+    items.append(Text.assemble(" Registry: ", registry))
+
+    # If the cluster is stopped (or paused), we can't show pods
+    if cluster == PAUSED:
+        items.append(
+            Text(
+                "\nCluster is paused. Run 'auto start --resume' to resume it.",
+                style="italic",
+            )
+        )
+        return Group(*items)
+    if cluster[0] != "Running":
+        items.append(
+            Text("\nCluster is stopped. Run 'auto start' to start it.", style="italic")
+        )
+        return Group(*items)
+
+    items += [Text(""), Text(title, style="deep_sky_blue1"), table]
+    return Group(*items)
+
+
+def format_age(seconds):
+    """An age the way kubectl shows it (45s, 5m12s, 42m, 3h5m, 20h, 2d4h, 12d)"""
+    seconds = max(int(seconds), 0)
+    minutes, hours, days = seconds // 60, seconds // 3600, seconds // 86400
+    if seconds < 120:
+        return f"{seconds}s"
+    if minutes < 10:
+        major, minor = f"{minutes}m", f"{seconds % 60}s"
+    elif hours < 3:
+        major, minor = f"{minutes}m", ""
+    elif hours < 8:
+        major, minor = f"{hours}h", f"{minutes % 60}m"
+    elif hours < 48:
+        major, minor = f"{hours}h", ""
+    elif days < 8:
+        major, minor = f"{days}d", f"{hours % 24}h"
+    else:
+        major, minor = f"{days}d", ""
+
+    # 5m0s is shown as 5m
+    return major if minor.startswith("0") else major + minor
+
+
+def pod_status(pod):
+    """The STATUS column of `kubectl get pods` for a pod"""
+    status = pod.get("status", {})
+    if pod["metadata"].get("deletionTimestamp"):
+        return "Terminating"
+
+    reason = status.get("reason") or status.get("phase", "Unknown")
+    for container in status.get("containerStatuses", []):
+        state = container.get("state", {})
+        if state.get("waiting", {}).get("reason"):
+            reason = state["waiting"]["reason"]
+        elif state.get("terminated", {}).get("reason"):
+            reason = state["terminated"]["reason"]
+    return reason
+
+
+@dataclass
+class PodRow:
+    """A pod's row in the status table"""
+
+    namespace: str
+    name: str
+    ready: str
+    status: str
+    restarts: str
+    created: float
+
+    @classmethod
+    def from_pod(cls, pod):
+        """The row for a pod from kubectl's JSON"""
+        metadata = pod["metadata"]
+        containers = pod.get("status", {}).get("containerStatuses", [])
+        total = len(pod.get("spec", {}).get("containers", [])) or len(containers)
+        ready = sum(1 for container in containers if container.get("ready"))
+        created = metadata.get("creationTimestamp")
+        return cls(
+            namespace=metadata.get("namespace", "default"),
+            name=metadata["name"],
+            ready=f"{ready}/{total}",
+            status=pod_status(pod),
+            restarts=str(sum(c.get("restartCount", 0) for c in containers)),
+            created=(
+                datetime.fromisoformat(created).timestamp() if created else time.time()
+            ),
+        )
+
+    def cells(self, all_namespaces):
+        """The row's cells, apart from the age"""
+        style = utils.pod_status_style(self.status)
+        cells = [self.namespace] if all_namespaces else []
+        return cells + [
+            self.name,
+            self.ready,
+            f"[{style}]{self.status}[/{style}]",
+            self.restarts,
+        ]
+
+
+class StatusModel:
+    """What the status screen shows, kept up to date by events"""
+
+    def __init__(self, namespace="default", all_namespaces=False):
+        self.namespace = namespace
+        self.all_namespaces = all_namespaces
+        self.cluster = STOPPED
+        self.registry = STOPPED
+        self.rows = {}
+        self.lock = threading.Lock()
+        self.changed = threading.Event()
+
+    def set_container(self, name, state):
+        """Record a k3d container's new state (RUNNING, PAUSED or STOPPED)"""
+        with self.lock:
+            if name == SERVER_CONTAINER and self.cluster != state:
+                self.cluster = state
+            elif name == REGISTRY_CONTAINER and self.registry != state:
+                self.registry = state
+            else:
+                return
+        self.changed.set()
+
+    def apply(self, event_type, pod):
+        """Update a pod's row from a watch event"""
+        metadata = pod["metadata"]
+        key = (metadata.get("namespace", "default"), metadata["name"])
+        with self.lock:
+            if event_type == "DELETED":
+                if self.rows.pop(key, None) is None:
+                    return
+            else:
+                row = PodRow.from_pod(pod)
+                cells = row.cells(self.all_namespaces)
+                if key in self.rows and self.rows[key][0] == row:
+                    return
+                self.rows[key] = (row, cells)
+        self.changed.set()
+
+    def clear_pods(self):
+        """Forget every pod (the watch is starting over)"""
+        with self.lock:
+            self.rows.clear()
+        self.changed.set()
+
+    def ages(self, now):
+        """Every pod's age as shown, to tell when a redraw is needed"""
+        with self.lock:
+            return [format_age(now - row.created) for row, _ in self.rows.values()]
+
+    def render(self, now=None):
+        """The status screen"""
+        now = now or time.time()
+        with self.lock:
+            if self.cluster != RUNNING:
+                return status_group(self.cluster, self.registry)
+
+            title = (
+                "Pods (All Namespaces)"
+                if self.all_namespaces
+                else f"Pods (Namespace: {self.namespace})"
+            )
+            if not self.rows:
+                table = Text(" No pods found.", style="italic")
+            else:
+                table = utils.new_pod_table(self.all_namespaces)
+                for key in sorted(self.rows):
+                    row, cells = self.rows[key]
+                    table.add_row(*cells, format_age(now - row.created))
+            return status_group(self.cluster, self.registry, title, table)
+
+
+def json_objects(lines):
+    """Each JSON object in a stream of pretty printed objects"""
+    buffer = ""
+    for line in lines:
+        buffer += line
+        if line.startswith("}"):
+            try:
+                yield json.loads(buffer)
+            except ValueError:
+                continue
+            buffer = ""
+
+
+class StatusWatch:
+    """Keeps a StatusModel current from kubectl and docker events and draws it"""
+
+    def __init__(self, namespace="default", all_namespaces=False, console=None):
+        self.model = StatusModel(namespace, all_namespaces)
+        self.console = console or Console()
+        self.stopping = threading.Event()
+        self.processes = set()
+        self.pod_watch = None
+
+    def _start(self, args):
+        """Start an event stream"""
+        process = subprocess.Popen(  # pylint: disable=consider-using-with
+            args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        self.processes.add(process)
+        return process
+
+    def watch_pods(self):
+        """Follow pod events whenever the cluster is up"""
+        scope = ["-A"] if self.model.all_namespaces else ["-n", self.model.namespace]
+        args = ["kubectl", "get", "pods", *scope, "--watch", "--output-watch-events"]
+        while not self.stopping.is_set():
+            if self.model.cluster != RUNNING:
+                self.stopping.wait(RECONNECT_DELAY)
+                continue
+
+            # The watch starts by listing every pod again
+            self.model.clear_pods()
+            with self._start(args + ["-o", "json"]) as process:
+                self.pod_watch = process
+                for event in json_objects(process.stdout):
+                    self.model.apply(event.get("type"), event.get("object", {}))
+            self.pod_watch = None
+            self.processes.discard(process)
+            self.stopping.wait(RECONNECT_DELAY)
+
+    def watch_docker(self):
+        """Follow the k3d server and registry containers starting, stopping and pausing"""
+        args = [
+            "docker",
+            "events",
+            "--format",
+            "{{json .}}",
+            "--filter",
+            "type=container",
+        ]
+        for name in (SERVER_CONTAINER, REGISTRY_CONTAINER):
+            args += ["--filter", f"container={name}"]
+        for action in CONTAINER_STATES:
+            args += ["--filter", f"event={action}"]
+
+        while not self.stopping.is_set():
+            with self._start(args) as process:
+                for line in process.stdout:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    state = CONTAINER_STATES.get(event.get("Action"))
+                    if state is None:
+                        continue
+                    attributes = event.get("Actor", {}).get("Attributes", {})
+                    self.model.set_container(attributes.get("name", ""), state)
+
+                    # A frozen API server never ends the pod watch, so end it here
+                    pod_watch = self.pod_watch
+                    if self.model.cluster != RUNNING and pod_watch is not None:
+                        pod_watch.terminate()
+            self.processes.discard(process)
+            self.stopping.wait(RECONNECT_DELAY)
+
+    def run(self):
+        """Draw the status until ^C, redrawing only when it changed"""
+        # Where things stand before the first events arrive
+        self.model.cluster = utils.get_cluster_status()
+        self.model.registry = utils.get_registry_status()
+        for name in utils.get_cluster_containers("paused"):
+            self.model.set_container(name, PAUSED)
+        for target in (self.watch_docker, self.watch_pods):
+            threading.Thread(target=target, daemon=True).start()
+
+        ages = self.model.ages(time.time())
+        with Live(
+            self.model.render(), console=self.console, auto_refresh=False
+        ) as live:
+            try:
+                while True:
+                    changed = self.model.changed.wait(timeout=1.0)
+                    self.model.changed.clear()
+                    now = time.time()
+                    new_ages = self.model.ages(now)
+                    if changed or new_ages != ages:
+                        ages = new_ages
+                        live.update(self.model.render(now), refresh=True)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                self.stopping.set()
+                for process in list(self.processes):
+                    process.terminate()
@@ -0,0 +1,139 @@
+"""Parsed config store for local.yaml and each pod's .auto/config.yaml
+
+Every YAML config file is parsed at most once per change.  Parsed files are
+cached by path, mtime and size in memory (and on disk under ~/.auto/cache so
+the next `auto` run can skip YAML entirely), and callers get read-only views so
+one caller can't change what the next one sees.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+
+CACHE_DIR = os.path.expanduser("~/.auto/cache/config")
+
+# Set AUTO_CONFIG_CACHE=0 to only cache parsed files in memory
+DISK_CACHE = os.environ.get("AUTO_CONFIG_CACHE", "1") != "0"
+
+_CACHE = {}
+_LOCK = threading.Lock()
+
+
+class ConfigError(ValueError):
+    """A config file exists but isn't valid YAML"""
+
+
+class FrozenDict(dict):
+    """A dict that refuses to be changed"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("config views are read-only, use store.thaw() for a copy")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value):
+    """Return a read-only view of parsed YAML (dicts and lists all the way down)"""
+    if isinstance(value, dict):
+        return FrozenDict({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Return a plain, mutable deep copy of a read-only view"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+def _parse(path):
+    """Parse a YAML file with libyaml's C loader when it is available"""
+    import yaml  # pylint: disable=import-outside-toplevel
+
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    try:
+        with open(path, encoding="utf-8") as yaml_file:
+            return yaml.load(yaml_file, Loader=loader)
+    except yaml.YAMLError as error:
+        raise ConfigError(f"Could not parse {path}: {error}") from error
+
+
+def _disk_path(path):
+    """Where the parsed copy of a config file is cached on disk"""
+    digest = hashlib.sha1(path.encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, f"{digest}.pickle")
+
+
+def _read_disk_cache(path, key):
+    """Return the cached parse of a file if it matches the file on disk now"""
+    try:
+        with open(_disk_path(path), "rb") as cache_file:
+            cached_path, cached_key, data = pickle.load(cache_file)
+    except (OSError, pickle.PickleError, EOFError, ValueError, TypeError):
+        return None, False
+    if cached_path != path or cached_key != key:
+        return None, False
+    return data, True
+
+
+def _write_disk_cache(path, key, data):
+    """Save a parsed file so other auto runs don't have to parse it again"""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        cache_path = _disk_path(path)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as cache_file:
+            pickle.dump((path, key, data), cache_file)
+        os.replace(tmp_path, cache_path)
+    except (OSError, pickle.PickleError):
+        # The disk cache is an optimisation, the parsed data is still good
+        pass
+
+
+def load(path):
+    """Return a read-only view of a YAML config file, or None if it doesn't exist.
+
+    Raises `ConfigError` if the file isn't valid YAML.
+    """
+    path = os.path.abspath(os.path.expanduser(path))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    with _LOCK:
+        cached = _CACHE.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        found = False
+        if DISK_CACHE:
+            data, found = _read_disk_cache(path, key)
+        if not found:
+            data = _parse(path)
+            if DISK_CACHE:
+                _write_disk_cache(path, key, data)
+
+        view = freeze(data)
+        _CACHE[path] = (key, view)
+        return view
+
+
+def invalidate(path=None):
+    """Drop one file (or everything) from the in-memory cache"""
+    with _LOCK:
+        if path is None:
+            _CACHE.clear()
+        else:
+            _CACHE.pop(os.path.abspath(os.path.expanduser(path)), None)
@@ -0,0 +1,214 @@
+"""Tests for auto.autocli.archive"""
+
+# pylint: disable=protected-access
+
+import gzip
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+from autocli import archive
+
+
+def stamp(second):
+    """A kubectl timestamp a few seconds into 2026"""
+    return f"2026-01-01T00:00:{second:02}.5Z"
+
+
+def collect(path, lines):
+    """Archive (pod, second, line) the way the collector does"""
+    collector = archive.Collector(str(path))
+    collector.apps = {"api-1-aaaaa": "api", "web-1-bbbbb": "web"}
+    for pod, second, line in lines:
+        collector.emit(pod, stamp(second), line)
+    collector.stop()
+    return collector
+
+
+def test_parse_time():
+    """--since and --until take durations ago or ISO times"""
+    assert archive.parse_time("90s", now=1000.0) == 910.0
+    assert archive.parse_time("2h", now=10000.0) == 2800.0
+    assert archive.parse_time("2026-01-01T00:00:00+00:00") == 1767225600.0
+    with pytest.raises(ValueError, match="not a duration"):
+        archive.parse_time("yesterday")
+
+
+def test_stamp_time():
+    """kubectl's nanosecond, Z-suffixed stamps parse on every Python"""
+    assert archive.stamp_time("2026-01-01T00:00:02.123456789Z") == pytest.approx(
+        1767225602.123456
+    )
+    assert archive.stamp_time("2026-01-01T00:00:02Z") == 1767225602.0
+    assert archive.stamp_time("2026-01-01T01:00:02.5+01:00") == 1767225602.5
+    with pytest.raises(ValueError, match="not a timestamp"):
+        archive.stamp_time("unable")
+
+
+def test_unstamped_lines_are_skipped(tmp_path):
+    """A line without a timestamp is neither archived nor breaks a search"""
+    collector = archive.Collector(str(tmp_path))
+    collector.emit("api-1-aaaaa", stamp(1), "before")
+    collector.emit("api-1-aaaaa", "garbage", "no stamp")
+    collector.emit("api-1-aaaaa", stamp(3), "after")
+    collector.stop()
+    assert [line for _, _, line in archive.search(path=str(tmp_path))] == [
+        "before",
+        "after",
+    ]
+
+    # A search window cutting through a damaged segment skips what it can't date
+    (segment,) = (tmp_path / "api-1-aaaaa").glob("*.log.gz")
+    with gzip.open(segment, "at", encoding="utf-8") as target:
+        target.write("garbage in the file\n")
+    since = archive.stamp_time(stamp(2))
+    assert [line for _, _, line in archive.search(since, path=str(tmp_path))] == [
+        "after"
+    ]
+
+
+def test_containers_archived_separately(tmp_path):
+    """Out of order lines from two containers of a pod are all kept, in time order"""
+    pod = {
+        "metadata": {"name": "api-1-aaaaa", "labels": {"app": "api"}},
+        "spec": {"containers": [{"name": "app"}, {"name": "sidecar"}]},
+        "status": {"phase": "Running"},
+    }
+    collector = archive.Collector(str(tmp_path))
+    with patch("autocli.pods.list_pods", return_value=[pod]):
+        assert set(collector.running_sources()) == {
+            "api-1-aaaaa/app",
+            "api-1-aaaaa/sidecar",
+        }
+    for name, second, line in [
+        ("api-1-aaaaa/app", 3, "app 3"),
+        ("api-1-aaaaa/sidecar", 1, "sidecar 1"),
+        ("api-1-aaaaa/sidecar", 1, "sidecar 1 again"),
+        ("api-1-aaaaa/app", 4, "app 4"),
+        ("api-1-aaaaa/sidecar", 2, "sidecar 2"),
+    ]:
+        collector.emit(name, stamp(second), line)
+    collector.stop()
+
+    found = archive.search(pod="api-1-aaaaa", path=str(tmp_path))
+    assert [line for _, _, line in found] == [
+        "sidecar 1",
+        "sidecar 1 again",
+        "sidecar 2",
+        "app 3",
+        "app 4",
+    ]
+    assert [line for _, _, line in archive.search(pod="api", path=str(tmp_path))][
+        -1
+    ] == "app 4"
+
+    collector = archive.Collector(str(tmp_path))
+    assert collector.resume == {
+        "api-1-aaaaa/app": stamp(4),
+        "api-1-aaaaa/sidecar": stamp(2),
+    }
+    collector.stop()
+
+
+@pytest.mark.parametrize("frozen", [False, True])
+def test_start_collector_command(tmp_path, frozen):
+    """A bundled auto runs its hidden command, a source checkout runs python"""
+    with patch.object(sys, "frozen", frozen, create=True), patch(
+        "subprocess.Popen", return_value=MagicMock(pid=42)
+    ) as mock_popen:
+        assert archive.start_collector(str(tmp_path)) == 42
+
+    command = mock_popen.call_args[0][0]
+    if frozen:
+        assert command == [sys.executable, "log-collector", "run"]
+    else:
+        assert command[:2] == [sys.executable, "-c"]
+        assert "archive.collect()" in command[2]
+
+
+def test_search_merges_pods_in_time_order(tmp_path):
+    """Lines from every pod come back in time order, filtered by pod and regex"""
+    collect(
+        tmp_path,
+        [
+            ("api-1-aaaaa", 1, "api started"),
+            ("web-1-bbbbb", 2, "web started"),
+            ("api-1-aaaaa", 3, "ERROR api broke"),
+            ("web-1-bbbbb", 4, "ERROR web broke"),
+        ],
+    )
+
+    found = list(archive.search(path=str(tmp_path)))
+    assert [line for _, _, line in found] == [
+        "api started",
+        "web started",
+        "ERROR api broke",
+        "ERROR web broke",
+    ]
+    assert found[0] == (stamp(1), "api-1-aaaaa", "api started")
+
+    errors = archive.search(grep="^ERROR", pod="web", path=str(tmp_path))
+    assert [line for _, _, line in errors] == ["ERROR web broke"]
+
+    window = archive.search(
+        since=archive.stamp_time(stamp(2)),
+        until=archive.stamp_time(stamp(3)),
+        path=str(tmp_path),
+    )
+    assert [line for _, _, line in window] == ["web started", "ERROR api broke"]
+
+    with pytest.raises(ValueError, match="not a valid regex"):
+        archive.search(grep="(", path=str(tmp_path))
+
+
+def test_segments_rotate_and_only_matching_ones_are_read(tmp_path):
+    """Full segments are closed, and a search skips segments outside its window"""
+    with patch.object(archive, "SEGMENT_BYTES", 1):
+        collect(
+            tmp_path, [("api-1-aaaaa", second, f"line {second}") for second in range(5)]
+        )
+
+    assert len(list((tmp_path / "api-1-aaaaa").iterdir())) == 5
+    since = archive.stamp_time(stamp(3))
+    segments = archive._segments(since, None, None, str(tmp_path))
+    assert len(segments["api-1-aaaaa"]) == 2
+    assert [line for _, _, line in archive.search(since, path=str(tmp_path))] == [
+        "line 3",
+        "line 4",
+    ]
+
+
+def test_open_segments_are_searchable(tmp_path):
+    """A segment still being written is read up to its last flush"""
+    collector = archive.Collector(str(tmp_path))
+    collector.emit("api-1-aaaaa", stamp(1), "still going")
+    collector.segments["api-1-aaaaa"].flush()
+
+    assert [line for _, _, line in archive.search(path=str(tmp_path))] == [
+        "still going"
+    ]
+    collector.stop()
+
+
+def test_prune_and_resume(tmp_path):
+    """Old segments are deleted over the size limit and a restart resumes"""
+    with patch.object(archive, "SEGMENT_BYTES", 1):
+        collect(tmp_path, [("api-1-aaaaa", second, "x" * 100) for second in range(3)])
+
+    index = archive.open_index(str(tmp_path))
+    sizes = [size for (size,) in index.execute("SELECT size FROM segments")]
+    archive.prune(index, max_bytes=sum(sizes) - 1)
+    assert index.execute("SELECT count(*) FROM segments").fetchone()[0] == 2
+    assert len(list((tmp_path / "api-1-aaaaa").iterdir())) == 2
+
+    collector = archive.Collector(str(tmp_path))
+    assert collector.resume == {"api-1-aaaaa": stamp(2)}
+    collector.stop()
+
+
+def test_segment_files_are_gzip_with_timestamps(tmp_path):
+    """Each archived line keeps its kubectl timestamp"""
+    collect(tmp_path, [("api-1-aaaaa", 1, "hello")])
+    (segment,) = (tmp_path / "api-1-aaaaa").iterdir()
+    with gzip.open(segment, "rt", encoding="utf-8") as source:
+        assert source.read() == f"{stamp(1)} hello\n"
@@ -0,0 +1,109 @@
+"""Tests for auto.autocli.batch"""
+
+import io
+import subprocess
+import threading
+from unittest.mock import patch
+
+import pytest
+from rich.console import Console
+
+from autocli import batch
+
+POD_CONFIGS = {
+    "api": {"init-command": "init.py", "seed-command": "seed.py"},
+    "web": {"seed-command": "seed.py", "depends-on": ["api"]},
+    "jobs": {"seed-command": "seed.py", "depends-on": ["web"]},
+}
+
+
+class FakeProcess:
+    """A kubectl exec that prints a line and exits"""
+
+    def __init__(self, args, fail):
+        self.stdout = io.StringIO(f"ran {args[-1]}\n")
+        self.returncode = 1 if fail else 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+def run(failing=(), configs=None, reverse=False):
+    """Run seed for every pod in POD_CONFIGS, recording the start order"""
+    configs = configs or POD_CONFIGS
+    started, lock = [], threading.Lock()
+
+    def popen(args, **kwargs):
+        assert kwargs["stdin"] == subprocess.DEVNULL
+        assert "-ti" not in args
+        pod = args[2]
+        with lock:
+            started.append(pod)
+        return FakeProcess(args, pod in failing)
+
+    output = io.StringIO()
+    with patch("autocli.utils.get_pod_config", side_effect=configs.get), patch(
+        "autocli.utils.get_full_pod_name", side_effect=lambda pod: pod
+    ), patch("subprocess.Popen", side_effect=popen):
+        results = batch.run_all(
+            list(configs),
+            lambda pod: batch.operation_commands("seed", pod),
+            "seed",
+            console=Console(file=output, width=200),
+            reverse=reverse,
+        )
+    return results, started, output.getvalue()
+
+
+def test_dependencies_run_first(tmp_path):
+    """A pod starts only once the pods it depends on are done"""
+    with patch.object(batch, "RUN_DIR", str(tmp_path)):
+        results, started, output = run()
+
+    assert all(result.ok for result in results.values())
+    assert started.index("web") > started.index("api")
+    assert started.index("jobs") > started.index("web")
+    assert "api  | ran /mnt/code/api/init.py" in output
+    assert results["api"].output == [
+        "ran /mnt/code/api/init.py",
+        "ran /mnt/code/api/seed.py",
+    ]
+    with open(results["web"].log_file, encoding="utf-8") as log:
+        assert log.read() == "ran /mnt/code/web/seed.py\n"
+
+
+def test_failure_skips_dependents(tmp_path):
+    """When a pod fails the pods depending on it (directly or not) are skipped"""
+    with patch.object(batch, "RUN_DIR", str(tmp_path)):
+        results, started, output = run(failing=("api",))
+
+    assert started == ["api"]
+    assert results["api"].returncode == 1
+    assert results["web"].skipped == "api failed"
+    assert results["jobs"].skipped == "web failed"
+    assert "skipped: api failed" in output
+
+
+def test_rollback_undoes_dependents_first(tmp_path):
+    """In reverse a pod waits for the pods that depend on it"""
+    with patch.object(batch, "RUN_DIR", str(tmp_path)):
+        results, started, _ = run(reverse=True, failing=("jobs",))
+
+    assert started == ["jobs"]
+    assert results["web"].skipped == "jobs failed"
+    assert results["api"].skipped == "web failed"
+
+    with patch.object(batch, "RUN_DIR", str(tmp_path)):
+        _, started, _ = run(reverse=True)
+    assert started.index("jobs") < started.index("web") < started.index("api")
+
+
+def test_dependency_loop():
+    """A depends-on loop is refused before anything runs"""
+    configs = {"a": {"depends-on": ["b"]}, "b": {"depends-on": ["a"]}}
+    with patch("autocli.utils.get_pod_config", side_effect=configs.get):
+        with pytest.raises(ValueError, match="a -> b -> a"):
+            batch.dependencies(["a", "b"])
@@ -0,0 +1,97 @@
+"""Tests for auto.autocli.certs"""
+
+import shutil
+import subprocess
+import time
+from unittest.mock import patch
+
+import pytest
+from autocli import certs
+
+
+def _make_cert(cert_dir, names, days=365):
+    """Write a self-signed key.pem/cert.pem covering the given names"""
+    san = ",".join(
+        f"IP:{name}" if name[0].isdigit() or ":" in name else f"DNS:{name}"
+        for name in names
+    )
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", str(cert_dir / "key.pem"), "-out", str(cert_dir / "cert.pem"),
+            "-days", str(days), "-subj", "/CN=auto", "-addext", f"subjectAltName={san}",
+        ],
+        check=True,
+        capture_output=True,
+    )  # fmt: skip
+
+
+@pytest.mark.skipif(not shutil.which("openssl"), reason="needs openssl")
+def test_certificates_reused_until_domains_change(tmp_path):
+    """mkcert only runs when the certificate no longer covers every domain"""
+    caroot = tmp_path / "ca"
+    caroot.mkdir()
+    (caroot / "rootCA.pem").write_text("ca", encoding="utf-8")
+    _make_cert(tmp_path, certs.BASE_NAMES + ["portal.local"])
+
+    with patch.multiple(
+        certs, CERT_DIR=str(tmp_path), STATE_FILE=str(tmp_path / "state.json")
+    ), patch.dict("os.environ", {"CAROOT": str(caroot)}), patch(
+        "autocli.utils.create_local_certs"
+    ) as mock_create, patch(
+        "autocli.utils.install_local_ca"
+    ) as mock_install, patch(
+        "autocli.utils.check_mkcert"
+    ):
+        certs._save_state(  # pylint: disable=protected-access
+            ca=certs.get_ca_fingerprint(), issuer=certs.get_ca_fingerprint()
+        )
+
+        assert certs.ensure_certificates(["portal.local"])[2] is False
+        mock_create.assert_not_called()
+        mock_install.assert_not_called()
+
+        assert certs.ensure_certificates(["portal.local", "shop.local"])[2] is True
+        mock_create.assert_called_once()
+        mock_install.assert_not_called()
+
+
+@pytest.mark.skipif(not shutil.which("openssl"), reason="needs openssl")
+def test_expiring_certificate_is_renewed(tmp_path):
+    """Certificates close to expiry are regenerated"""
+    _make_cert(tmp_path, certs.BASE_NAMES, days=5)
+    reason = certs.needs_regeneration(
+        str(tmp_path / "key.pem"), str(tmp_path / "cert.pem"), certs.BASE_NAMES
+    )
+    assert "expire" in reason
+
+
+@pytest.mark.skipif(not shutil.which("openssl"), reason="needs openssl")
+def test_read_certificate_names(tmp_path):
+    """Names and IP addresses are read back the way they were requested"""
+    _make_cert(tmp_path, certs.BASE_NAMES + ["portal.local"])
+    cert_file = str(tmp_path / "cert.pem")
+    expected = {"*.local", "localhost", "127.0.0.1", "::1", "portal.local"}
+
+    # Without cryptography the openssl text output is parsed
+    with patch.object(certs, "_read_with_cryptography", side_effect=ImportError):
+        certificate = certs.read_certificate(cert_file)
+        assert certificate["names"] == expected
+        assert certificate["expires"] > time.time()
+        assert certs.read_certificate(str(tmp_path / "missing.pem")) is None
+
+    pytest.importorskip("cryptography")
+    assert certs.read_certificate(cert_file) == certificate
+
+
+@patch("autocli.utils.check_mkcert")
+@patch("autocli.utils.install_local_ca", return_value=False)
+def test_failed_mkcert_keeps_regenerating(_mock_install, _mock_check, tmp_path):
+    """The CA and issuer are only recorded once mkcert succeeded"""
+    with patch.multiple(
+        certs, CERT_DIR=str(tmp_path), STATE_FILE=str(tmp_path / "state.json")
+    ), patch("autocli.utils.create_local_certs", return_value=None), patch.object(
+        certs, "get_ca_fingerprint", return_value="abc"
+    ):
+        assert certs.ensure_certificates(["portal.local"])[2] is False
+        assert certs._load_state() == {}  # pylint: disable=protected-access
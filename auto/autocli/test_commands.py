@@ -34,6 +34,20 @@ def test_stop_cluster(mock_stop):
     mock_stop.assert_called()
 
 
+@patch("autocli.core.bootstrap_cluster")
+@patch("autocli.pause.resume_cluster", return_value=True)
+@patch("autocli.pause.pause_cluster")
+def test_pause_and_resume(mock_pause, mock_resume, mock_bootstrap):
+    """--pause freezes the cluster and --resume thaws it without a full start"""
+    runner = CliRunner()
+    assert runner.invoke(commands.stop, ["--pause"]).exit_code == 0
+    mock_pause.assert_called()
+
+    assert runner.invoke(commands.start, ["--resume"]).exit_code == 0
+    mock_resume.assert_called()
+    mock_bootstrap.assert_not_called()
+
+
 @patch("autocli.core.delete_cluster")
 def test_delete_cluster(mock_delete):
     """Test the stop --delete-cluster command"""
@@ -51,3 +65,42 @@ def test_images_command(mock_list):
     result = runner.invoke(commands.images)
     assert result.exit_code == 0
     mock_list.assert_called()
+
+
+def test_startup_stays_lazy(fresh_python):
+    """`auto --version` in a fresh interpreter must not import the heavy
+    modules or parse local.yaml.
+    """
+    code = (
+        "import sys\n"
+        "from autocli import commands\n"
+        "commands.auto(['--version'], standalone_mode=False)\n"
+        "heavy = {'rich', 'requests', 'yaml', 'pyfiglet', 'autocli.config'}\n"
+        "print(sorted(heavy & set(sys.modules)))\n"
+    )
+    assert fresh_python(code) == "[]"
+
+
+@patch("autocli.batch.run_operation", return_value={})
+@patch("autocli.core.rollback_with_smalls")
+def test_rollback_all_takes_no_pod(mock_rollback, mock_operation):
+    """--all carries the migration number, a pod alongside it is refused"""
+    runner = CliRunner()
+    assert runner.invoke(commands.rollback, ["--all", "0123"]).exit_code == 0
+    mock_operation.assert_called_once_with("rollback", "0123")
+
+    result = runner.invoke(commands.rollback, ["--all", "0123", "portal"])
+    assert result.exit_code == 2
+    assert "don't name a pod" in result.output
+
+    assert runner.invoke(commands.rollback, ["portal", "0123"]).exit_code == 0
+    mock_rollback.assert_called_once_with("portal", "0123")
+
+
+@patch("autocli.archive.collect")
+def test_log_collector_run_is_hidden(mock_collect):
+    """The background collector runs through a command `--help` doesn't list"""
+    runner = CliRunner()
+    assert runner.invoke(commands.log_collector, ["run"]).exit_code == 0
+    mock_collect.assert_called_once_with()
+    assert " run " not in runner.invoke(commands.log_collector, ["--help"]).output
@@ -0,0 +1,60 @@
+"""Tests for auto.autocli.completion"""
+
+import os
+from unittest.mock import patch
+
+from autocli import commands, completion
+
+
+def _complete(tmp_path, capsys, words, cword):
+    """Run the fast path against an index built from the real CLI"""
+    index_path = str(tmp_path / "completion.json")
+    config_path = tmp_path / "local.yaml"
+    config_path.write_text("pods: []\n", encoding="utf-8")
+
+    with patch.multiple(
+        completion, INDEX_PATH=index_path, CONFIG_PATH=str(config_path)
+    ):
+        with patch.object(commands, "_configured_pod_names", return_value=["portal"]):
+            commands.refresh_completion_index()
+        completion.save_index(namespaces=["default", "ingress-nginx"])
+
+        env = {"_AUTO_COMPLETE": "bash_complete", "COMP_WORDS": words}
+        env["COMP_CWORD"] = str(cword)
+        with patch.dict(os.environ, env):
+            assert completion.fast_complete()
+
+    return capsys.readouterr().out.split()
+
+
+def test_fast_complete_candidates(tmp_path, capsys):
+    """Commands, pods and namespaces are all served from the index"""
+    assert "plain,start" in _complete(tmp_path, capsys, "auto st", 1)
+    assert _complete(tmp_path, capsys, "auto logs p", 2) == ["plain,portal"]
+    assert _complete(tmp_path, capsys, "auto status -n ing", 3) == [
+        "plain,ingress-nginx"
+    ]
+    assert "plain,--dry-run" in _complete(tmp_path, capsys, "auto start --d", 2)
+    assert _complete(tmp_path, capsys, "auto snapshot re", 2) == ["plain,restore"]
+
+
+def test_fast_complete_stale_index(tmp_path):
+    """A missing or stale index falls back to click"""
+    index_path = str(tmp_path / "completion.json")
+    with patch.multiple(completion, INDEX_PATH=index_path, CONFIG_PATH=index_path):
+        env = {
+            "_AUTO_COMPLETE": "bash_complete",
+            "COMP_WORDS": "auto ",
+            "COMP_CWORD": "1",
+        }
+        with patch.dict(os.environ, env):
+            assert not completion.fast_complete()
+
+
+def test_completion_import_is_light(fresh_python):
+    """The fast path must not pull in click, rich, yaml or requests"""
+    code = (
+        "import sys; from autocli import completion; "
+        "print(sorted({'click', 'rich', 'yaml', 'requests'} & set(sys.modules)))"
+    )
+    assert fresh_python(code) == "[]"
@@ -1,8 +1,10 @@
 """Tests for auto.autocli.core and auto.autocli.registry"""
 
-from unittest.mock import MagicMock, mock_open, patch
+from unittest.mock import MagicMock, patch
 
-from autocli import core, registry
+import yaml
+
+from autocli import core, pause, registry
 from autocli.config import CONFIG
 
 
@@ -20,10 +22,15 @@ def test_start_cluster_existing(mock_verify, mock_run):
     assert result is False
 
 
+@patch("autocli.core.write_cluster_config", return_value="/tmp/cluster.yaml")
+@patch("autocli.registry.import_ingress_images", return_value=True)
+@patch("autocli.registry.get_ingress_chart", return_value="/cache/ingress-nginx.tgz")
 @patch("autocli.utils.wait_for_pod_status")
 @patch("autocli.utils.run_and_wait")
 @patch("autocli.utils.verify_cluster_connection")
-def test_start_cluster_new(mock_verify, mock_run, mock_wait):
+def test_start_cluster_new(
+    mock_verify, mock_run, mock_wait, _mock_chart, _mock_images, _mock_config
+):
     """Test creating a new cluster"""
     progress = MagicMock()
     task = MagicMock()
@@ -47,22 +54,79 @@ def test_start_cluster_new(mock_verify, mock_run, mock_wait):
         result = core.start_cluster(progress, task)
         assert result is True
 
+    # The ingress controller comes from the cached chart in a single install
+    commands = [call.args[0] for call in mock_run.call_args_list]
+    assert not any("helm repo" in cmd or "rollout restart" in cmd for cmd in commands)
+    assert any("/cache/ingress-nginx.tgz" in cmd for cmd in commands)
+
+
+@patch("autocli.snapshot.create_volumes")
+@patch("autocli.utils.is_port_in_use", return_value=False)
+@patch("autocli.utils.get_required_system_pods", return_value={"mysql", "minio"})
+def test_write_cluster_config(
+    _mock_required, _mock_in_use, _mock_volumes, tmp_path, monkeypatch
+):
+    """Every port and the registry are declared in the generated k3d config"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    k3s_dir = tmp_path / ".auto" / "k3s"
+    k3s_dir.mkdir(parents=True)
+    (k3s_dir / "registries.yaml").write_text("mirrors: {}\n", encoding="utf-8")
+
+    with patch.dict(CONFIG, {"code": "/src", "https": True}):
+        config_path = core.write_cluster_config(use_https=True)
+
+    with open(config_path, encoding="utf-8") as config_file:
+        cluster_config = yaml.safe_load(config_file)
+    ports = [port["port"] for port in cluster_config["ports"]]
+    assert ports == ["80:80", "443:443", "3306:30036"]
+    assert cluster_config["volumes"][0] == {"volume": "/src:/mnt/code"}
+    assert {
+        "volume": "auto-k3s-server-0-state:/var/lib/rancher/k3s",
+        "nodeFilters": ["server:0"],
+    } in cluster_config["volumes"]
+    assert cluster_config["registries"]["config"] == "mirrors: {}\n"
+
+
+@patch("autocli.utils.run_and_wait", return_value=True)
+@patch(
+    "autocli.utils.get_cluster_containers", return_value=["k3d-k3s-default-server-0"]
+)
+def test_stop_paused_cluster(_mock_containers, mock_run, tmp_path):
+    """A paused cluster is unpaused before k3d stops it"""
+    marker = tmp_path / "paused"
+    marker.write_text("0", encoding="utf-8")
+
+    with patch.object(pause, "PAUSE_MARKER", str(marker)):
+        core.stop_cluster(MagicMock(), MagicMock())
+
+    commands = [call.args[0] for call in mock_run.call_args_list]
+    assert commands == [
+        "docker unpause k3d-k3s-default-server-0",
+        "/usr/local/bin/k3d cluster stop",
+    ]
+    assert not marker.exists()
+
+
+def _write_pod_config(code_dir, pod_name, pod_config):
+    """Create a pod's .auto/config.yaml inside a temporary code folder"""
+    auto_dir = code_dir / pod_name / ".auto"
+    auto_dir.mkdir(parents=True)
+    (auto_dir / "config.yaml").write_text(pod_config, encoding="utf-8")
+
 
-@patch("pathlib.Path.is_file")
 @patch("autocli.utils.run_and_wait")
-def test_stop_pod_helm(mock_run, mock_is_file):
+def test_stop_pod_helm(mock_run, tmp_path):
     """Test stopping a helm pod"""
     pod_config = """
     command: helm install
     name: myrelease
     """
+    _write_pod_config(tmp_path, "mypod", pod_config)
 
     mock_run.side_effect = [True, True]
-    mock_is_file.return_value = True
 
-    with patch("builtins.open", mock_open(read_data=pod_config)):
-        with patch.dict(CONFIG, {"code": "/tmp"}):
-            core.stop_pod("mypod")
+    with patch.dict(CONFIG, {"code": str(tmp_path)}):
+        core.stop_pod("mypod")
 
     found = False
     for call in mock_run.call_args_list:
@@ -73,27 +137,25 @@ def test_stop_pod_helm(mock_run, mock_is_file):
     assert found
 
 
-@patch("pathlib.Path.is_file")
 @patch("autocli.utils.run_and_wait")
-def test_stop_pod_kubectl(mock_run, mock_is_file):
+def test_stop_pod_kubectl(mock_run, tmp_path):
     """Test stopping a kubectl pod"""
     pod_config = """
     command: kubectl apply
     command_args: -f deployment.yaml
     """
+    _write_pod_config(tmp_path, "mypod", pod_config)
 
     mock_run.side_effect = [True, True]
-    mock_is_file.return_value = True
 
-    with patch("builtins.open", mock_open(read_data=pod_config)):
-        with patch.dict(CONFIG, {"code": "/tmp"}):
-            core.stop_pod("mypod")
+    with patch.dict(CONFIG, {"code": str(tmp_path)}):
+        core.stop_pod("mypod")
 
     found = False
     for call in mock_run.call_args_list:
         args, kwargs = call
         if "kubectl delete -f deployment.yaml" in args[0]:
-            assert kwargs.get("cwd") == "/tmp/mypod"
+            assert kwargs.get("cwd") == str(tmp_path / "mypod")
             found = True
             break
     assert found
@@ -111,9 +173,11 @@ def test_start_registry(mock_run):
     assert "registry create" in mock_run.call_args[0][0]
 
 
+@patch("autocli.snapshot.remove_volumes")
+@patch("autocli.completion.save_index")
 @patch("subprocess.run")
 @patch("autocli.utils.run_and_wait")
-def test_delete_cluster_success(mock_run_wait, mock_sub):
+def test_delete_cluster_success(mock_run_wait, mock_sub, _mock_index, _mock_volumes):
     """Test deleting cluster successfully"""
     progress = MagicMock()
     task = MagicMock()
@@ -141,17 +205,20 @@ def test_list_cluster_images(mock_local_pods, mock_run_return):
 
 @patch("autocli.utils.run_and_return")
 @patch("autocli.utils.get_full_pod_name")
-@patch("os.system")
+@patch("autocli.logstream.LogStream")
 @patch("autocli.utils.run_and_wait")
-def test_output_logs(mock_run_wait, mock_system, mock_name, mock_ip):
+def test_output_logs(mock_run_wait, mock_stream, mock_name, mock_ip):
     """Test log output logic"""
     mock_run_wait.return_value = False
     mock_name.return_value = "mypod-12345"
-    mock_ip.return_value = "10.0.0.5"
+    mock_ip.return_value = "10.0.0.5\n"
 
     core.output_logs("mypod")
 
-    cmd = mock_system.call_args[0][0]
-    assert "kubectl logs -f mypod-12345" in cmd
-    assert "grep --line-buffered -v" in cmd
-    assert "10.0.0.5" in cmd
+    app, skip = mock_stream.call_args[0]
+    assert app == "mypod"
+    assert mock_stream.return_value.run.called
+    assert skip.search("GET /health 200 kube-probe/1.29")
+    assert skip.search("10.42.1.1 - - GET /")
+    assert skip.search("connection from 10.0.0.5:5432")
+    assert not skip.search("10.42.0.12 - - GET /login")
@@ -0,0 +1,66 @@
+"""Tests for auto.autocli.db"""
+
+import re
+from unittest.mock import patch
+
+import pytest
+from autocli import db
+
+POD_CONFIG = {"system-pods": [{"name": "postgres", "databases": [{"name": "www"}]}]}
+
+
+def test_branch_name():
+    """Git branch names become safe database name suffixes"""
+    assert db.branch_name("feature/ABC-12") == "feature_abc_12"
+    with pytest.raises(db.DatabaseError):
+        db.branch_name("template")
+    with pytest.raises(db.DatabaseError):
+        db.branch_database("x" * 60, "long")
+
+
+def fake_psql(databases, comment=""):
+    """A psql that knows which databases exist and the active branch comment"""
+    scripts = []
+    databases = list(databases)
+
+    def run(script):
+        scripts.append(script)
+        databases.extend(re.findall(r'CREATE DATABASE "(\w+)"', script))
+        if script.startswith("SELECT datname"):
+            return "\n".join(databases)
+        if "shobj_description" in script:
+            return comment
+        return ""
+
+    return run, scripts
+
+
+@patch("autocli.utils.get_pod_config", return_value=POD_CONFIG)
+def test_create_branch_clones_and_switches(_mock_config):
+    """A branch is a template clone renamed into place with sessions kept out"""
+    run, scripts = fake_psql(["postgres", "www", "www__template"])
+    with patch.object(db, "psql", side_effect=run):
+        db.create_branch("portal", "feature/login")
+
+    assert any(
+        'CREATE DATABASE "www__feature_login" TEMPLATE "www__template"' in script
+        for script in scripts
+    )
+    switch_script = next(script for script in scripts if "RENAME" in script)
+    assert switch_script.index("ALLOW_CONNECTIONS false") < switch_script.index(
+        'ALTER DATABASE "www" RENAME TO "www__main"'
+    )
+    assert "IS 'auto-branch:feature_login'" in switch_script
+    assert "ALLOW_CONNECTIONS true" in scripts[-1]
+
+
+@patch("autocli.utils.get_pod_config", return_value=POD_CONFIG)
+def test_switch_needs_the_branch(_mock_config):
+    """Switching to a branch that was never made is an error, the active one a no-op"""
+    run, scripts = fake_psql(["www", "www__main"], comment="auto-branch:login")
+    with patch.object(db, "psql", side_effect=run):
+        with pytest.raises(db.DatabaseError):
+            db.switch("portal", "other")
+        db.switch("portal", "login")
+        assert db.list_branches("www") == ["login", "main"]
+    assert not any("RENAME" in script for script in scripts)
@@ -0,0 +1,109 @@
+"""Tests for auto.autocli.dumps"""
+
+import io
+import json
+import subprocess
+from unittest.mock import MagicMock, patch
+
+import pytest
+from autocli import db, dumps
+
+POD_CONFIG = {"system-pods": [{"name": "postgres", "databases": [{"name": "www"}]}]}
+
+
+class FakeProcess:
+    """A kubectl exec that prints a dump or swallows a restore"""
+
+    received = []
+
+    def __init__(self, args, stdin=None, **_kwargs):
+        self.args = args
+        self.returncode = 0
+        self.stdout = io.BytesIO(f"-- {' '.join(args[5:])}\n".encode("utf-8") * 1000)
+        self.stdin = MagicMock() if stdin == subprocess.PIPE else None
+        if self.stdin:
+            self.stdin.write.side_effect = lambda chunk: FakeProcess.received.append(
+                (args, chunk)
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+@patch("autocli.db.psql")
+@patch("autocli.utils.get_full_pod_name", return_value="postgres-pod")
+@patch("autocli.utils.get_pod_config", return_value=POD_CONFIG)
+def test_dump_and_restore_round_trip(_mock_config, _mock_pod, mock_psql, tmp_path):
+    """Tables stream to their own compressed files and back, schema first"""
+    tables = MagicMock(stdout="public.users\npublic.users_id_seq\n", returncode=0)
+    with patch("subprocess.Popen", FakeProcess), patch(
+        "subprocess.run", return_value=tables
+    ):
+        manifests = dumps.dump_pod("portal", str(tmp_path), jobs=2, compression="gzip")
+        assert manifests[0]["tables"] == ["public.users", "public.users_id_seq"]
+
+        folder = tmp_path / "postgres" / "www"
+        manifest = json.loads((folder / "manifest.json").read_text(encoding="utf-8"))
+        assert manifest["files"] == [
+            "schema.sql.gz",
+            "data-0000.sql.gz",
+            "data-0001.sql.gz",
+            "post.sql.gz",
+        ]
+
+        FakeProcess.received.clear()
+        assert dumps.restore_pod(str(tmp_path), jobs=2) == [("postgres", "www")]
+
+    assert "WITH (FORCE)" in mock_psql.call_args[0][0]
+    restored = b"".join(chunk for _, chunk in FakeProcess.received)
+    assert restored.startswith(b"-- pg_dump -U root -d www --no-owner")
+    assert b"--data-only --table public.users\n" in restored
+    assert FakeProcess.received[-1][1].startswith(b"-- pg_dump") and b"post-data" in (
+        FakeProcess.received[-1][1]
+    )
+
+
+def test_zstd_compression(tmp_path):
+    """zstd files stream in and out when zstandard is installed"""
+    pytest.importorskip("zstandard")
+    path = tmp_path / "dump.sql.zst"
+    with dumps.open_compressed(str(path), "wb", "zstd") as output:
+        output.write(b"select 1;\n" * 100)
+    with dumps.open_compressed(str(path), "rb", "zstd") as source:
+        assert source.read() == b"select 1;\n" * 100
+
+
+def test_mysql_triggers_are_dumped_after_the_data():
+    """MySQL triggers leave the schema and are restored after the rows"""
+    # pylint: disable=protected-access
+    steps = dict(dumps._dump_commands("mysql", "www", ["users"]))
+    assert "--skip-triggers" in steps["schema.sql"]
+    assert "--triggers" in steps["post.sql"] and "--no-data" in steps["post.sql"]
+    assert list(steps)[-1] == "post.sql"
+
+    with patch.object(dumps, "query") as mock_query:
+        dumps._recreate("mysql", "we`ird")
+    assert mock_query.call_args[0][2] == (
+        "DROP DATABASE IF EXISTS `we``ird`; CREATE DATABASE `we``ird`"
+    )
+
+
+def test_zstd_without_zstandard(tmp_path):
+    """A missing zstandard module is a DatabaseError before anything runs"""
+    folder = tmp_path / "www"
+    folder.mkdir()
+    (folder / "manifest.json").write_text(
+        json.dumps({"engine": "mysql", "database": "www", "compression": "zstd"}),
+        encoding="utf-8",
+    )
+    with patch.dict("sys.modules", {"zstandard": None}), patch.object(
+        dumps, "_recreate"
+    ) as mock_recreate:
+        with pytest.raises(db.DatabaseError, match="zstandard"):
+            dumps.dump_pod("portal", str(tmp_path), compression="zstd")
+        with pytest.raises(db.DatabaseError, match="zstandard"):
+            dumps.restore_database(str(folder))
+    mock_recreate.assert_not_called()
@@ -0,0 +1,73 @@
+"""Tests for auto.autocli.fixtures"""
+
+from unittest.mock import patch
+
+from autocli import fixtures
+
+POD_CONFIG = {"system-pods": [{"name": "postgres", "databases": [{"name": "www"}]}]}
+
+
+def test_read_csv_fixture(tmp_path):
+    """The header names the columns and only the body is streamed"""
+    path = tmp_path / "users.csv"
+    path.write_bytes(b'id,"full name"\r\n1,"Smith, Ann"\r\n2,Bob\r\n')
+    columns, newline, chunks = fixtures.read_fixture(str(path))
+    assert columns == ["id", "full name"]
+    assert newline == "\r\n"
+    assert b"".join(chunks) == b'1,"Smith, Ann"\r\n2,Bob\r\n'
+
+
+@patch("autocli.utils.get_pod_config", return_value=POD_CONFIG)
+def test_load_postgres_defers_indexes(_mock_config, tmp_path):
+    """Secondary indexes are rebuilt and sequences moved on after the COPY"""
+    (tmp_path / "users.csv").write_text("id,name\n1,Ann\n2,Bob\n", encoding="utf-8")
+    (tmp_path / "notes.txt").write_text("not a fixture", encoding="utf-8")
+    queries = []
+
+    def fake_query(_engine, _database, sql):
+        queries.append(sql)
+        if "pg_indexes" in sql:
+            return [["public.users_name", "CREATE INDEX users_name ON users (name)"]]
+        if "pg_attribute" in sql:
+            return [["id"]]
+        return []
+
+    def fake_feed(_engine, command, chunks):
+        assert b"".join(chunks) == b"1,Ann\n2,Bob\n"
+        assert 'COPY "public"."users" ("id", "name") FROM STDIN' in command[-1]
+        return "SET\nCOPY 2\n"
+
+    reported = []
+    with patch("autocli.dumps.query", side_effect=fake_query), patch(
+        "autocli.dumps.feed", side_effect=fake_feed
+    ):
+        engine, database = fixtures.pod_database("portal")
+        results = fixtures.load(engine, database, str(tmp_path), report=reported.append)
+
+    assert (engine, database) == ("postgres", "www")
+    assert [(result.table, result.rows) for result in results] == [("users", 2)]
+    assert reported == results
+    assert queries[1] == "DROP INDEX public.users_name;"
+    assert queries[2] == "CREATE INDEX users_name ON users (name);"
+    assert queries[4] == (
+        "SELECT setval(pg_get_serial_sequence('\"public\".\"users\"', 'id'), "
+        'coalesce(max("id"), 0) + 1, false) FROM "public"."users"'
+    )
+
+
+def test_load_mysql_empty_fields_are_null(tmp_path):
+    """MySQL loads into variables so an empty field becomes NULL, like COPY"""
+    path = tmp_path / "users.csv"
+    path.write_text("id,name\n1,\n2,Bob\n", encoding="utf-8")
+
+    def fake_feed(_engine, command, chunks):
+        assert b"".join(chunks) == b"1,\n2,Bob\n"
+        assert "--local-infile=1" in command
+        assert "SET GLOBAL" not in command[-1]
+        assert "(@c0, @c1) SET `id` = NULLIF(@c0, ''), `name` = NULLIF(@c1, '')" in (
+            command[-1]
+        )
+        return "2\n"
+
+    with patch("autocli.dumps.feed", side_effect=fake_feed):
+        assert fixtures.LOADERS["mysql"]("www", "users", str(path)) == 2
@@ -0,0 +1,137 @@
+"""Tests for auto.autocli.logstream"""
+
+import io
+import queue
+from unittest.mock import MagicMock, patch
+
+from autocli import logstream
+from rich.console import Console
+
+SESSIONS = [
+    # The container restarts after its second line
+    "2026-01-01T00:00:01.5Z first\n2026-01-01T00:00:02.25Z GET / kube-probe/1.29\n",
+    # Reconnecting from the last timestamp repeats that line once
+    "2026-01-01T00:00:02.250000000Z GET / kube-probe/1.29\n2026-01-01T00:00:03Z second\n",
+]
+
+
+def test_stamp_key():
+    """Timestamps with their trailing zeros dropped still sort correctly"""
+    assert logstream.stamp_key("2026-01-01T00:00:02.25Z") == logstream.stamp_key(
+        "2026-01-01T00:00:02.250000000Z"
+    )
+    assert logstream.stamp_key("2026-01-01T00:00:02.3Z") > logstream.stamp_key(
+        "2026-01-01T00:00:02.25Z"
+    )
+
+
+def test_follow_reconnects_without_repeats():
+    """A restart reconnects from the last line seen, skipping health checks"""
+    commands = []
+
+    def popen(args, **_kwargs):
+        commands.append(args)
+        process = MagicMock(stdout=io.StringIO(SESSIONS[len(commands) - 1]))
+        process.__enter__.return_value = process
+        return process
+
+    stream = logstream.LogStream("api", logstream.health_filter())
+    with patch("subprocess.Popen", side_effect=popen), patch.object(
+        logstream, "RECONNECT_DELAY", 0
+    ), patch.object(
+        stream, "running_sources", side_effect=[{"api-1": ("api-1", None)}, {}]
+    ):
+        stream.follow("api-1", ("api-1", None))
+
+    assert "--tail=10" in commands[0]
+    assert "--since-time=2026-01-01T00:00:02.25Z" in commands[1]
+    lines = []
+    while not stream.lines.empty():
+        lines.append(stream.lines.get())
+    assert lines == [
+        ("api-1", "2026-01-01T00:00:01.5Z", "first"),
+        ("api-1", "2026-01-01T00:00:03Z", "second"),
+        ("api-1", "2026-01-01T00:00:03Z", None),
+    ]
+
+
+def test_containers_are_followed_separately():
+    """Each container keeps its own place, however the stamps of two interleave"""
+    sessions = {
+        # The sidecar's clock is behind, and it logs two lines in the same instant
+        "sidecar": [
+            "2026-01-01T00:00:01Z s1\n2026-01-01T00:00:01Z s1 again\n",
+            "2026-01-01T00:00:01Z s1\n2026-01-01T00:00:01Z s1 again\n"
+            "2026-01-01T00:00:01Z s1 once more\n2026-01-01T00:00:02Z s2\n",
+        ],
+        "app": ["2026-01-01T00:00:05Z a5\n", "2026-01-01T00:00:06Z a6\n"],
+    }
+    commands = []
+
+    def popen(args, **_kwargs):
+        commands.append(args)
+        container = args[args.index("-c") + 1]
+        process = MagicMock(stdout=io.StringIO(sessions[container].pop(0)))
+        process.__enter__.return_value = process
+        return process
+
+    pod = {
+        "metadata": {"name": "api-1", "labels": {"app": "api"}},
+        "spec": {"containers": [{"name": "app"}, {"name": "sidecar"}]},
+        "status": {"phase": "Running"},
+    }
+    stream = logstream.LogStream("api")
+    with patch("autocli.pods.list_pods", return_value=[pod]):
+        sources = stream.running_sources()
+    assert sources == {
+        "api-1/app": ("api-1", "app"),
+        "api-1/sidecar": ("api-1", "sidecar"),
+    }
+
+    with patch("subprocess.Popen", side_effect=popen), patch.object(
+        logstream, "RECONNECT_DELAY", 0
+    ), patch.object(stream, "running_sources", side_effect=[sources, {}] * 2):
+        stream.follow("api-1/app", sources["api-1/app"])
+        stream.follow("api-1/sidecar", sources["api-1/sidecar"])
+
+    assert "--since-time=2026-01-01T00:00:01Z" in commands[3]
+    lines = []
+    while not stream.lines.empty():
+        lines.append(stream.lines.get()[::2])
+    assert lines == [
+        ("api-1/app", "a5"),
+        ("api-1/app", "a6"),
+        ("api-1/app", None),
+        ("api-1/sidecar", "s1"),
+        ("api-1/sidecar", "s1 again"),
+        ("api-1/sidecar", "s1 once more"),
+        ("api-1/sidecar", "s2"),
+        ("api-1/sidecar", None),
+    ]
+
+
+def test_full_queue_waits_for_the_printer():
+    """Followers block on a full queue instead of buffering without limit"""
+    stream = logstream.LogStream("api")
+    stream.lines = queue.Queue(maxsize=1)
+    stream._put("api-1", "", "one")  # pylint: disable=protected-access
+    stream.stopping.set()
+    stream._put("api-1", "", "two")  # pylint: disable=protected-access
+    assert stream.lines.qsize() == 1
+
+
+def test_discover_and_print():
+    """Every running pod is followed once and printed with its own prefix"""
+    output = io.StringIO()
+    stream = logstream.LogStream("api", console=Console(file=output, width=200))
+    sources = {"api-1": ("api-1", None), "api-2": ("api-2", None)}
+    with patch.object(stream, "running_sources", return_value=sources), patch(
+        "threading.Thread"
+    ) as mock_thread:
+        stream.discover()
+        stream.discover()
+
+    assert mock_thread.call_count == 2
+    stream.print_line("api-2", "hello")
+    stream.print_line("api-1", None)
+    assert output.getvalue() == "api-2 | hello\napi-1 | -- log stream ended\n"
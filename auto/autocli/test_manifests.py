@@ -0,0 +1,52 @@
+"""Tests for auto.autocli.manifests"""
+
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+from autocli import manifests
+
+K3S_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "k3s")
+
+
+def test_split_commands():
+    """Plain `kubectl apply -f` commands become manifests, others are kept"""
+    paths, others = manifests.split_commands(
+        ["kubectl apply -f ~/.auto/k3s/mysql/pv.yaml", "kubectl rollout status x"]
+    )
+    assert paths == ["~/.auto/k3s/mysql/pv.yaml"]
+    assert others == ["kubectl rollout status x"]
+
+
+def test_shipped_system_pods_bundle():
+    """Every system pod shipped with auto is a valid, ordered bundle"""
+    for pod_name in ["mysql", "postgres", "minio", "matomo", "mssql"]:
+        kinds = [doc["kind"] for doc in manifests.load([f"{K3S_DIR}/{pod_name}"])]
+        assert "Deployment" in kinds
+
+    stream = manifests.bundle([f"{K3S_DIR}/mysql/"])
+    assert stream.index("kind: PersistentVolume\n") < stream.index("kind: Deployment")
+
+
+def test_invalid_manifest(tmp_path):
+    """Objects without a kind (or missing files) are rejected locally"""
+    (tmp_path / "bad.yaml").write_text("apiVersion: v1\n", encoding="utf-8")
+    with pytest.raises(manifests.ManifestError):
+        manifests.load([str(tmp_path)])
+    with pytest.raises(manifests.ManifestError):
+        manifests.load([str(tmp_path / "missing.yaml")])
+
+
+@patch("time.sleep")
+@patch("subprocess.run")
+def test_apply_is_one_retried_call(mock_run, _mock_sleep):
+    """The whole bundle is one server-side apply, retried as a unit"""
+    mock_run.side_effect = [
+        MagicMock(returncode=1, stderr="connection refused"),
+        MagicMock(returncode=0),
+    ]
+    assert manifests.apply([f"{K3S_DIR}/pv.yaml", f"{K3S_DIR}/pvc.yaml"])
+    assert mock_run.call_count == 2
+    args, kwargs = mock_run.call_args
+    assert "--server-side" in args[0]
+    assert "kind: PersistentVolumeClaim" in kwargs["input"]
@@ -0,0 +1,30 @@
+"""Tests for auto.autocli.pause"""
+
+import time
+from unittest.mock import MagicMock, patch
+
+from autocli import pause
+
+
+@patch("autocli.utils.get_cluster_clock_skew", return_value=0.0)
+@patch("autocli.utils.run_and_wait", return_value=True)
+@patch("autocli.utils.get_cluster_containers")
+def test_pause_resume_cluster(mock_containers, mock_run, _mock_skew, tmp_path):
+    """Pausing freezes every container and a long pause is healed on resume"""
+    marker = tmp_path / "paused"
+    mock_containers.return_value = ["k3d-k3s-default-server-0", "k3d-registry.local"]
+
+    with patch.object(pause, "PAUSE_MARKER", str(marker)):
+        pause.pause_cluster(MagicMock(), MagicMock())
+        assert mock_run.call_args[0][0] == (
+            "docker pause k3d-k3s-default-server-0 k3d-registry.local"
+        )
+
+        # Pretend we were frozen for an hour
+        marker.write_text(str(time.time() - 3600), encoding="utf-8")
+        assert pause.resume_cluster()
+
+    commands = [call.args[0] for call in mock_run.call_args_list]
+    assert "docker unpause k3d-k3s-default-server-0 k3d-registry.local" in commands
+    assert any("node.kubernetes.io/unreachable-" in cmd for cmd in commands)
+    assert not marker.exists()
@@ -0,0 +1,164 @@
+"""Tests for auto.autocli.pods"""
+
+# pylint: disable=protected-access
+
+import io
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from autocli import pods
+
+
+def pod(name, labels=None, phase="Running", ready=True, created="2026-01-01T00:00:00Z"):
+    """A pod as kubectl's JSON describes it"""
+    return {
+        "metadata": {
+            "name": name,
+            "labels": labels or {},
+            "creationTimestamp": created,
+        },
+        "status": {
+            "phase": phase,
+            "conditions": [{"type": "Ready", "status": str(ready)}],
+        },
+    }
+
+
+@pytest.fixture(name="listing")
+def fixture_listing():
+    """Serve a pod listing, with a watch that runs once it is started"""
+    watch = MagicMock()
+    watch.poll.return_value = None
+    items = []
+    state = {"pods": None, "watch": None, "watching": False, "generation": 0}
+    with patch.dict(pods._CACHE, state), patch(
+        "autocli.pods._watch", return_value=watch
+    ), patch("subprocess.run") as mock_run:
+        mock_run.side_effect = lambda *args, **kwargs: MagicMock(
+            returncode=0, stdout=json.dumps({"items": items})
+        )
+        yield items, mock_run
+
+
+def test_labels_beat_name_prefixes(listing):
+    """portal resolves to the pod labelled portal, never portal-worker"""
+    items, _ = listing
+    items += [
+        pod("portal-worker-6d4b8-abcde", {"app": "portal-worker"}),
+        pod("portal-7f9c6-xyz12", {"app.kubernetes.io/instance": "portal"}),
+    ]
+    assert pods.resolve("portal") == "portal-7f9c6-xyz12"
+    assert pods.resolve("portal-worker") == "portal-worker-6d4b8-abcde"
+    assert pods.resolve("missing") == ""
+
+
+def test_prefers_ready_and_newest(listing):
+    """A terminating or starting pod loses to a ready one"""
+    items, _ = listing
+    old = pod("mysql-1-aaaaa", {"app": "mysql"}, created="2026-01-01T00:00:00Z")
+    old["metadata"]["deletionTimestamp"] = "2026-01-02T00:00:00Z"
+    items += [
+        old,
+        pod(
+            "mysql-1-bbbbb",
+            {"app": "mysql"},
+            ready=False,
+            created="2026-01-03T00:00:00Z",
+        ),
+        pod("mysql-1-ccccc", {"app": "mysql"}, created="2026-01-02T00:00:00Z"),
+        pod("mysql-1-ddddd", {"app": "mysql"}, phase="Pending"),
+    ]
+    assert pods.resolve("mysql") == "mysql-1-ccccc"
+
+
+def test_unlabelled_deployment_pods(listing):
+    """Without app labels only <deployment>-<pod-template-hash>-<id> names match"""
+    items, _ = listing
+    items += [
+        pod("web-worker-5f7d9-abcde", {"pod-template-hash": "5f7d9"}),
+        pod("web-5f7d9-fghij", {"pod-template-hash": "5f7d9"}),
+    ]
+    assert pods.resolve("web") == "web-5f7d9-fghij"
+    assert pods.app_name(items[0]) == "web-worker"
+
+
+def test_other_apps_daemonset_and_job_pods(listing):
+    """Generated names of other controllers, or of other labelled apps, never match"""
+    items, _ = listing
+    items += [
+        pod("web-agent-7xk2p", {"controller-revision-hash": "6c9b7d"}),
+        pod("web-migrate-q8w3z", {"job-name": "web-migrate"}),
+        pod("web-5f7d9-fghij", {"app": "web-proxy", "pod-template-hash": "5f7d9"}),
+    ]
+    assert pods.resolve("web") == ""
+    assert pods.app_name(items[1]) == "web-migrate-q8w3z"
+
+
+def test_listing_cached_until_a_pod_changes(listing):
+    """Lookups share one listing until the watch reports a change"""
+    items, mock_run = listing
+    items.append(pod("api-1-aaaaa", {"app": "api"}))
+    pods.start_watch()
+    assert pods.resolve("api") == "api-1-aaaaa"
+    assert pods.resolve("api") == "api-1-aaaaa"
+    assert mock_run.call_count == 1
+
+    items[0] = pod("api-1-bbbbb", {"app": "api"})
+    pods.invalidate()
+    assert pods.resolve("api") == "api-1-bbbbb"
+    assert mock_run.call_count == 2
+
+
+def test_short_commands_share_a_listing(listing):
+    """Without start_watch the listing lasts until auto itself changes pods"""
+    items, mock_run = listing
+    items.append(pod("api-1-aaaaa", {"app": "api"}))
+    assert pods.resolve("api") == "api-1-aaaaa"
+    assert pods.resolve("api") == "api-1-aaaaa"
+    assert mock_run.call_count == 1
+    assert pods._CACHE["watch"] is None
+
+    items[0] = pod("api-1-bbbbb", {"app": "api"})
+    pods.invalidate()
+    assert pods.resolve("api") == "api-1-bbbbb"
+    assert mock_run.call_count == 2
+
+
+def test_missing_pod_lists_again(listing):
+    """A pod that isn't running in the shared listing is looked for once more"""
+    items, mock_run = listing
+    assert pods.resolve("api") == ""
+    assert mock_run.call_count == 2
+
+    items.append(pod("api-1-aaaaa", {"app": "api"}))
+    assert pods.resolve("api") == "api-1-aaaaa"
+    assert mock_run.call_count == 3
+
+
+def test_change_during_listing_is_not_cached(listing):
+    """A listing fetched while a pod changed is used once, then fetched again"""
+    items, mock_run = listing
+    items.append(pod("api-1-aaaaa", {"app": "api"}))
+
+    def changed_while_listing(*_args, **_kwargs):
+        pods.invalidate()
+        return MagicMock(returncode=0, stdout=json.dumps({"items": items}))
+
+    mock_run.side_effect = changed_while_listing
+    assert pods.resolve("api") == "api-1-aaaaa"
+    assert pods._CACHE["pods"] is None
+
+
+def test_watch_clears_cache():
+    """Every line from the watch clears the listing, and its end drops the watch"""
+    process = MagicMock(stdout=io.StringIO("pod/api-1-aaaaa\n"))
+    state = {"pods": [], "watch": None, "watching": True, "generation": 0}
+    with patch.dict(pods._CACHE, state), patch(
+        "subprocess.Popen", return_value=process
+    ), patch("threading.Thread") as mock_thread, patch("atexit.register"):
+        assert pods._watch() is process
+        pods._CACHE["watch"] = process
+        mock_thread.call_args[1]["target"]()
+        assert pods._CACHE["pods"] is None and pods._CACHE["watch"] is None
+        assert pods._CACHE["generation"] == 2
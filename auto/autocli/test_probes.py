@@ -0,0 +1,58 @@
+"""Tests for auto.autocli.probes"""
+
+import socket
+import struct
+import threading
+
+from autocli import probes
+
+
+def _serve_once(reply, read_first=True):
+    """Listen on a free port and answer the first connection with `reply`"""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+
+    def answer():
+        conn, _ = server.accept()
+        with conn:
+            # MySQL servers speak first, Postgres waits for the startup message
+            if read_first:
+                conn.recv(1024)
+            conn.sendall(reply)
+        server.close()
+
+    threading.Thread(target=answer, daemon=True).start()
+    return server.getsockname()[1]
+
+
+def _postgres_error(code):
+    """A Postgres ErrorResponse with the given SQLSTATE"""
+    body = b"SFATAL\0C" + code + b"\0Mnope\0\0"
+    return b"E" + struct.pack("!I", len(body) + 4) + body
+
+
+def test_mysql_handshake():
+    """Only a protocol 10 greeting counts as ready"""
+    greeting = b"\x4a\x00\x00\x00\x0a8.0.36\x00"
+    assert probes.mysql_ready(_serve_once(greeting, read_first=False))
+    assert not probes.mysql_ready(
+        _serve_once(b"\x05\x00\x00\x00\xff", read_first=False)
+    )
+
+
+def test_postgres_startup():
+    """Auth requests and real errors are ready, "starting up" is not"""
+    auth_ok = b"R" + struct.pack("!II", 8, 0)
+    assert probes.postgres_ready(_serve_once(auth_ok))
+    assert probes.postgres_ready(_serve_once(_postgres_error(b"28P01")))
+    assert not probes.postgres_ready(_serve_once(_postgres_error(b"57P03")))
+
+
+def test_closed_port_times_out_fast():
+    """Nothing listening means not ready, within the deadline"""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+    server.close()
+    assert not probes.wait_until(probes.mysql_ready, port, deadline=0.1)
@@ -0,0 +1,92 @@
+"""Tests for auto.autocli.reconcile"""
+
+from unittest.mock import patch
+
+from autocli import core, reconcile
+from autocli.config import CONFIG
+
+
+def test_referenced_paths(tmp_path):
+    """Manifests and values files are found relative to the pod folder"""
+    command = "kubectl apply -f deploy.yaml --values=/abs/values.yaml -f https://x/y"
+    assert reconcile.referenced_paths(command, str(tmp_path)) == [
+        str(tmp_path / "deploy.yaml"),
+        "/abs/values.yaml",
+    ]
+
+
+def test_fingerprint_tracks_inputs(tmp_path):
+    """The hash changes with the manifests, the command and the pod config"""
+    manifests = tmp_path / "k3s"
+    manifests.mkdir()
+    (manifests / "deployment.yaml").write_text("replicas: 1\n", encoding="utf-8")
+    command = f"kubectl apply -f {manifests}"
+
+    digest = reconcile.fingerprint([command], settings={"name": "portal"})
+    assert digest == reconcile.fingerprint([command], settings={"name": "portal"})
+
+    (manifests / "deployment.yaml").write_text("replicas: 2\n", encoding="utf-8")
+    changed = reconcile.fingerprint([command], settings={"name": "portal"})
+    assert changed != digest
+    assert changed != reconcile.fingerprint([command], settings={"name": "other"})
+    assert changed != reconcile.fingerprint([f"{command} --prune"])
+
+
+def _start(tmp_path, applied, running_pods):
+    """Start a kubectl pod against a given applied state"""
+    with patch.object(reconcile, "_APPLIED", applied), patch.object(
+        reconcile, "_patch_state", return_value=True
+    ), patch("autocli.core._execute_pod_install", return_value=True) as mock_install:
+        with patch.dict(CONFIG, {"code": str(tmp_path)}):
+            core.start_pod("portal", running_pods)
+    return mock_install
+
+
+def test_start_pod_skips_unchanged(tmp_path):
+    """A running pod is only applied again when its inputs change"""
+    pod_folder = tmp_path / "portal"
+    (pod_folder / ".auto").mkdir(parents=True)
+    (pod_folder / ".auto" / "config.yaml").write_text(
+        "command: kubectl apply\ncommand_args: -f deploy.yaml\n", encoding="utf-8"
+    )
+    (pod_folder / "deploy.yaml").write_text("kind: Deployment\n", encoding="utf-8")
+
+    applied = {}
+    assert _start(tmp_path, applied, []).called
+    digest = applied["pod.portal"]
+
+    running = [{"metadata": {"name": "portal-abc", "labels": {"app": "portal"}}}]
+    assert not _start(tmp_path, applied, running).called
+
+    (pod_folder / "deploy.yaml").write_text("kind: StatefulSet\n", encoding="utf-8")
+    assert _start(tmp_path, applied, running).called
+    assert applied["pod.portal"] != digest
+
+
+def test_is_running_matches_whole_apps():
+    """portal isn't running just because portal-worker is"""
+    worker = {
+        "metadata": {
+            "name": "portal-worker-6d4b8-abcde",
+            "labels": {"app": "portal-worker"},
+        }
+    }
+    assert not reconcile.is_running("portal", [worker])
+    assert reconcile.is_running("portal-worker", [worker])
+
+
+@patch("autocli.core._recover_pvc_conflict")
+@patch("autocli.utils.run_and_wait", return_value=False)
+def test_failed_update_keeps_running_release(mock_run, mock_recover):
+    """A failed helm upgrade of a running pod never uninstalls it"""
+    assert not core._execute_pod_install(  # pylint: disable=protected-access
+        "helm upgrade --install portal .",
+        "/code/portal",
+        "portal",
+        True,
+        "portal",
+        upgrade=True,
+    )
+    commands = [call[0][0] for call in mock_run.call_args_list]
+    assert commands == ["helm upgrade --install portal ."]
+    assert not mock_recover.called
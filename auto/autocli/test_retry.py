@@ -0,0 +1,81 @@
+"""Tests for auto.autocli.retry"""
+
+import subprocess
+from unittest.mock import MagicMock, patch
+
+import pytest
+from autocli import retry, utils
+
+FAST = retry.Policy(first_delay=0.001, max_delay=0.004, deadline=1.0, jitter=0.0)
+
+
+def test_backoff_grows_to_the_cap():
+    """Delays double from the first delay and stop at the maximum"""
+    policy = retry.Policy(first_delay=0.01, max_delay=0.05, jitter=0.0)
+    assert [policy.delay(number) for number in range(1, 6)] == [
+        0.01,
+        0.02,
+        0.04,
+        0.05,
+        0.05,
+    ]
+    jittered = retry.Policy(first_delay=1.0, jitter=0.2)
+    assert all(0.8 <= jittered.delay(1) <= 1.2 for _ in range(20))
+
+
+def test_call_retries_until_accepted():
+    """Failures and unaccepted results are retried, every attempt is recorded"""
+    results = iter([ValueError("not yet"), False, "ready"])
+
+    def attempt():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert retry.call(attempt, FAST, name="warm up") == "ready"
+    stats = retry.HISTORY["warm up"]
+    assert stats.succeeded
+    assert [bool(attempt.error) for attempt in stats.attempts] == [True, True, False]
+
+
+def test_call_gives_up():
+    """Attempts and deadlines are limits, other errors aren't retried"""
+    policy = retry.Policy(first_delay=0.001, max_attempts=3, jitter=0.0)
+    with pytest.raises(retry.RetryError) as error:
+        retry.call(lambda: 0, policy)
+    assert len(error.value.stats.attempts) == 3
+    assert error.value.last == 0
+
+    deadline = retry.Policy(first_delay=0.01, deadline=0.05, jitter=0.0)
+    with pytest.raises(retry.RetryError):
+        retry.call(lambda: False, deadline)
+
+    calls = MagicMock(side_effect=KeyError("boom"))
+    with pytest.raises(KeyError):
+        retry.call(calls, FAST, retry_on=(ValueError,))
+    assert calls.call_count == 1
+
+
+@patch("time.sleep")
+@patch("subprocess.run")
+def test_run_and_wait_reconnects_kubectl(mock_run, _mock_sleep):
+    """Only lost kubectl connections are retried, after refreshing the kubeconfig"""
+    refused = subprocess.CalledProcessError(1, "kubectl", stderr=b"connection refused")
+    mock_run.side_effect = [refused, MagicMock(), MagicMock(stdout=b"")]
+    assert utils.run_and_wait("kubectl get pods", suppress_error=True)
+    assert "kubeconfig merge" in mock_run.call_args_list[1][0][0]
+
+    mock_run.reset_mock()
+    mock_run.side_effect = [subprocess.CalledProcessError(1, "kubectl", stderr=b"nope")]
+    assert not utils.run_and_wait("kubectl get pods", suppress_error=True)
+    assert mock_run.call_count == 1
+
+
+def test_history_is_bounded():
+    """Only the most recently used operation names are remembered"""
+    with patch.dict(retry.HISTORY, clear=True), patch.object(retry, "MAX_HISTORY", 3):
+        for number in range(5):
+            retry.call(lambda: True, FAST, name=f"op {number}")
+        retry.call(lambda: True, FAST, name="op 2")
+        assert list(retry.HISTORY) == ["op 3", "op 4", "op 2"]
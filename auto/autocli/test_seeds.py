@@ -0,0 +1,91 @@
+"""Tests for auto.autocli.seeds"""
+
+from unittest.mock import DEFAULT, patch
+
+from autocli import seeds
+from autocli.config import CONFIG
+
+POD_CONFIG = {
+    "init-command": "init_db.py",
+    "seed-command": "seed_db.py --big",
+    "system-pods": [{"name": "mysql", "databases": [{"name": "www"}]}],
+}
+
+
+def test_seed_key_tracks_scripts_and_migrations(tmp_path):
+    """The key changes with the seed script, the migrations and the config"""
+    pod_dir = tmp_path / "portal"
+    (pod_dir / "migrations").mkdir(parents=True)
+    (pod_dir / "seed_db.py").write_text("rows = 10\n", encoding="utf-8")
+
+    with patch.dict(CONFIG, {"code": str(tmp_path)}), patch(
+        "autocli.utils.get_pod_config", return_value=POD_CONFIG
+    ):
+        key = seeds.seed_key("portal")
+        assert key == seeds.seed_key("portal")
+
+        (pod_dir / "migrations" / "0001.sql").write_text("x", encoding="utf-8")
+        migrated = seeds.seed_key("portal")
+        assert migrated != key
+
+        (pod_dir / "seed_db.py").write_text("rows = 20\n", encoding="utf-8")
+        assert seeds.seed_key("portal") not in (key, migrated)
+
+
+SHARED_CONFIG = {
+    "system-pods": [
+        {"name": "mysql", "databases": [{"name": "www"}]},
+        {"name": "minio", "buckets": [{"name": "uploads"}, {"name": "media"}]},
+    ]
+}
+
+
+@patch("autocli.db.refresh_templates")
+def test_save_then_restore(mock_templates, tmp_path):
+    """Only the pod's own databases and buckets are saved and restored"""
+    config = {
+        "system-pods": [
+            {"name": "mysql", "databases": [{"name": "www"}]},
+            {"name": "minio", "buckets": [{"name": "uploads"}]},
+        ]
+    }
+    with patch.object(seeds, "SEED_DIR", str(tmp_path)), patch.dict(
+        CONFIG, {"code": str(tmp_path), "pods": ["portal"]}
+    ), patch("autocli.utils.get_pod_config", return_value=config), patch.multiple(
+        "autocli.dumps",
+        dump_database=DEFAULT,
+        restore_database=DEFAULT,
+        stream_out=DEFAULT,
+        stream_in=DEFAULT,
+    ) as mocks:
+        assert not seeds.restore("portal")
+        assert seeds.save("portal")
+        assert seeds.restore("portal")
+
+    mock_dump, mock_restore = mocks["dump_database"], mocks["restore_database"]
+    mock_out, mock_in = mocks["stream_out"], mocks["stream_in"]
+    assert mock_dump.call_args[0][:2] == ("mysql", "www")
+    assert mock_out.call_args[0][1] == ["tar", "-cf", "-", "-C", "/storage", "uploads"]
+    assert mock_restore.call_args[0][0].endswith("/mysql/www")
+    assert "rm -rf /storage/uploads && tar -xf" in mock_in.call_args[0][1][-1]
+    mock_templates.assert_called_once_with("portal")
+
+
+@patch("autocli.dumps.dump_database")
+def test_shared_databases_are_not_snapshotted(mock_dump, tmp_path, capsys):
+    """A bucket another pod also uses would be reset for it too, so it is refused"""
+    configs = {
+        "portal": SHARED_CONFIG,
+        "shop": {"system-pods": [{"name": "minio", "buckets": [{"name": "media"}]}]},
+        "reports": {"system-pods": [{"name": "mysql", "databases": [{"name": "bi"}]}]},
+    }
+    with patch.object(seeds, "SEED_DIR", str(tmp_path)), patch.dict(
+        CONFIG, {"code": str(tmp_path), "pods": ["portal", "shop", "reports"]}
+    ), patch("autocli.utils.get_pod_config", side_effect=configs.get):
+        # Sharing the MySQL engine with reports is fine, sharing a bucket isn't
+        assert seeds.shared_data("portal") == ["media"]
+        assert seeds.shared_data("reports") == []
+        assert not seeds.save("portal")
+
+    assert "other pods also use media" in capsys.readouterr().out
+    mock_dump.assert_not_called()
@@ -0,0 +1,79 @@
+"""Tests for auto.autocli.services"""
+
+import time
+from unittest.mock import patch
+
+import pytest
+from autocli import services
+from autocli.config import CONFIG
+
+
+def test_system_pods_come_up_concurrently():
+    """Each engine waits on its own gate and creates its databases right away"""
+    delays = {"mysql": 0.3, "postgres": 0.3, "minio": 0.3}
+    created = []
+
+    def fake_ready(pod_name):
+        time.sleep(delays[pod_name])
+        return True
+
+    creators = {
+        engine: (lambda names, engine=engine: created.append((engine, names)))
+        for engine in delays
+    }
+    with patch.object(services, "wait_until_ready", side_effect=fake_ready), patch.dict(
+        services.DATABASE_CREATORS, creators
+    ), patch.object(
+        services, "requested_databases", side_effect=lambda engine: [engine + "_db"]
+    ):
+        start = time.monotonic()
+        results = services._bring_up_all(  # pylint: disable=protected-access
+            ["mysql", "postgres", "minio"], create_dbs=True
+        )
+        elapsed = time.monotonic() - start
+
+    assert results == [True, True, True]
+    assert sorted(created) == [
+        ("minio", ["minio_db"]),
+        ("mysql", ["mysql_db"]),
+        ("postgres", ["postgres_db"]),
+    ]
+    assert elapsed < 0.6
+
+
+def test_broken_pod_config_stops_before_bring_up():
+    """A pod config error exits on the main thread, before any engine is waited on"""
+    with patch.object(services, "wait_until_ready") as mock_ready, patch.object(
+        services, "requested_databases", side_effect=SystemExit(1)
+    ):
+        with pytest.raises(SystemExit):
+            services._bring_up_all(  # pylint: disable=protected-access
+                ["mysql", "postgres"], create_dbs=True
+            )
+    mock_ready.assert_not_called()
+
+
+@patch("autocli.utils.run_and_wait", return_value=False)
+def test_wait_until_ready_needs_rollout(mock_run):
+    """A deployment that never rolls out isn't probed any further"""
+    with patch.dict(services.READINESS_PROBES, {"mysql": lambda: True}):
+        assert not services.wait_until_ready("mysql", timeout=1)
+    assert "rollout status deployment/mysql" in mock_run.call_args[0][0]
+
+
+def test_engine_databases_are_one_batch():
+    """Databases requested by several pods are created together, once each"""
+    pod_configs = {
+        "portal": {"system-pods": [{"name": "mysql", "databases": [{"name": "app"}]}]},
+        "admin": {
+            "system-pods": [
+                {"name": "mysql", "databases": [{"name": "app"}, {"name": "audit"}]},
+                {"name": "minio", "buckets": [{"name": "uploads"}]},
+            ]
+        },
+    }
+    with patch.dict(CONFIG, {"pods": ["portal", "admin"]}), patch(
+        "autocli.utils.get_pod_config", side_effect=pod_configs.get
+    ), patch("autocli.utils.create_mysql_databases", return_value=True) as mock_create:
+        services.create_engine_databases("mysql")
+    mock_create.assert_called_once_with(["app", "audit"])
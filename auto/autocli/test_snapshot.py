@@ -0,0 +1,67 @@
+"""Tests for auto.autocli.snapshot"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+from autocli import snapshot
+
+
+def test_cluster_volumes():
+    """Every node gets a named volume for its state and the system pod data"""
+    volumes = snapshot.cluster_volumes(agents=1)
+    assert len(volumes) == 2 * len(snapshot.NODE_MOUNTS)
+    assert {
+        "volume": "auto-k3s-agent-0-data:/mnt/data",
+        "nodeFilters": ["agent:0"],
+    } in volumes
+
+
+@patch("autocli.utils.run_and_wait", return_value=True)
+def test_save_and_restore_volumes(mock_run, tmp_path):
+    """Volumes are streamed to tar files and back, with a manifest"""
+    cluster_config = tmp_path / "cluster.yaml"
+    cluster_config.write_text("kind: Simple\n", encoding="utf-8")
+
+    with patch.object(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots")):
+        assert snapshot.save_volumes("golden", 0, str(cluster_config))
+        saved = [call.args[0] for call in mock_run.call_args_list]
+        assert len(saved) == len(snapshot.NODE_MOUNTS)
+        assert all("tar -cf - -C /from ." in cmd for cmd in saved)
+
+        manifest = json.loads(
+            (tmp_path / "snapshots" / "golden" / "manifest.json").read_text()
+        )
+        assert manifest["volumes"][0] == "auto-k3s-server-0-state"
+        assert [m["name"] for m in snapshot.list_snapshots()] == ["golden"]
+
+        # A save that was interrupted leaves its folder behind
+        leftover = tmp_path / "snapshots" / "golden.123.tmp"
+        leftover.mkdir()
+        (leftover / "manifest.json").write_text(json.dumps(manifest))
+        assert [m["name"] for m in snapshot.list_snapshots()] == ["golden"]
+
+        mock_run.reset_mock()
+        with patch.object(snapshot, "get_volumes", return_value=[]):
+            assert snapshot.restore_volumes("golden")
+        restored = [call.args[0] for call in mock_run.call_args_list]
+        assert "docker volume create auto-k3s-server-0-state" in restored
+        assert any("tar -xf - -C /to" in cmd for cmd in restored)
+
+
+def test_snapshot_names_stay_inside_the_snapshot_folder(tmp_path):
+    """Names that would escape SNAPSHOT_DIR are refused everywhere"""
+    with patch.object(snapshot, "SNAPSHOT_DIR", str(tmp_path)):
+        assert snapshot.snapshot_path("golden-1.2_x") == str(tmp_path / "golden-1.2_x")
+        for name in ("..", ".", "../config", "/etc", "a/b", ""):
+            with pytest.raises(ValueError, match="valid snapshot name"):
+                snapshot.snapshot_path(name)
+            assert snapshot.load_manifest(name) is None
+
+
+def test_has_volumes():
+    """Only clusters with every node's volumes can be snapshotted"""
+    volumes = [f"auto-k3s-server-0-{mount}" for mount in snapshot.NODE_MOUNTS]
+    with patch.object(snapshot, "get_volumes", return_value=volumes):
+        assert snapshot.has_volumes(0)
+        assert not snapshot.has_volumes(1)
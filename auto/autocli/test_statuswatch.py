@@ -0,0 +1,157 @@
+"""Tests for auto.autocli.statuswatch"""
+
+import io
+import json
+from unittest.mock import MagicMock, patch
+
+from autocli import statuswatch
+from rich.console import Console
+
+
+def pod(name, phase="Running", ready=True, restarts=0, waiting=None):
+    """A pod as kubectl's JSON describes it"""
+    state = {"waiting": {"reason": waiting}} if waiting else {"running": {}}
+    return {
+        "metadata": {
+            "name": name,
+            "namespace": "default",
+            "creationTimestamp": "2026-01-01T00:00:00Z",
+        },
+        "spec": {"containers": [{"name": "app"}]},
+        "status": {
+            "phase": phase,
+            "containerStatuses": [
+                {"ready": ready, "restartCount": restarts, "state": state}
+            ],
+        },
+    }
+
+
+def render(model, now):
+    """The status screen as text"""
+    output = io.StringIO()
+    Console(file=output, width=120).print(model.render(now))
+    return output.getvalue()
+
+
+def test_format_age():
+    """Ages read like kubectl's"""
+    assert statuswatch.format_age(45) == "45s"
+    assert statuswatch.format_age(312) == "5m12s"
+    assert statuswatch.format_age(300) == "5m"
+    assert statuswatch.format_age(42 * 60) == "42m"
+    assert statuswatch.format_age(3 * 3600 + 300) == "3h5m"
+    assert statuswatch.format_age(20 * 3600) == "20h"
+    assert statuswatch.format_age(2 * 86400 + 4 * 3600) == "2d4h"
+    assert statuswatch.format_age(12 * 86400) == "12d"
+
+
+def test_pod_row():
+    """Rows show what `kubectl get pods` shows"""
+    row = statuswatch.PodRow.from_pod(
+        pod("api", ready=False, restarts=3, waiting="CrashLoopBackOff")
+    )
+    assert (row.ready, row.status, row.restarts) == ("0/1", "CrashLoopBackOff", "3")
+    assert row.cells(False)[2] == "[red]CrashLoopBackOff[/red]"
+
+    deleting = pod("web")
+    deleting["metadata"]["deletionTimestamp"] = "2026-01-01T00:01:00Z"
+    assert statuswatch.pod_status(deleting) == "Terminating"
+
+
+def test_model_only_changes_on_real_changes():
+    """Only events that change a row ask for a redraw"""
+    model = statuswatch.StatusModel()
+    model.cluster = statuswatch.RUNNING
+
+    model.apply("ADDED", pod("api"))
+    assert model.changed.is_set()
+    model.changed.clear()
+
+    model.apply("MODIFIED", pod("api"))
+    assert not model.changed.is_set()
+
+    model.apply("MODIFIED", pod("api", restarts=1))
+    assert model.changed.is_set()
+    model.changed.clear()
+
+    created = model.rows[("default", "api")][0].created
+    screen = render(model, created + 45)
+    assert "Pods (Namespace: default)" in screen
+    assert "api" in screen and "45s" in screen
+
+    model.apply("DELETED", pod("api"))
+    assert model.changed.is_set()
+    assert "No pods found." in render(model, created)
+
+
+def test_json_objects():
+    """Pretty printed watch events are read one object at a time"""
+    events = [{"type": "ADDED", "object": {"a": {"b": 1}}}, {"type": "DELETED"}]
+    text = "".join(json.dumps(event, indent=4) + "\n" for event in events)
+    lines = io.StringIO(text).readlines()
+    assert list(statuswatch.json_objects(lines)) == events
+
+
+def test_docker_events_update_the_cluster():
+    """The k3d server stopping shows the cluster as stopped"""
+    watch = statuswatch.StatusWatch()
+    watch.model.cluster = statuswatch.RUNNING
+    events = [
+        {
+            "Action": "die",
+            "Actor": {"Attributes": {"name": "k3d-k3s-default-server-0"}},
+        },
+        {"Action": "start", "Actor": {"Attributes": {"name": "k3d-registry.local"}}},
+    ]
+    process = MagicMock(
+        stdout=io.StringIO("".join(json.dumps(e) + "\n" for e in events))
+    )
+    process.__enter__.return_value = process
+
+    def stop(*_args, **_kwargs):
+        watch.stopping.set()
+        return process
+
+    with patch("subprocess.Popen", side_effect=stop):
+        watch.watch_docker()
+
+    assert watch.model.cluster == statuswatch.STOPPED
+    assert watch.model.registry == statuswatch.RUNNING
+    assert "Cluster is stopped" in render(watch.model, 0)
+
+
+def test_pausing_ends_the_pod_watch():
+    """A paused cluster shows as paused, and its hung pod watch is ended"""
+    watch = statuswatch.StatusWatch()
+    watch.model.cluster = statuswatch.RUNNING
+    watch.pod_watch = MagicMock()
+    events = [
+        {
+            "Action": "pause",
+            "Actor": {"Attributes": {"name": "k3d-k3s-default-server-0"}},
+        },
+        {
+            "Action": "exec_start",
+            "Actor": {"Attributes": {"name": "k3d-registry.local"}},
+        },
+    ]
+    process = MagicMock(
+        stdout=io.StringIO("".join(json.dumps(e) + "\n" for e in events))
+    )
+    process.__enter__.return_value = process
+
+    def stop(args, **_kwargs):
+        assert "event=pause" in args and "event=unpause" in args
+        watch.stopping.set()
+        return process
+
+    with patch("subprocess.Popen", side_effect=stop):
+        watch.watch_docker()
+
+    assert watch.model.cluster == statuswatch.PAUSED
+    watch.pod_watch.terminate.assert_called_once_with()
+    assert "Cluster is paused" in render(watch.model, 0)
+
+    watch.model.set_container("k3d-k3s-default-server-0", statuswatch.RUNNING)
+    assert watch.model.cluster == statuswatch.RUNNING
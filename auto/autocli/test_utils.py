@@ -1,22 +1,21 @@
 """Tests for auto.autocli.utils and auto.autocli.config"""
 
+import json
 import subprocess
-from unittest.mock import MagicMock, mock_open, patch
+from unittest.mock import MagicMock, patch
 
-from autocli import config, utils
+import pytest
+from autocli import config, store, utils
 
 
 @patch("autocli.config.Confirm.ask")
 @patch("os.makedirs")
 @patch("os.path.exists")
 @patch("os.path.isfile")
-@patch("builtins.open", new_callable=mock_open, read_data="code: /tmp/code")
-@patch("yaml.safe_load")
-def test_load_config(
-    mock_yaml, _mock_file, mock_isfile, mock_exists, mock_makedirs, mock_confirm
-):
+@patch("autocli.store.load")
+def test_load_config(mock_load, mock_isfile, mock_exists, mock_makedirs, mock_confirm):
     """Test loading configuration safely routes from config.py"""
-    mock_yaml.return_value = {"code": "/tmp/code"}
+    mock_load.return_value = store.freeze({"code": "/tmp/code"})
 
     # Case 1: Config exists, code dir exists
     mock_isfile.return_value = True
@@ -49,9 +48,10 @@ def test_load_config(
         mock_error.assert_called_with("Code directory missing. Cannot proceed.")
 
 
+@patch("autocli.pods.invalidate")
 @patch("subprocess.run")
-def test_run_and_wait_success(mock_run):
-    """Test successful command execution"""
+def test_run_and_wait_success(mock_run, mock_invalidate):
+    """Test successful command execution, which drops the shared pod listing"""
     mock_run.return_value = MagicMock(returncode=0, stdout=b"success\n")
 
     result = utils.run_and_wait("echo test")
@@ -59,6 +59,7 @@ def test_run_and_wait_success(mock_run):
     mock_run.assert_called_with(
         "echo test", capture_output=True, shell=True, check=True, cwd=None
     )
+    mock_invalidate.assert_called_once_with()
 
 
 @patch("subprocess.run")
@@ -83,27 +84,66 @@ def test_run_and_wait_failure(mock_run):
 
 
 @patch("autocli.utils.run_and_wait")
+@patch("autocli.utils._is_process_running")
+@patch("autocli.utils.shutil.which")
 @patch("autocli.utils.declare_error")
-def test_check_docker(mock_declare_error, mock_run):
+def test_check_docker(mock_declare_error, mock_which, mock_running, mock_run):
     """Test docker dependency check"""
-    mock_run.side_effect = [True, True, True]
+    mock_which.return_value = "/usr/bin/docker"
+    mock_running.return_value = True
+    mock_run.return_value = True
     errors = utils.check_docker()
     assert errors == 0
 
-    mock_run.side_effect = [False, False, False]
+    mock_which.return_value = None
+    mock_running.return_value = False
+    mock_run.return_value = False
     errors = utils.check_docker()
     assert errors == 3
     mock_declare_error.assert_called()
 
 
+@patch("autocli.utils.declare_error")
+def test_check_host_entry(mock_declare_error, tmp_path):
+    """/etc/hosts is read once and matched by hostname"""
+    hosts = tmp_path / "hosts"
+    hosts.write_text(
+        "127.0.0.1 localhost\n127.0.0.1 k3d-registry.local portal.local # dev\n",
+        encoding="utf-8",
+    )
+    utils.get_host_entries.cache_clear()
+    with patch.object(utils, "HOSTS_FILE", str(hosts)):
+        assert utils.check_host_entry("k3d-registry", exit_auto=False)
+        assert utils.check_host_entry("portal", exit_auto=False)
+        assert not utils.check_host_entry("dev", exit_auto=False)
+    utils.get_host_entries.cache_clear()
+    mock_declare_error.assert_called_once()
+
+
+def test_dependency_fingerprint_cache(tmp_path):
+    """A fingerprint only counts as verified once it has been saved"""
+    with patch.object(utils, "DEPENDENCY_CACHE", str(tmp_path / "deps.json")):
+        fingerprint = utils.dependency_fingerprint()
+        assert not utils.dependencies_verified(fingerprint)
+        utils.save_dependency_fingerprint(fingerprint)
+        assert utils.dependencies_verified(fingerprint)
+        fingerprint["hosts"] = [0, 0]
+        assert not utils.dependencies_verified(fingerprint)
+
+
+@patch("autocli.pods._watch", return_value=None)
 @patch("subprocess.run")
-def test_get_full_pod_name(mock_run):
+def test_get_full_pod_name(mock_run, _mock_watch):
     """Test getting full pod name"""
-    mock_run.return_value = MagicMock(stdout=b"mypod-12345\n")
+    pod = {
+        "metadata": {"name": "mypod-12345", "labels": {"app": "mypod"}},
+        "status": {"phase": "Running"},
+    }
+    mock_run.return_value = MagicMock(returncode=0, stdout=json.dumps({"items": [pod]}))
 
     name = utils.get_full_pod_name("mypod")
     assert name == "mypod-12345"
-    assert "kubectl get pods" in mock_run.call_args[0][0][0]
+    assert mock_run.call_args[0][0][:3] == ["kubectl", "get", "pods"]
 
 
 @patch("os.getcwd", return_value="/tmp")
@@ -130,34 +170,106 @@ def test_pull_repo(mock_run, mock_exists, mock_chdir, _mock_getcwd):
 
 @patch("autocli.utils.get_full_pod_name")
 @patch("subprocess.run")
-def test_create_mysql_database(mock_run, mock_pod_name):
-    """Test database creation with retries"""
+def test_create_mysql_databases(mock_run, mock_pod_name):
+    """Every database is created by one idempotent script, retried as a unit"""
     mock_pod_name.return_value = "mysql-pod"
 
-    utils.create_mysql_database("mydb")
-    mock_run.assert_called()
+    assert utils.create_mysql_databases(["app", "app_test"])
+    script = mock_run.call_args[1]["input"].decode("utf-8")
+    assert script == (
+        "CREATE DATABASE IF NOT EXISTS `app`;\n"
+        "CREATE DATABASE IF NOT EXISTS `app_test`;\n"
+    )
 
+    # A pod replaced between attempts is looked up again
+    mock_run.reset_mock()
+    mock_pod_name.reset_mock()
+    mock_pod_name.side_effect = ["old-pod", "new-pod"]
     mock_run.side_effect = [subprocess.CalledProcessError(1, "cmd"), MagicMock()]
     with patch("time.sleep"):
-        utils.create_mysql_database("mydb", retries=0)
-    assert mock_run.call_count == 3
+        assert utils.create_mysql_databases(["app"])
+    assert mock_run.call_count == 2
+    assert mock_pod_name.call_count == 2
+    assert "-i new-pod" in mock_run.call_args[0][0][0]
 
 
-@patch("os.path.isfile")
-@patch("builtins.open", new_callable=mock_open, read_data="name: test\n")
-@patch("yaml.safe_load")
-def test_get_pod_config(mock_yaml, _mock_file, mock_isfile):
+@patch("autocli.utils.get_full_pod_name", return_value="postgres-pod")
+@patch("subprocess.run")
+def test_create_postgres_databases(mock_run, _mock_pod_name):
+    """Postgres builds its missing CREATE DATABASE statements and runs them with gexec"""
+    assert utils.create_postgres_databases(["app", "o'brien"])
+    assert mock_run.call_count == 1
+    script = mock_run.call_args[1]["input"].decode("utf-8")
+    assert "ARRAY['app', 'o''brien']" in script
+    assert script.rstrip().endswith("\\gexec")
+
+    # Databases that already exist still get a template
+    create, templates = script.split("\\set ON_ERROR_STOP 0\n")
+    assert "TEMPLATE" not in create
+    assert "datname = name || '__template'" in templates
+    assert "-i postgres-pod" in mock_run.call_args[0][0][0]
+
+    assert utils.create_postgres_databases([])
+    assert mock_run.call_count == 1
+
+
+def test_get_pod_config(tmp_path):
     """Test fetching pod config mapped straight to global CONFIG object"""
-    mock_isfile.return_value = True
-    mock_yaml.return_value = {"name": "test"}
+    auto_dir = tmp_path / "mypod" / ".auto"
+    auto_dir.mkdir(parents=True)
+    (auto_dir / "config.yaml").write_text("name: test\n", encoding="utf-8")
 
     # Simulate dynamically patched dictionary entry
-    with patch.dict("autocli.config.CONFIG", {"code": "/code"}):
+    with patch.dict("autocli.config.CONFIG", {"code": str(tmp_path)}):
         res_config = utils.get_pod_config("mypod")
         assert res_config["name"] == "test"
 
-    mock_isfile.return_value = False
     with patch("autocli.utils.declare_error") as mock_err:
-        with patch.dict("autocli.config.CONFIG", {"code": "/code"}):
-            utils.get_pod_config("mypod")
+        with patch.dict("autocli.config.CONFIG", {"code": str(tmp_path)}):
+            utils.get_pod_config("missing")
             mock_err.assert_called()
+
+
+def test_lazy_config():
+    """The global config is only parsed the first time it is read"""
+    loader = MagicMock(return_value={"code": "/tmp/code"})
+    lazy = config.LazyConfig(loader)
+
+    assert not lazy.loaded
+    loader.assert_not_called()
+
+    assert lazy["code"] == "/tmp/code"
+    assert lazy.get("pods", []) == []
+    loader.assert_called_once()
+
+    lazy.reload()
+    assert not lazy.loaded
+    assert "code" in lazy
+    assert loader.call_count == 2
+
+
+def test_store_caches_parsed_files(tmp_path):
+    """Config files are parsed once per change and handed out read-only"""
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("version: 1.0\nsystem-pods:\n  - name: mysql\n")
+
+    with patch.object(store, "CACHE_DIR", str(tmp_path / "cache")):
+        first = store.load(str(config_file))
+        assert first["system-pods"][0]["name"] == "mysql"
+        with pytest.raises(TypeError):
+            first["version"] = "2.0"
+
+        # Served from memory until the file changes
+        with patch("autocli.store._parse") as mock_parse:
+            assert store.load(str(config_file)) is first
+            mock_parse.assert_not_called()
+
+        # A new process reads the parsed copy from the disk cache
+        store.invalidate()
+        with patch("autocli.store._parse") as mock_parse:
+            assert store.load(str(config_file)) == first
+            mock_parse.assert_not_called()
+
+        config_file.write_text("version: 2.0\n")
+        assert store.load(str(config_file))["version"] == 2.0
+        assert store.load(str(tmp_path / "missing.yaml")) is None
@@ -1,6 +1,7 @@
 """Utils for the auto commands"""
 
-import configparser
+import functools
+import json
 import os
 import re
 import shlex
@@ -8,11 +9,12 @@ import shutil
 import socket
 import subprocess
 import sys
+import time
 from subprocess import CalledProcessError
 from time import sleep
 
-import yaml
-from autocli.config import CONFIG
+from autocli import pods, retry, store
+from autocli.config import load_pod_config, pod_config_path
 from rich import print as rprint
 from rich.table import Table
 from rich.text import Text
@@ -67,7 +69,7 @@ def ensure_host_known(git_url):
         )
 
 
-def run_command_inside_pod(pod, command):
+def run_command_inside_pod(pod, command) -> bool:
     """Run a command inside a pod"""
 
     # Verify this pod is installed and running
@@ -81,10 +83,10 @@ def run_command_inside_pod(pod, command):
     # Init the database
     if config:
         command = f"kubectl exec -ti {pod_name} -- /mnt/code/{pod}/{command}"
-        run_and_wait(command, capture_output=False)
+        return bool(run_and_wait(command, capture_output=False))
 
-    else:
-        declare_error(f"  !! {pod} could [red]NOT[/red] run command")
+    declare_error(f"  !! {pod} could [red]NOT[/red] run command")
+    return False
 
 
 def declare_error(error_msg: str, exit_auto: bool = True) -> None:
@@ -97,27 +99,59 @@ def declare_error(error_msg: str, exit_auto: bool = True) -> None:
         sys.exit()
 
 
+def _reconnect_kubectl(cmd, error) -> bool:
+    """Refresh the kubeconfig if kubectl lost the API server (True to retry)"""
+    err_text = error.stderr.decode("utf-8") if getattr(error, "stderr", None) else ""
+    if "kubectl" not in cmd or not (
+        "connection refused" in err_text or "server was refused" in err_text
+    ):
+        return False
+
+    # We use subprocess directly to avoid recursion loops
+    subprocess.run(
+        "k3d kubeconfig merge k3s-default --kubeconfig-switch-context",
+        shell=True,
+        capture_output=True,
+        check=False,
+    )
+    return True
+
+
 def run_and_wait(
     cmd: str,
     capture_output=True,
     check_result="",
     cwd=None,
     suppress_error=False,
-    _retry_count=0,
 ) -> int:
     """Run a Bash command and wait for it to finish"""
 
     # Local vars
     found = 0
 
+    def attempt():
+        try:
+            return subprocess.run(
+                cmd,
+                capture_output=capture_output,
+                shell=True,
+                check=True,
+                cwd=cwd,  # Allow running in specific directory
+            )
+        finally:
+            # The command may have started, stopped or replaced pods
+            pods.invalidate()
+
     # Run the command and return the output
     try:
-        output = subprocess.run(
-            cmd,
-            capture_output=capture_output,
-            shell=True,
-            check=True,
-            cwd=cwd,  # Allow running in specific directory
+        # kubectl connection issues auto-heal by refreshing the kubeconfig.
+        # Stats are kept per program, not per command line.
+        output = retry.call(
+            attempt,
+            retry.RECONNECT,
+            name=(cmd.split() or ["command"])[0],
+            retry_on=lambda error: isinstance(error, CalledProcessError)
+            and _reconnect_kubectl(cmd, error),
         )
 
         if check_result:
@@ -133,31 +167,10 @@ def run_and_wait(
         # Get to this point implies success
         return 1
 
-    except CalledProcessError as error:
-        # Check for kubectl connection issues to auto-heal
+    except (CalledProcessError, retry.RetryError) as error:
+        if isinstance(error, retry.RetryError):
+            error = error.last
         err_text = error.stderr.decode("utf-8") if error.stderr else ""
-        if "kubectl" in cmd and (
-            "connection refused" in err_text or "server was refused" in err_text
-        ):
-            if _retry_count < 3:
-                # Attempt to fix connectivity by refreshing kubeconfig
-                # We use subprocess directly to avoid recursion loops
-                subprocess.run(
-                    "k3d kubeconfig merge k3s-default --kubeconfig-switch-context",
-                    shell=True,
-                    capture_output=True,
-                    check=False,
-                )
-                sleep(2)
-                # Retry the original command
-                return run_and_wait(
-                    cmd,
-                    capture_output,
-                    check_result,
-                    cwd,
-                    suppress_error,
-                    _retry_count + 1,
-                )
 
         # If we captured output and errors are not suppressed, print the error.
         if capture_output and err_text and not suppress_error:
@@ -205,18 +218,21 @@ def verify_pod_is_installed(pod: str) -> bool:
     return pod_name or run_and_wait("""kubectl get pods""", check_result=pod)
 
 
-def verify_cluster_connection(retries=10) -> bool:
+def verify_cluster_connection(deadline=20.0) -> bool:
     """Verify that kubectl can connect to the cluster"""
-    cmd = "kubectl cluster-info"
-    for _ in range(retries):
-        try:
-            # We assume capture_output=True inside run_and_wait is fine here,
-            # but we use subprocess directly to avoid loop recursion logging
-            subprocess.run(cmd, capture_output=True, shell=True, check=True)
-            return True
-        except CalledProcessError:
-            sleep(2)
-    return False
+    # We use subprocess directly to avoid loop recursion logging
+    try:
+        retry.call(
+            lambda: subprocess.run(
+                "kubectl cluster-info", capture_output=True, shell=True, check=True
+            ),
+            retry.Policy(first_delay=0.1, max_delay=2.0, deadline=deadline),
+            name="kubectl cluster-info",
+            retry_on=(CalledProcessError,),
+        )
+        return True
+    except retry.RetryError:
+        return False
 
 
 def wait_for_pod_status(podname: str, status: str, max_wait_time=60) -> bool:
@@ -252,93 +268,84 @@ def wait_for_pod_status(podname: str, status: str, max_wait_time=60) -> bool:
     return bool(pod_complete)
 
 
-def wait_for_mysql_socket(retries=30) -> bool:
-    """Wait for MySQL socket to be available inside the pod"""
-    pod_name = get_full_pod_name("mysql").strip("\n")
-    if not pod_name:
-        return False
-
-    for _ in range(retries):
-        # We use a real query to test connectivity, not just admin ping
-        cmd = f'kubectl exec {pod_name} -- mysql -uroot -ppassword -e "SELECT 1"'
-        try:
-            subprocess.run(cmd, capture_output=True, shell=True, check=True)
-            return True
-        except CalledProcessError:
-            sleep(1)
-    return False
-
-
-def wait_for_postgres_socket(retries=30) -> bool:
-    """Wait for Postgres socket to be available inside the pod"""
-    pod_name = get_full_pod_name("postgres").strip("\n")
-    if not pod_name:
-        return False
-
-    for _ in range(retries):
-        # We use a real query to test connectivity
-        cmd = f'kubectl exec {pod_name} -- psql -U root -d postgres -c "SELECT 1"'
-        try:
-            subprocess.run(cmd, capture_output=True, shell=True, check=True)
-            return True
-        except CalledProcessError:
-            sleep(1)
-    return False
-
+def _exec_when_ready(app, container_cmd, description, script=None) -> bool:
+    """Run a command in an app's pod, retrying while the pod finishes starting
 
-def create_postgres_database(database, retries=0):
-    """Create a database inside postgres"""
-    # We use a quick bash command to see if the DB exists, and create it if it doesn't.
-    # This prevents Postgres from throwing errors on subsequent "auto start" runs.
-    container_cmd = f'sh -c "psql -U root -lqt | grep -qw {database} || createdb -U root {database}"'
-    pod_name = get_full_pod_name("postgres").strip("\n")
+    A `script` is sent to the command's stdin, so a whole batch of statements
+    runs in one exec session.
+    """
 
-    if pod_name:
-        cmd = f"kubectl exec -it {pod_name} -- {container_cmd}"
+    def attempt():
+        # Look the pod up every time, it may have been replaced since the last try
+        pod_name = get_full_pod_name(app).strip("\n")
+        if not pod_name:
+            return False
 
         # Make this command safe to run
-        cmd = shlex.quote(cmd)
+        tty = "-i" if script is not None else "-it"
+        cmd = shlex.quote(f"kubectl exec {tty} {pod_name} -- {container_cmd}")
         args = shlex.split(cmd)
 
+        # Run the command silently.
+        # We discard output to suppress "ERROR 2002" style messages during startup.
         try:
-            # Run the command silently
             subprocess.run(
                 args,
+                input=script.encode("utf-8") if script is not None else None,
                 shell=True,
                 check=True,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
             )
         except CalledProcessError:
-            if retries < 10:  # Allow up to 30s for slower startups
-                sleep(3)
-                create_postgres_database(database, retries=retries + 1)
-            else:
-                rprint(f"  [red]FAILED: Could not create database[/] {database}")
-
-    else:
-        # If pod_name not found, wait and retry
-        if retries < 10:
-            sleep(3)
-            create_postgres_database(database, retries=retries + 1)
-        else:
-            rprint(f"  [red]FAILED: Could not create database[/] {database}")
+            # The pod may have been replaced, look it up afresh next time
+            pods.invalidate()
+            raise
+        return True
 
+    try:
+        retry.call(
+            attempt, retry.STARTUP, name=description, retry_on=(CalledProcessError,)
+        )
+        return True
+    except retry.RetryError:
+        return False
 
-def get_full_pod_name(pod) -> str:
-    """Get the full name of the pod for a k3s pod by application name"""
 
-    cmd = f"kubectl get pods | grep {pod} " + "| grep Running | awk 'NR==1{{print $1}}'"
+def create_postgres_databases(databases) -> bool:
+    """Create whichever of these databases postgres doesn't have yet, in one session"""
+    if not databases:
+        return True
+
+    # One query builds the missing CREATE DATABASE statements and \gexec runs them
+    names = ", ".join("'" + name.replace("'", "''") + "'" for name in databases)
+    wanted = f"FROM unnest(ARRAY[{names}]::text[]) AS name "
+    script = (
+        "SELECT format('CREATE DATABASE %I', name) "
+        + wanted
+        + "WHERE NOT EXISTS (SELECT 1 FROM pg_database WHERE datname = name)\\gexec\n"
+        # Every database, including ones made before templates existed, gets the
+        # template `auto db branch` clones from.  Copying a database that is in
+        # use fails, that one is left for the next run instead of failing this one.
+        "\\set ON_ERROR_STOP 0\n"
+        "SELECT format('CREATE DATABASE %I TEMPLATE %I', name || '__template', name) "
+        + wanted
+        + "WHERE NOT EXISTS "
+        "(SELECT 1 FROM pg_database WHERE datname = name || '__template')\\gexec\n"
+    )
+    container_cmd = "psql -U root -d postgres -v ON_ERROR_STOP=1"
 
-    # Make this command safe to run
-    cmd = shlex.quote(cmd)
-    args = shlex.split(cmd)
+    if not _exec_when_ready(
+        "postgres", container_cmd, "create postgres databases", script
+    ):
+        rprint(f"  [red]FAILED: Could not create databases[/] {', '.join(databases)}")
+        return False
+    return True
 
-    # Run the command and return the output
-    pod_name = subprocess.run(args, capture_output=True, shell=True, check=True)
 
-    # give the people what they want
-    return pod_name.stdout.decode().strip("\n")
+def get_full_pod_name(pod) -> str:
+    """Get the full name of the running k3s pod for an application name"""
+    return pods.resolve(pod)
 
 
 def connect_to_db() -> None:
@@ -394,71 +401,96 @@ def connect_to_minio() -> None:
     subprocess.run(args, shell=True, check=True)
 
 
-def create_mysql_database(database, retries=0):
-    """Create a database inside mysql"""
+def create_mysql_databases(databases) -> bool:
+    """Create whichever of these databases mysql doesn't have yet, in one session"""
+    if not databases:
+        return True
 
-    container_cmd = f'mysql -uroot -ppassword --execute="create database {database}"'
-    pod_name = get_full_pod_name("mysql").strip("\n")
+    script = "".join(
+        f"CREATE DATABASE IF NOT EXISTS `{name.replace('`', '``')}`;\n"
+        for name in databases
+    )
+    container_cmd = "mysql -uroot -ppassword"
 
-    if pod_name:
-        cmd = f"kubectl exec -it {pod_name} -- {container_cmd}"
+    if not _exec_when_ready("mysql", container_cmd, "create mysql databases", script):
+        rprint(f"  [red]FAILED: Could not create databases[/] {', '.join(databases)}")
+        return False
+    return True
 
-        # Make this command safe to run
-        cmd = shlex.quote(cmd)
-        args = shlex.split(cmd)
 
-        try:
-            # Run the command silently.
-            # We capture output to suppress "ERROR 2002" messages during startup.
-            subprocess.run(
-                args,
-                shell=True,
-                check=True,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-            )
-        except CalledProcessError:
-            if retries < 10:  # Increased retries to 10 (approx 30s) for slower startups
-                sleep(3)
-                create_mysql_database(database, retries=retries + 1)
-            else:
-                rprint(f"  [red]FAILED: Could not create database[/] {database}")
+DEPENDENCY_BINARIES = ["docker", "k3d", "kubectl", "helm"]
+DEPENDENCY_CACHE = os.path.expanduser("~/.auto/cache/dependencies.json")
+HOSTS_FILE = "/etc/hosts"
 
-    else:
-        # If pod_name not found, wait and retry
-        if retries < 10:
-            sleep(3)
-            create_mysql_database(database, retries=retries + 1)
-        else:
-            rprint(f"  [red]FAILED: Could not create database[/] {database}")
 
+def _file_signature(path):
+    """Return (inode, mtime) for a path, or None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return [stat.st_ino, stat.st_mtime_ns]
+
+
+def _docker_socket_path():
+    """Where the docker daemon socket lives (honouring DOCKER_HOST)"""
+    docker_host = os.environ.get("DOCKER_HOST", "")
+    if docker_host.startswith("unix://"):
+        return docker_host[len("unix://") :]  # noqa: E203
+    return "/var/run/docker.sock"
+
+
+def dependency_fingerprint():
+    """Fingerprint everything the dependency checks depend on.
+
+    That is each binary's resolved path and mtime, the docker socket (it is
+    recreated whenever the daemon restarts) and /etc/hosts.
+    """
+    fingerprint = {}
+    for binary in DEPENDENCY_BINARIES:
+        path = shutil.which(binary)
+        resolved = os.path.realpath(path) if path else None
+        fingerprint[binary] = [resolved, _file_signature(resolved)]
+    fingerprint["docker.sock"] = _file_signature(_docker_socket_path())
+    fingerprint["hosts"] = _file_signature(HOSTS_FILE)
+    return fingerprint
+
+
+def dependencies_verified(fingerprint) -> bool:
+    """Did the last successful verification see exactly this fingerprint?"""
+    try:
+        with open(DEPENDENCY_CACHE, encoding="utf-8") as cache_file:
+            return json.load(cache_file) == fingerprint
+    except (OSError, ValueError):
+        return False
 
-def create_minio_bucket(bucket):
-    """Create a bucket in MinIO"""
 
-    container_cmds = [
-        f"mc mb --quiet myminio/{bucket}",
-        f"mc anonymous --quiet set none myminio/{bucket}",  # disable file list
-        f"mc anonymous --quiet set download myminio/{bucket}/*",  # enable full path access
-    ]
-    pod_name = get_full_pod_name("minio").strip("\n")
+def save_dependency_fingerprint(fingerprint):
+    """Remember a fingerprint that passed every dependency check"""
+    try:
+        os.makedirs(os.path.dirname(DEPENDENCY_CACHE), exist_ok=True)
+        with open(DEPENDENCY_CACHE, "w", encoding="utf-8") as cache_file:
+            json.dump(fingerprint, cache_file)
+    except OSError:
+        pass
 
-    if pod_name:
-        for cmd in container_cmds:
-            cmd = f"kubectl exec -it {pod_name} -- {cmd}"
 
-            # Make this command safe to run
-            cmd = shlex.quote(cmd)
-            args = shlex.split(cmd)
+def _is_process_running(name) -> bool:
+    """Look for a running process by name without spawning `ps`"""
+    if not os.path.isdir("/proc"):
+        # No procfs (macOS) so fall back to asking ps
+        return bool(run_and_wait("ps aux", check_result=name))
 
-            # Run the command and return the output
-            subprocess.run(
-                args,
-                shell=True,
-                check=True,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.STDOUT,
-            )
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/comm", encoding="utf-8") as comm:
+                if comm.read().strip() == name:
+                    return True
+        except OSError:
+            continue
+    return False
 
 
 def check_docker():
@@ -468,8 +500,7 @@ def check_docker():
     errors = 0
 
     # Verify docker is installed
-    bash_command = """which docker"""
-    if not run_and_wait(bash_command, check_result="docker"):
+    if not shutil.which("docker"):
         declare_error(
             """Docker is missing!
                [yellow]We didn't see docker on your system.  You'll need docker installed to continue""",
@@ -479,8 +510,7 @@ def check_docker():
         errors += 1
 
     # Verify docker is running
-    bash_command = """ps aux"""
-    if not run_and_wait(bash_command, check_result="dockerd"):
+    if not _is_process_running("dockerd"):
         declare_error(
             """Docker Daemon doesn't appear to be running.
         Please run the following command:
@@ -511,8 +541,7 @@ def check_k8s():
     errors = 0
 
     # check for the k3d command
-    bash_command = """k3d cluster list"""
-    if not run_and_wait(bash_command, check_result="LOADBALANCER"):
+    if not shutil.which("k3d"):
         declare_error(
             """The `k3d` command doesn't appear to be installed!
              Please visit https://k3d.io for installation instructions.
@@ -522,8 +551,7 @@ def check_k8s():
         errors += 1
 
     # check for the kubectl command
-    bash_command = """kubectl get --help"""
-    if not run_and_wait(bash_command, check_result="Display one or many resources"):
+    if not shutil.which("kubectl"):
         declare_error(
             """The `kubectl` command doesn't appear to be installed!
              Please install it to continue.
@@ -542,8 +570,7 @@ def check_helm():
     errors = 0
 
     # check for the helm command
-    bash_command = """helm version"""
-    if not run_and_wait(bash_command, check_result="clean"):
+    if not shutil.which("helm"):
         declare_error(
             """The `helm` command doesn't appear to be installed!
              Please visit https://helm.sh/docs/intro/install/ for installation instructions.
@@ -568,12 +595,26 @@ def check_registry_host_entry():
     return errors
 
 
+@functools.lru_cache(maxsize=None)
+def get_host_entries() -> frozenset:
+    """Read /etc/hosts once and return every hostname in it"""
+    hostnames = set()
+    try:
+        with open(HOSTS_FILE, encoding="utf-8") as hosts:
+            for line in hosts:
+                # Skip the IP address and anything after a comment
+                hostnames.update(line.split("#", 1)[0].split()[1:])
+    except OSError:
+        pass
+    return frozenset(hostnames)
+
+
 def check_host_entry(host, exit_auto: bool = True):
     """Check that a host entry for the pod has been made"""
 
-    # check for the k3d-registry.local host entry
-    bash_command = """cat /etc/hosts"""
-    if not run_and_wait(bash_command, check_result=host):
+    # check for the {host}.local host entry
+    hostnames = get_host_entries()
+    if host not in hostnames and f"{host}.local" not in hostnames:
         declare_error(
             f"""No registry entry in /etc/hosts !
        Please add the following to your /etc/hosts file
@@ -648,56 +689,16 @@ def pull_repo(repo, code_folder):
 def get_pod_config(pod):
     """Get the individual config for a pod"""
 
-    # Local Vars
-    config = {}
-
-    # Read globally imported config
-    config_file = CONFIG["code"] + "/" + pod + "/.auto/config.yaml"
+    # Load the config file for this pod (parsed once and shared by every caller)
+    config = load_pod_config(pod)
 
     # Does the config file exist?
-    if not os.path.isfile(config_file):
-        declare_error(f"Config file not found at: {config_file}")
-
-    # Load the config file for this pod
-    configparser.ConfigParser()
-    with open(config_file, encoding="utf-8") as config_handle:
-        config = yaml.safe_load(config_handle)
+    if config is None:
+        declare_error(f"Config file not found at: {pod_config_path(pod)}")
 
     return config
 
 
-def setup_minio(retries=5):
-    """Setup the credentials and configure and deploy nginx"""
-
-    container_cmds = [
-        "mc alias -q set myminio http://minio.default.svc.cluster.local:9000 minio minio123"
-    ]
-    pod_name = get_full_pod_name("minio").strip("\n")
-
-    if pod_name:
-        # Let's run the commands in the container to setup the access creds
-        for container_cmd in container_cmds:
-            full_cmd = f"kubectl exec -it {pod_name} -- {container_cmd}"
-
-            # Make this command safe to run
-            full_cmd = shlex.quote(full_cmd)
-            cmd_with_args = shlex.split(full_cmd)
-
-            # Run the command and return the output
-            subprocess.run(
-                cmd_with_args,
-                shell=True,
-                check=True,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.STDOUT,
-            )
-
-    else:
-        if retries > 1:
-            sleep(3)
-            setup_minio(retries - 1)
-
-
 def get_required_system_pods(config):
     """Determine which system pods need to be started based on global and pod configs"""
     required_pods = set()
@@ -720,16 +721,14 @@ def get_required_system_pods(config):
             continue
 
         config_file_path = os.path.join(code_dir, pod_name, ".auto", "config.yaml")
-        if os.path.isfile(config_file_path):
-            try:
-                with open(config_file_path, encoding="utf-8") as pod_yaml:
-                    pod_config = yaml.safe_load(pod_yaml)
-                    if pod_config and "system-pods" in pod_config:
-                        for req_sys_pod in pod_config["system-pods"]:
-                            required_pods.add(req_sys_pod["name"])
-            except (OSError, yaml.YAMLError):
-                # Pass gracefully if we hit a permission/read issue or badly formatted yaml
-                pass
+        try:
+            pod_config = store.load(config_file_path)
+            if pod_config and "system-pods" in pod_config:
+                for req_sys_pod in pod_config["system-pods"]:
+                    required_pods.add(req_sys_pod["name"])
+        except (OSError, store.ConfigError):
+            # Pass gracefully if we hit a permission/read issue or badly formatted yaml
+            pass
 
     return required_pods
 
@@ -754,16 +753,38 @@ def is_port_in_use(port: int) -> bool:
     return in_use
 
 
+def get_k3d_exposed_ports() -> set:
+    """Every host port currently exposed on the k3d serverlb container"""
+    output = run_and_return("docker port k3d-k3s-default-serverlb")
+    # Each line looks like: '30036/tcp -> 0.0.0.0:3306'
+    return {
+        int(line.rsplit(":", 1)[1])
+        for line in output.splitlines()
+        if line.rsplit(":", 1)[-1].isdigit()
+    }
+
+
 def is_port_exposed_on_k3d(port: int) -> bool:
     """Check if a port is currently exposed dynamically on the k3d serverlb container"""
-    output = run_and_return("docker port k3d-k3s-default-serverlb")
-    if not output:
-        return False
-    # Target string will map back similarly to: '30036/tcp -> 0.0.0.0:3306'
-    for line in output.splitlines():
-        if f":{port}" in line:
-            return True
-    return False
+    return port in get_k3d_exposed_ports()
+
+
+def get_cluster_containers(status="running") -> list:
+    """Names of the k3d node, load balancer and registry containers in a state"""
+    output = run_and_return(
+        f"docker ps --all --filter status={status} "
+        "--filter name=k3d-k3s-default- --filter name=k3d-registry.local "
+        "--format '{{.Names}}'"
+    )
+    return output.split()
+
+
+def get_cluster_clock_skew() -> float:
+    """Seconds between the k3s server's clock and ours (0 if we can't tell)"""
+    output = run_and_return("docker exec k3d-k3s-default-server-0 date +%s")
+    if not output.isdigit():
+        return 0.0
+    return abs(int(output) - time.time())
 
 
 def get_cluster_status():
@@ -790,8 +811,17 @@ def get_registry_status():
     return status, style
 
 
-def build_pod_table(namespace, all_namespaces):
-    """Helper to build the pods table"""
+def pod_status_style(status):
+    """The color a pod's status is shown in"""
+    if "Error" in status or "Crash" in status or "ImagePullBackOff" in status:
+        return "red"
+    if status not in ["Running", "Completed"]:
+        return "yellow"
+    return "green"
+
+
+def new_pod_table(all_namespaces):
+    """An empty pods table with its columns"""
     table = Table(show_header=True, header_style="bold magenta", expand=True)
 
     if all_namespaces:
@@ -802,6 +832,12 @@ def build_pod_table(namespace, all_namespaces):
     table.add_column("Status")
     table.add_column("Restarts", justify="right")
     table.add_column("Age", justify="right")
+    return table
+
+
+def build_pod_table(namespace, all_namespaces):
+    """Helper to build the pods table"""
+    table = new_pod_table(all_namespaces)
 
     # Build the command based on arguments
     if all_namespaces:
@@ -847,11 +883,7 @@ def build_pod_table(namespace, all_namespaces):
         age = age.lstrip("(")
 
         # Colorize Status
-        status_style = "green"
-        if status not in ["Running", "Completed"]:
-            status_style = "yellow"
-        if "Error" in status or "Crash" in status or "ImagePullBackOff" in status:
-            status_style = "red"
+        status_style = pod_status_style(status)
 
         # Add row to table
         row_data = []
@@ -897,20 +929,9 @@ def check_mkcert():
     check_certutil()
 
 
-def create_local_certs(cert_path, additional_domains=None):
-    """Create local certificates using mkcert"""
+def install_local_ca() -> bool:
+    """Install the mkcert CA into the system and browser trust stores"""
 
-    if additional_domains is None:
-        additional_domains = []
-
-    # Create the directory if it doesn't exist
-    if not os.path.isdir(cert_path):
-        os.makedirs(cert_path)
-
-    key_file = os.path.join(cert_path, "key.pem")
-    cert_file = os.path.join(cert_path, "cert.pem")
-
-    # Install the local CA
     # Try silently first (success if already installed or no sudo needed)
     try:
         subprocess.run(
@@ -920,10 +941,29 @@ def create_local_certs(cert_path, additional_domains=None):
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
         )
+        return True
     except CalledProcessError:
         # If silent fail, run interactively (likely needs sudo password)
         rprint("  -- Installing local CA (may prompt for password)")
-        os.system("mkcert -install")
+        return os.system("mkcert -install") == 0
+
+
+def create_local_certs(cert_path, additional_domains=None, install_ca=True):
+    """Create local certificates using mkcert (None if mkcert failed)"""
+
+    if additional_domains is None:
+        additional_domains = []
+
+    # Create the directory if it doesn't exist
+    if not os.path.isdir(cert_path):
+        os.makedirs(cert_path)
+
+    key_file = os.path.join(cert_path, "key.pem")
+    cert_file = os.path.join(cert_path, "cert.pem")
+
+    # Install the local CA
+    if install_ca:
+        install_local_ca()
 
     # Generate the certs
     # We suppress output here unless it fails
@@ -944,5 +984,6 @@ def create_local_certs(cert_path, additional_domains=None):
     except CalledProcessError as e:
         rprint("[red]Error generating certificates:[/red]")
         print(e.stderr.decode())
+        return None
 
     return key_file, cert_file